@@ -33,8 +33,10 @@ st.markdown("""
 
 # Load data
 from utils.data_downloader import load_all_data
+from utils.chart_insights import load_insights, render_insight
 
 data = load_all_data()
+insights = load_insights(data)  # cached only; new data is narrated in the background
 
 # Top Metrics Row
 st.markdown("<h2 class='section-title'>📊 Key Metrics</h2>", unsafe_allow_html=True)
@@ -129,6 +131,7 @@ with col1:
         fig.update_yaxes(showgrid=True, gridcolor='rgba(200,200,200,0.2)')
         
         st.plotly_chart(fig, use_container_width=True)
+        render_insight(insights, 'dashboard/upi_trend')
     else:
         st.info("Loading UPI data...")
 
@@ -167,6 +170,7 @@ with col2:
         fig.update_yaxes(showgrid=False)
         
         st.plotly_chart(fig, use_container_width=True)
+        render_insight(insights, 'dashboard/top_credit_states')
 
 # Charts Row 2
 st.markdown("---")
@@ -204,6 +208,7 @@ with col1:
         fig.update_yaxes(showgrid=True, gridcolor='rgba(200,200,200,0.2)', zeroline=True)
         
         st.plotly_chart(fig, use_container_width=True)
+        render_insight(insights, 'dashboard/nse_performers')
 
 with col2:
     st.markdown("<h3 class='chart-title'>💰 Mutual Fund AUM by Category</h3>", unsafe_allow_html=True)
@@ -231,6 +236,7 @@ with col2:
         )
         
         st.plotly_chart(fig, use_container_width=True)
+        render_insight(insights, 'dashboard/mf_aum')
 
 # Bottom Section - Digital Adoption Leaderboard
 st.markdown("---")
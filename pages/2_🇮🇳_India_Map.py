@@ -32,9 +32,35 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load data
-from utils.data_downloader import load_all_data
+from utils.data_downloader import load_all_data, download_district_data, load_state_district_data, DISTRICT_DATASET
+from utils.columnar_store import dataset_dir
+from utils.snapshot_store import get_snapshot_index
+from utils.chart_insights import load_insights, render_insight
+from utils.geo import (
+    load_state_geojson, load_state_district_geojson, StateBoundariesMissing,
+    LOD_TOLERANCES, DEFAULT_DISTRICT_LOD, DISTRICT_SOURCE
+)
+
+
+def _district_inputs_version():
+    """mtimes of the district source and the built-store marker (None while missing)"""
+    paths = (DISTRICT_SOURCE, dataset_dir(DISTRICT_DATASET) / "_built")
+    return tuple(p.stat().st_mtime_ns if p.exists() else None for p in paths)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def prepare_district_store(inputs_version):
+    """Build district geometry levels and data once per hour, not on every rerun
+
+    Keyed by _district_inputs_version(), so adding the district source or
+    rebuilding the store takes effect on the next rerun, even after a
+    cached "not ready" result.
+    """
+    return download_district_data()
+
 
 data = load_all_data()
+snapshots = get_snapshot_index()
 
 # India state codes (simplified mapping)
 INDIA_STATE_CODES = {
@@ -50,7 +76,7 @@ INDIA_STATE_CODES = {
 }
 
 # Controls
-col1, col2, col3 = st.columns([2, 2, 1])
+col1, col2, col3, col4 = st.columns([2, 2, 1.5, 1])
 
 with col1:
     metric_choice = st.selectbox(
@@ -67,6 +93,11 @@ with col2:
     )
 
 with col3:
+    # Quarter switching reads from the cached snapshot index, not from disk
+    snapshot_options = list(reversed(snapshots.dates)) or ["Latest"]
+    as_of_choice = st.selectbox("As of", snapshot_options, index=0)
+
+with col4:
     show_labels = st.checkbox("Show Values", value=True)
 
 # Map metric to column
@@ -81,52 +112,70 @@ metric_map = {
 selected_column = metric_map[metric_choice]
 
 # Prepare data
-if not data['rbi_credit'].empty:
-    map_data = data['rbi_credit'].copy()
+latest_selected = snapshots.empty or as_of_choice == snapshots.dates[-1]
+state_data_source = data['rbi_credit'] if latest_selected else snapshots.as_of(as_of_choice)
+
+if not latest_selected and state_data_source[selected_column].isna().all():
+    st.warning(f"{metric_choice} is not available for {as_of_choice}; showing the latest data instead.")
+    state_data_source = data['rbi_credit']
+
+insights = load_insights(data, state_data_source)
+
+if not state_data_source.empty:
+    map_data = state_data_source.copy()
     map_data['state_code'] = map_data['State'].map(INDIA_STATE_CODES)
     map_data = map_data.dropna(subset=['state_code'])
     
     # Create choropleth map
     st.markdown(f"<h2 class='section-title'>🗺️ {metric_choice} across Indian States</h2>", unsafe_allow_html=True)
     
-    fig = go.Figure(go.Choropleth(
-        geojson="https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson",
-        featureidkey='properties.ST_NM',
-        locations=map_data['State'],
-        z=map_data[selected_column],
-        colorscale=color_scale,
-        colorbar=dict(
-            title=metric_choice,
-            thickness=15,
-            len=0.7,
-            x=1.02
-        ),
-        text=map_data['State'],
-        hovertemplate='<b>%{text}</b><br>' + 
-                      f'{metric_choice}: %{{z:.2f}}<br>' +
-                      '<extra></extra>',
-        marker_line_color='white',
-        marker_line_width=1.5
-    ))
+    try:
+        state_geojson = load_state_geojson()
+    except StateBoundariesMissing as e:
+        # Only the choropleth needs boundaries; the rest of the page still renders
+        st.warning(f"🗺️ {e}")
+        state_geojson = None
+
+    if state_geojson is not None:
+        fig = go.Figure(go.Choropleth(
+            geojson=state_geojson,
+            featureidkey='properties.ST_NM',
+            locations=map_data['State'],
+            z=map_data[selected_column],
+            colorscale=color_scale,
+            colorbar=dict(
+                title=metric_choice,
+                thickness=15,
+                len=0.7,
+                x=1.02
+            ),
+            text=map_data['State'],
+            hovertemplate='<b>%{text}</b><br>' + 
+                          f'{metric_choice}: %{{z:.2f}}<br>' +
+                          '<extra></extra>',
+            marker_line_color='white',
+            marker_line_width=1.5
+        ))
     
-    fig.update_geos(
-        visible=False,
-        fitbounds="locations",
-        projection_type="mercator"
-    )
+        fig.update_geos(
+            visible=False,
+            fitbounds="locations",
+            projection_type="mercator"
+        )
     
-    fig.update_layout(
-        height=600,
-        margin=dict(l=0, r=0, t=0, b=0),
-        geo=dict(
-            showframe=False,
-            showcoastlines=False,
-            projection_type='mercator'
-        ),
-        font=dict(family='Inter, sans-serif', size=12)
-    )
+        fig.update_layout(
+            height=600,
+            margin=dict(l=0, r=0, t=0, b=0),
+            geo=dict(
+                showframe=False,
+                showcoastlines=False,
+                projection_type='mercator'
+            ),
+            font=dict(family='Inter, sans-serif', size=12)
+        )
     
-    st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True)
+    render_insight(insights, f"map/{selected_column}")
     
     # Statistics below map
     st.markdown("---")
@@ -216,6 +265,7 @@ if not data['rbi_credit'].empty:
     )
     
     st.plotly_chart(fig_heat, use_container_width=True)
+    render_insight(insights, 'map/heatmap')
     
     # State selector for detailed view
     st.markdown("---")
@@ -344,6 +394,87 @@ if not data['rbi_credit'].empty:
         )
         
         st.plotly_chart(fig_compare, use_container_width=True)
+        
+        # Trend across stored snapshots
+        state_trend = snapshots.series(selected_state, selected_column)
+        if len(state_trend) > 1:
+            st.markdown(f"### {selected_state} - {metric_choice} Over Time")
+            
+            fig_trend = go.Figure(go.Scatter(
+                x=state_trend.index,
+                y=state_trend.values,
+                mode='lines+markers',
+                line=dict(color='#4267B2', width=3),
+                marker=dict(size=8)
+            ))
+            
+            fig_trend.update_layout(
+                template='plotly_white',
+                height=300,
+                margin=dict(l=20, r=20, t=20, b=20),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='Inter, sans-serif', size=12),
+                xaxis_title='As of',
+                yaxis_title=metric_choice
+            )
+            
+            st.plotly_chart(fig_trend, use_container_width=True)
+        
+        # District drill-down: only the selected state's geometry is sent to the browser
+        st.markdown("---")
+        st.markdown(f"<h2 class='section-title'>🏘️ {selected_state} District Drill-down</h2>", unsafe_allow_html=True)
+        
+        district_metric_map = {
+            "Credit Growth %": "Credit_Growth_%",
+            "Deposit Growth %": "Deposit_Growth_%",
+            "CD Ratio": "CD_Ratio",
+            "Credit Outstanding": "Credit_Crore"
+        }
+        
+        dcol1, dcol2 = st.columns([2, 2])
+        with dcol1:
+            district_metric = st.selectbox("District Metric", list(district_metric_map), index=0)
+        with dcol2:
+            detail_level = st.select_slider(
+                "Map Detail",
+                options=list(LOD_TOLERANCES),
+                value=DEFAULT_DISTRICT_LOD,
+                help="Higher detail = sharper borders, larger download"
+            )
+        
+        districts_ready = prepare_district_store(_district_inputs_version())
+        district_geojson = load_state_district_geojson(selected_state, detail_level) if districts_ready else None
+        district_data = load_state_district_data(selected_state) if districts_ready else pd.DataFrame()
+        district_column = district_metric_map[district_metric]
+        
+        if district_geojson and not district_data.empty and district_column in district_data.columns:
+            fig_district = go.Figure(go.Choropleth(
+                geojson=district_geojson,
+                featureidkey='properties.district',
+                locations=district_data['District'],
+                z=district_data[district_column],
+                colorscale=color_scale,
+                colorbar=dict(title=district_metric, thickness=15, len=0.7),
+                text=district_data['District'],
+                hovertemplate='<b>%{text}</b><br>' +
+                              f'{district_metric}: %{{z:,.2f}}<br>' +
+                              '<extra></extra>',
+                marker_line_color='white',
+                marker_line_width=0.8
+            ))
+            
+            fig_district.update_geos(visible=False, fitbounds="locations", projection_type="mercator")
+            fig_district.update_layout(
+                height=500,
+                margin=dict(l=0, r=0, t=0, b=0),
+                font=dict(family='Inter, sans-serif', size=12)
+            )
+            
+            st.plotly_chart(fig_district, use_container_width=True)
+            st.caption(f"{len(district_data)} districts · data as of {district_data['As_Of_Date'].iloc[0]}")
+        else:
+            st.info("District drill-down needs district boundaries: add data/raw/geo/india_districts.geojson")
 
 else:
     st.error("Unable to load state-wise data")
@@ -4,7 +4,6 @@ AI-powered RAG chatbot using Gemini 1.5 Flash
 """
 
 import streamlit as st
-import time
 from pathlib import Path
 from datetime import datetime
 
@@ -29,30 +28,38 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# Token budgets offered in Advanced Settings
+CONTEXT_TOKEN_OPTIONS = [1000, 2000, 4000, 8000, 16000, 32000, 100000, 700000]
+DEFAULT_CONTEXT_TOKENS = 700000
 
-if "rag_context_loaded" not in st.session_state:
-    st.session_state.rag_context_loaded = False
+# Answer modes offered in Advanced Settings -> GeminiRAG.answer_question mode
+ANSWER_MODES = {
+    "Retrieved context": "rag",
+    "Data tools (model queries the data)": "tools",
+}
 
-if "rag_context" not in st.session_state:
-    st.session_state.rag_context = ""
+# Sessions hold only a key into the process-wide context cache
+if "rag_context_key" not in st.session_state:
+    st.session_state.rag_context_key = None
 
 # Load RAG system
 from utils.gemini_rag import get_rag_instance
 from utils.data_downloader import load_all_data
+from utils.chat_memory import ChatMemory, HISTORY_RETENTION_SECONDS
+from utils.stream_renderer import StreamRenderer
+from utils.prefetch import EXAMPLE_QUESTIONS, LOG_QUESTIONS, QUESTION_RETENTION_SECONDS, get_prefetcher
 
 # Initialize RAG (only once)
 try:
     rag = get_rag_instance()
     
-    # Build context if not loaded
-    if not st.session_state.rag_context_loaded:
-        with st.spinner("🔄 Loading financial data into AI context..."):
-            data = load_all_data()
-            st.session_state.rag_context = rag.build_context_from_data(data)
-            st.session_state.rag_context_loaded = True
+    # Built once per data version and shared by every session
+    with st.spinner("🔄 Loading financial data into AI context..."):
+        data = load_all_data()
+        st.session_state.rag_context_key = rag.ensure_context(data)
+    
+    # Example and frequent opening questions are answered ahead of time with idle quota
+    get_prefetcher().schedule(rag, data)
     
     rag_available = True
 except Exception as e:
@@ -60,24 +67,19 @@ except Exception as e:
     st.error(f"⚠️ RAG system unavailable: {str(e)}")
     st.info("Add your GEMINI_API_KEY to .streamlit/secrets.toml to enable AI chat")
 
+# Chat history: a bounded recent window plus a rolling summary; older turns are paged to disk
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = ChatMemory(
+        counter=rag.token_counter if rag_available else None,
+        summarizer=rag.summarize_conversation if rag_available else None
+    )
+memory = st.session_state.chat_memory
+
 # Sidebar with example questions
 with st.sidebar:
     st.markdown("### 💡 Example Questions")
     
-    example_questions = [
-        "What is the latest UPI transaction volume?",
-        "Which state has the highest credit growth?",
-        "Explain RBI's current monetary policy stance",
-        "Compare digital adoption across top 5 states",
-        "What are the trends in mutual fund investments?",
-        "How is the stock market performing today?",
-        "Tell me about Karnataka's banking sector",
-        "UPI का महीने का वॉल्यूम क्या है?",  # Hindi
-        "What is CD ratio and why is it important?",
-        "Forecast UPI growth for next month"
-    ]
-    
-    for i, question in enumerate(example_questions):
+    for i, question in enumerate(EXAMPLE_QUESTIONS):
         if st.button(question, key=f"example_{i}", use_container_width=True):
             st.session_state.example_clicked = question
     
@@ -85,7 +87,7 @@ with st.sidebar:
     st.markdown("### ℹ️ About RAG")
     st.markdown("""
     This chat uses **Retrieval-Augmented Generation** with:
-    - 700K+ tokens of financial context
+    - Local BM25 index over every dataset row
     - Real-time data from RBI, NPCI, NSE, AMFI
     - Gemini 1.5 Flash (free tier)
     - No vector database required
@@ -96,7 +98,7 @@ with st.sidebar:
     st.markdown("Ask in **English** or **Hindi**! Gemini handles both natively.")
     
     if st.button("🗑️ Clear Chat History", use_container_width=True):
-        st.session_state.messages = []
+        memory.clear()
         st.rerun()
 
 # Main chat interface
@@ -104,7 +106,7 @@ chat_container = st.container()
 
 # Display chat history
 with chat_container:
-    if not st.session_state.messages:
+    if not memory.total_messages:
         # Welcome message
         st.markdown("""
         <div class="chat-welcome">
@@ -123,7 +125,14 @@ with chat_container:
         </div>
         """, unsafe_allow_html=True)
     else:
-        for message in st.session_state.messages:
+        if memory.paged_out:
+            # Older turns stay on disk; only read them when asked
+            if st.toggle(f"Show {memory.paged_out} earlier message(s)", key="show_paged"):
+                for message in memory.load_paged():
+                    with st.chat_message(message["role"]):
+                        st.markdown(message["content"])
+        
+        for message in memory.messages:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
 
@@ -137,41 +146,59 @@ if prompt := st.chat_input("Ask about Indian financial markets...") or st.sessio
         st.error("⚠️ Please add GEMINI_API_KEY to use chat functionality")
         st.stop()
     
+    # Conversation so far, captured before this question joins it
+    history = memory.prompt_history()
+    previous_question = memory.last_user_question(before_last=False)
+    answer_mode = ANSWER_MODES[st.session_state.get("answer_mode", "Retrieved context")]
+    if not history and answer_mode == 'rag':
+        # Opening questions are the ones a prefetched answer can serve
+        get_prefetcher().log.record(prompt)
+    
     # Add user message
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    memory.add("user", prompt)
     
     with st.chat_message("user"):
         st.markdown(prompt)
     
     # Generate AI response
     with st.chat_message("assistant"):
-        message_placeholder = st.empty()
+        renderer = StreamRenderer(st.container(), counter=rag.token_counter)
+        renderer.status("🤔 Analyzing data...")
         full_response = ""
         
         try:
-            # Show thinking animation
-            with st.spinner("🤔 Analyzing data..."):
-                time.sleep(0.5)  # Brief pause for UX
+            def show_queue_status(position, wait_seconds):
+                ahead = f"{position} request{'s' if position != 1 else ''} ahead" if position else "next in line"
+                renderer.status(f"⏳ Queued ({ahead}) · about {wait_seconds:.0f}s")
             
             # Stream response
-            response_stream = rag.query(
-                prompt, 
-                st.session_state.rag_context, 
-                stream=True
+            # Lookups are answered from the data, repeats replay from the answer cache,
+            # and new questions send only relevant passages
+            response_stream = rag.answer_question(
+                prompt,
+                data,
+                max_tokens=st.session_state.get("context_size", DEFAULT_CONTEXT_TOKENS),
+                on_wait=show_queue_status,
+                history=history,
+                previous_question=previous_question,
+                mode=answer_mode
             )
             
-            # Display streaming response
+            # Redraws are capped per second and finished paragraphs are not re-sent
             for chunk in response_stream:
-                full_response += chunk
-                message_placeholder.markdown(full_response + "▌")
-                time.sleep(0.02)  # Smooth streaming effect
+                renderer.feed(chunk)
+            full_response = renderer.finish()
             
-            message_placeholder.markdown(full_response)
+            stats = renderer.stats()
+            st.session_state.stream_stats = (st.session_state.get("stream_stats", []) + [stats])[-20:]
+            if stats['ttft'] is not None:
+                speed = f" · {stats['tokens_per_sec']:.0f} tokens/s" if stats['tokens_per_sec'] else ""
+                st.caption(f"⚡ First token in {stats['ttft']:.2f}s{speed}")
             
             # Add copy button and sources
             col1, col2 = st.columns([6, 1])
             with col2:
-                if st.button("📋 Copy", key=f"copy_{len(st.session_state.messages)}"):
+                if st.button("📋 Copy", key=f"copy_{memory.total_messages}"):
                     st.toast("Response copied!", icon="✅")
             
             # Sources citation
@@ -190,20 +217,26 @@ if prompt := st.chat_input("Ask about Indian financial markets...") or st.sessio
                 error_message = "⚠️ API error. Please check your GEMINI_API_KEY in .streamlit/secrets.toml"
             
             full_response = error_message
-            message_placeholder.markdown(error_message)
+            renderer.replace(error_message)
     
     # Save assistant response
-    st.session_state.messages.append({"role": "assistant", "content": full_response})
+    memory.add("assistant", full_response)
 
 # Bottom info
 st.markdown("---")
 col1, col2, col3 = st.columns(3)
 
+# Opening questions feed answer prefetching only where the deployment opted in (PULSEAI_LOG_QUESTIONS)
+QUESTION_LOG_NOTICE = (
+    f" The first question of each chat is logged anonymously for {QUESTION_RETENTION_SECONDS / 86400:.0f} days "
+    "to pre-answer common questions." if LOG_QUESTIONS else ""
+)
+
 with col1:
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-card">
         <h4>🔒 Privacy</h4>
-        <p>Your queries are processed via Gemini API. No data is stored permanently.</p>
+        <p>Your queries are processed via Gemini API. Older turns of long conversations are kept on this server for up to {HISTORY_RETENTION_SECONDS / 3600:.0f} hours so they can be shown again; Clear Chat History deletes them at once.{QUESTION_LOG_NOTICE}</p>
     </div>
     """, unsafe_allow_html=True)
 
@@ -228,9 +261,12 @@ with st.expander("⚙️ Advanced Settings"):
     col1, col2 = st.columns(2)
     
     with col1:
-        context_size = st.slider(
+        # Read by the context packer on the next question via session_state
+        context_size = st.select_slider(
             "Context Window (tokens)",
-            100000, 700000, 700000, 50000,
+            options=CONTEXT_TOKEN_OPTIONS,
+            value=DEFAULT_CONTEXT_TOKENS,
+            key="context_size",
             help="Larger context = more data, but slower responses"
         )
     
@@ -241,29 +277,64 @@ with st.expander("⚙️ Advanced Settings"):
             index=0,
             help="Choose how verbose you want responses to be"
         )
+        
+        st.selectbox(
+            "Answer Mode",
+            list(ANSWER_MODES),
+            key="answer_mode",
+            help="Data tools lets the AI call exact pandas lookups instead of reading data tables"
+        )
     
     show_context = st.checkbox("Show loaded context preview", value=False)
     
     if show_context:
         st.text_area(
             "Current RAG Context (first 2000 chars)",
-            st.session_state.rag_context[:2000] + "...",
+            (rag.get_context(st.session_state.rag_context_key)[:2000] + "...") if rag_available else "",
             height=200,
             disabled=True
         )
+    
+    if rag_available:
+        # Shared by every app worker process using this API key
+        quota = rag.scheduler.metrics()
+        if 'rpm_limit' in quota:
+            st.caption(
+                f"Gemini quota (last minute, {quota['processes']} worker(s)): "
+                f"{quota['requests_per_min']:.0f}/{quota['rpm_limit']} requests · "
+                f"{quota['tokens_per_min']:,.0f}/{quota['tpm_limit']:,} tokens · "
+                f"{quota['throttled']} throttled · "
+                f"{sum(n for name, n in quota['queued'].items() if name != 'prefetch')} queued here · "
+                f"{quota['queued'].get('prefetch', 0)} answers waiting for idle quota"
+            )
+        prefixes = rag.prefix_cache.stats()
+        if prefixes['creates'] or prefixes['hits']:
+            st.caption(
+                f"Cached context: {prefixes['hits']} questions sent without the context · "
+                f"{prefixes['creates']} created · {prefixes['refreshes']} refreshed · "
+                f"{prefixes['fallbacks']} expired upstream"
+            )
 
 # Statistics
-if st.session_state.messages:
+if memory.total_messages:
     st.markdown("---")
     col1, col2, col3, col4 = st.columns(4)
     
-    user_messages = len([m for m in st.session_state.messages if m["role"] == "user"])
-    ai_messages = len([m for m in st.session_state.messages if m["role"] == "assistant"])
-    total_chars = sum(len(m["content"]) for m in st.session_state.messages)
+    user_messages = memory.role_counts.get("user", 0)
+    ai_messages = memory.role_counts.get("assistant", 0)
+    total_chars = memory.total_chars
     
     col1.metric("Questions Asked", user_messages)
     col2.metric("AI Responses", ai_messages)
     col3.metric("Total Characters", f"{total_chars:,}")
-    col4.metric("Session Time", f"{len(st.session_state.messages) * 30}s est")
+    col4.metric("Session Time", f"{memory.total_messages * 30}s est")
+    
+    timed = [s for s in st.session_state.get("stream_stats", []) if s['ttft'] is not None]
+    if timed:
+        speeds = [s['tokens_per_sec'] for s in timed if s['tokens_per_sec']]
+        st.caption(
+            f"Last {len(timed)} answers: avg first token {sum(s['ttft'] for s in timed) / len(timed):.2f}s"
+            + (f" · avg {sum(speeds) / len(speeds):.0f} tokens/s" if speeds else "")
+        )
 
 st.caption(f"Powered by Google Gemini 1.5 Flash | Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
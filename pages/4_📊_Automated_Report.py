@@ -3,6 +3,7 @@ PulseAI - Automated Boardroom Report Generator
 One-click RBI-style PowerPoint presentations
 """
 
+import logging
 import streamlit as st
 import time
 from pathlib import Path
@@ -34,6 +35,8 @@ st.markdown("""
 from utils.data_downloader import load_all_data
 from utils.ppt_generator import generate_boardroom_presentation
 from utils.gemini_rag import get_rag_instance
+from utils.llm_backends import BackendConfigError
+from utils.anomaly_engine import find_anomalies, describe as describe_anomaly
 
 # Info section
 st.markdown("""
@@ -150,20 +153,29 @@ if generate_button:
             status_text.text("🤖 Generating AI executive summary...")
             progress_bar.progress(30)
             
+            # The AI steps fall back to template text; a missing key is reported once, not per step
             try:
                 rag = get_rag_instance()
+            except BackendConfigError as e:
+                rag = None
+                st.error(f"⚠️ AI features unavailable, using template text instead: {e}")
+            
+            executive_summary = None
+            if rag is not None:
+                try:
+                    # Create data summary for Gemini
+                    data_summary = f"""
+                    UPI Latest: {data['upi'].iloc[-1]['Volume_Billion']:.2f}B transactions, ₹{data['upi'].iloc[-1]['Value_LakhCrore']:.2f}L Cr
+                    Top Credit State: {data['rbi_credit'].nlargest(1, 'Credit_Growth_%').iloc[0]['State']} ({data['rbi_credit']['Credit_Growth_%'].max():.2f}%)
+                    NSE Average Change: {data['nse']['Change_%'].mean():.2f}%
+                    MF Industry AUM: ₹{data['mutual_funds'][data['mutual_funds']['Month']==data['mutual_funds']['Month'].max()]['AUM_LakhCrore'].sum():.2f}L Cr
+                    """
                 
-                # Create data summary for Gemini
-                data_summary = f"""
-                UPI Latest: {data['upi'].iloc[-1]['Volume_Billion']:.2f}B transactions, ₹{data['upi'].iloc[-1]['Value_LakhCrore']:.2f}L Cr
-                Top Credit State: {data['rbi_credit'].nlargest(1, 'Credit_Growth_%').iloc[0]['State']} ({data['rbi_credit']['Credit_Growth_%'].max():.2f}%)
-                NSE Average Change: {data['nse']['Change_%'].mean():.2f}%
-                MF Industry AUM: ₹{data['mutual_funds'][data['mutual_funds']['Month']==data['mutual_funds']['Month'].max()]['AUM_LakhCrore'].sum():.2f}L Cr
-                """
-                
-                executive_summary = rag.generate_report_summary(data_summary, report_month)
-                time.sleep(1)
-            except Exception as e:
+                    executive_summary = rag.generate_report_summary(data_summary, report_month)
+                    time.sleep(1)
+                except Exception:
+                    logging.getLogger(__name__).exception("Executive summary generation failed")
+            if executive_summary is None:
                 executive_summary = f"""
                 Financial Highlights for {report_month}:
                 
@@ -186,27 +198,26 @@ if generate_button:
             
             anomalies = []
             if include_anomalies:
+                # Statistical detection runs locally; the LLM only narrates what it finds
+                detection_failed = False
                 try:
-                    # Check for significant variations
-                    top_growth = data['rbi_credit'].nlargest(1, 'Credit_Growth_%').iloc[0]
-                    if top_growth['Credit_Growth_%'] > 20:
-                        anomalies.append(f"• {top_growth['State']} showing exceptional credit growth of {top_growth['Credit_Growth_%']:.1f}% - investigate drivers")
-                    
-                    # UPI surge check
-                    if len(data['upi']) > 1:
-                        latest_growth = (data['upi'].iloc[-1]['Volume_Billion'] / data['upi'].iloc[-2]['Volume_Billion'] - 1) * 100
-                        if latest_growth > 10:
-                            anomalies.append(f"• UPI volume surge of {latest_growth:.1f}% MoM - likely festival season impact")
-                    
-                    # Stock volatility
-                    if data['nse']['Change_%'].std() > 2:
-                        anomalies.append(f"• High market volatility detected with std deviation of {data['nse']['Change_%'].std():.2f}%")
-                    
-                    if not anomalies:
-                        anomalies.append("• No significant anomalies detected - all metrics within expected ranges")
+                    findings = find_anomalies(data)
+                except Exception:
+                    # A malformed dataset must not stop the report, but must not read as an all-clear either
+                    logging.getLogger(__name__).exception("Anomaly detection failed")
+                    findings, detection_failed = [], True
+                narrated = {}
+                if findings and rag is not None:
+                    try:
+                        narrated = rag.narrate_anomalies(findings)
+                    except Exception:
+                        logging.getLogger(__name__).warning("Anomaly narration failed", exc_info=True)
+                anomalies = [f"• {narrated.get(i) or describe_anomaly(finding)}" for i, finding in enumerate(findings)]
                 
-                except Exception as e:
-                    anomalies.append("• Anomaly detection completed - standard patterns observed")
+                if detection_failed:
+                    anomalies.append("• Anomaly detection unavailable for this report - the datasets could not be analysed")
+                elif not anomalies:
+                    anomalies.append("• No significant anomalies detected - all metrics within expected ranges")
             
             time.sleep(0.5)
             progress_bar.progress(70)
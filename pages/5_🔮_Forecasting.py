@@ -37,6 +37,51 @@ from utils.data_downloader import load_all_data
 # Load data
 data = load_all_data()
 
+
+# Next-period multiplier per metric; the charts, the narrative and the export all read these
+FORECAST_GROWTH = {
+    "UPI Transaction Volume": 1.03,   # 3% growth
+    "UPI Transaction Value": 1.035,   # 3.5% growth
+    "Average Credit Growth": 1.02,    # Slight uptick
+    "Market Sentiment": 0.9,          # Slight cooling
+}
+FORECAST_UNITS = {
+    "UPI Transaction Volume": "{:.2f}B",
+    "UPI Transaction Value": "₹{:.2f}L Cr",
+    "Average Credit Growth": "{:.2f}%",
+    "Market Sentiment": "{:+.2f}%",
+}
+
+
+def forecast_values(data):
+    """(current, predicted) value of every metric that has data"""
+    current = {}
+    if not data['upi'].empty:
+        latest = data['upi'].sort_values('Month').iloc[-1]
+        current["UPI Transaction Volume"] = latest['Volume_Billion']
+        current["UPI Transaction Value"] = latest['Value_LakhCrore']
+    if not data['rbi_credit'].empty:
+        current["Average Credit Growth"] = data['rbi_credit']['Credit_Growth_%'].mean()
+    if not data['nse'].empty:
+        current["Market Sentiment"] = data['nse']['Change_%'].mean()
+    return {metric: (value, value * FORECAST_GROWTH[metric]) for metric, value in current.items()}
+
+
+def forecast_figures(forecasts):
+    """Formatted current and predicted values of every metric, so one request narrates them all"""
+    figures = {}
+    for metric, (current, predicted) in forecasts.items():
+        unit = FORECAST_UNITS[metric]
+        # From the values themselves: a multiplier below 1 on a negative value is a rise
+        change = (predicted - current) / abs(current) * 100 if current else 0.0
+        figures[metric] = {
+            'current_value': unit.format(current),
+            'predicted_value': unit.format(predicted),
+            'change_percent': f"{change:.2f}",
+            'trend': "Upward" if predicted > current else "Downward" if predicted < current else "Flat",
+        }
+    return figures
+
 # Info banner
 st.markdown("""
 <div class="info-banner" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;">
@@ -66,6 +111,8 @@ with col2:
 st.markdown("---")
 
 # Generate forecasts based on selected metric
+forecasts = forecast_values(data)
+
 if forecast_metric == "UPI Transaction Volume":
     st.markdown("<h2 class='section-title'>📈 UPI Transaction Volume Forecast</h2>", unsafe_allow_html=True)
     
@@ -85,9 +132,7 @@ if forecast_metric == "UPI Transaction Volume":
         last_date = upi_df['Month'].max()
         future_dates = pd.date_range(start=last_date + pd.DateOffset(months=1), periods=1, freq='MS')
         
-        # Simple forecast (with trend + slight randomness for realism)
-        last_value = historical_values[-1]
-        forecast_value = last_value * 1.03  # 3% growth
+        last_value, forecast_value = forecasts[forecast_metric]
         
         # Confidence interval (±5%)
         lower_bound = forecast_value * 0.95
@@ -150,7 +195,7 @@ if forecast_metric == "UPI Transaction Volume":
         # Forecast metrics
         col1, col2, col3, col4 = st.columns(4)
         
-        current_value = historical_values[-1]
+        current_value = last_value
         predicted_value = forecast_value
         change_abs = predicted_value - current_value
         change_pct = (change_abs / current_value) * 100
@@ -159,49 +204,6 @@ if forecast_metric == "UPI Transaction Volume":
         col2.metric("Forecasted (Next Month)", f"{predicted_value:.2f}B", f"+{change_abs:.2f}B")
         col3.metric("Expected Growth", f"{change_pct:+.2f}%")
         col4.metric("Confidence", "95%")
-        
-        # AI Narrative
-        st.markdown("---")
-        st.markdown("<h3 class='chart-title'>🤖 AI-Generated Forecast Narrative</h3>", unsafe_allow_html=True)
-        
-        try:
-            from utils.gemini_rag import get_rag_instance
-            rag = get_rag_instance()
-            
-            with st.spinner("✍️ Writing forecast narrative..."):
-                narrative = rag.generate_forecast_narrative(
-                    metric_name="UPI Transaction Volume",
-                    current_value=f"{current_value:.2f}B",
-                    predicted_value=f"{predicted_value:.2f}B",
-                    change_percent=f"{change_pct:.2f}",
-                    trend="Upward"
-                )
-            
-            st.markdown(f"""
-            <div class="narrative-box">
-                {narrative}
-            </div>
-            """, unsafe_allow_html=True)
-        
-        except Exception as e:
-            st.markdown(f"""
-            <div class="narrative-box">
-                <strong>Forecast Analysis:</strong><br><br>
-                
-                UPI transactions are projected to reach {predicted_value:.2f} billion in the next month, 
-                representing a {change_pct:.1f}% increase from the current level of {current_value:.2f} billion. 
-                This growth trajectory aligns with India's accelerating digital payment adoption, driven by 
-                merchant onboarding, government initiatives, and increasing consumer preference for contactless payments.
-                <br><br>
-                The upward trend is supported by festival season demand, expanding rural internet penetration, 
-                and fintech innovations. Key stakeholders including banks, payment aggregators, and merchants 
-                should prepare infrastructure to handle increased transaction loads. This forecast suggests 
-                sustained momentum in India's cashless economy transformation.
-                <br><br>
-                <strong>Actionable Insight:</strong> Payment service providers should scale server capacity 
-                and ensure robust fraud detection systems to accommodate the projected 3% monthly growth.
-            </div>
-            """, unsafe_allow_html=True)
 
 elif forecast_metric == "UPI Transaction Value":
     st.markdown("<h2 class='section-title'>💰 UPI Transaction Value Forecast</h2>", unsafe_allow_html=True)
@@ -211,9 +213,7 @@ elif forecast_metric == "UPI Transaction Value":
         upi_df['Month'] = pd.to_datetime(upi_df['Month'])
         upi_df = upi_df.sort_values('Month')
         
-        historical_values = upi_df['Value_LakhCrore'].values
-        last_value = historical_values[-1]
-        forecast_value = last_value * 1.035  # 3.5% growth
+        last_value, forecast_value = forecasts[forecast_metric]
         
         lower_bound = forecast_value * 0.94
         upper_bound = forecast_value * 1.06
@@ -253,8 +253,7 @@ elif forecast_metric == "Average Credit Growth":
     st.markdown("<h2 class='section-title'>🏦 Banking Credit Growth Forecast</h2>", unsafe_allow_html=True)
     
     if not data['rbi_credit'].empty:
-        avg_growth = data['rbi_credit']['Credit_Growth_%'].mean()
-        forecast_growth = avg_growth * 1.02  # Slight uptick
+        avg_growth, forecast_growth = forecasts[forecast_metric]
         
         states = data['rbi_credit'].nlargest(10, 'Credit_Growth_%')
         
@@ -292,10 +291,7 @@ elif forecast_metric == "Market Sentiment":
     st.markdown("<h2 class='section-title'>📊 Market Sentiment Forecast</h2>", unsafe_allow_html=True)
     
     if not data['nse'].empty:
-        current_sentiment = data['nse']['Change_%'].mean()
-        
-        # Simulate sentiment forecast
-        forecast_sentiment = current_sentiment * 0.9  # Slight cooling
+        current_sentiment, forecast_sentiment = forecasts[forecast_metric]
         
         sentiment_history = [current_sentiment * (0.95 + 0.1 * np.random.random()) for _ in range(30)]
         
@@ -326,6 +322,38 @@ elif forecast_metric == "Market Sentiment":
         col2.metric("30-Day Avg Forecast", f"{forecast_sentiment:+.2f}%")
         col3.metric("Outlook", "Cautiously Optimistic" if forecast_sentiment > 0 else "Neutral")
 
+# AI Narrative
+figures = forecast_figures(forecasts)
+if forecast_metric in figures:
+    st.markdown("---")
+    st.markdown("<h3 class='chart-title'>🤖 AI-Generated Forecast Narrative</h3>", unsafe_allow_html=True)
+    
+    try:
+        from utils.gemini_rag import get_rag_instance
+        rag = get_rag_instance()
+        
+        # All metrics in one request; each narrative is cached, so switching metric is instant
+        with st.spinner("✍️ Writing forecast narratives..."):
+            narrative = rag.generate_forecast_narratives(figures)[forecast_metric]
+        
+        st.markdown(f"""
+        <div class="narrative-box">
+            {narrative}
+        </div>
+        """, unsafe_allow_html=True)
+    
+    except Exception as e:
+        selected = figures[forecast_metric]
+        st.markdown(f"""
+        <div class="narrative-box">
+            <strong>Forecast Analysis:</strong><br><br>
+            
+            {forecast_metric} is projected to move from {selected['current_value']} to {selected['predicted_value']}, 
+            a {float(selected['change_percent']):+.1f}% change. AI narratives are unavailable right now; 
+            read this alongside the assumptions and limitations below.
+        </div>
+        """, unsafe_allow_html=True)
+
 # Key assumptions
 st.markdown("---")
 st.markdown("### 📝 Forecast Assumptions & Limitations")
@@ -400,21 +428,14 @@ st.markdown("---")
 
 if st.button("📥 Export Forecast Data (CSV)", use_container_width=False):
     # Create forecast summary CSV
+    metrics = {'UPI Volume': "UPI Transaction Volume", 'UPI Value': "UPI Transaction Value",
+               'Credit Growth': "Average Credit Growth", 'Market Sentiment': "Market Sentiment"}
     forecast_summary = pd.DataFrame({
-        'Metric': ['UPI Volume', 'UPI Value', 'Credit Growth', 'Market Sentiment'],
-        'Current': [
-            data['upi'].iloc[-1]['Volume_Billion'] if not data['upi'].empty else 0,
-            data['upi'].iloc[-1]['Value_LakhCrore'] if not data['upi'].empty else 0,
-            data['rbi_credit']['Credit_Growth_%'].mean() if not data['rbi_credit'].empty else 0,
-            data['nse']['Change_%'].mean() if not data['nse'].empty else 0
-        ],
-        'Forecasted': [
-            data['upi'].iloc[-1]['Volume_Billion'] * 1.03 if not data['upi'].empty else 0,
-            data['upi'].iloc[-1]['Value_LakhCrore'] * 1.035 if not data['upi'].empty else 0,
-            data['rbi_credit']['Credit_Growth_%'].mean() * 1.02 if not data['rbi_credit'].empty else 0,
-            data['nse']['Change_%'].mean() * 0.9 if not data['nse'].empty else 0
-        ],
-        'Change_%': [3.0, 3.5, 2.0, -10.0]
+        'Metric': list(metrics),
+        'Current': [forecasts.get(metric, (0, 0))[0] for metric in metrics.values()],
+        'Forecasted': [forecasts.get(metric, (0, 0))[1] for metric in metrics.values()],
+        'Change_%': [float(figures[metric]['change_percent']) if metric in figures else 0.0
+                     for metric in metrics.values()]
     })
     
     csv = forecast_summary.to_csv(index=False)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the app's modules as `utils.<module>`, like the Streamlit pages do
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.anomaly_engine import MAD_SCALE, Z_THRESHOLD, _flagged, find_anomalies, robust_z
+
+
+def test_robust_z_scales_by_the_median_absolute_deviation():
+    frame = pd.DataFrame({'spiky': [1.0, 2.0, 3.0, 4.0, 100.0], 'flat': [5.0] * 5})
+    z = robust_z(frame)
+
+    # median 3, MAD 1
+    assert z['spiky'].tolist() == pytest.approx([-2 / MAD_SCALE, -1 / MAD_SCALE, 0.0, 1 / MAD_SCALE, 97 / MAD_SCALE])
+    assert z['flat'].isna().all()
+
+
+def _frame(values, index):
+    return pd.DataFrame(values, index=index, columns=pd.MultiIndex.from_tuples([('upi', 'Volume_Billion')]))
+
+
+def test_flagged_needs_both_the_score_and_the_gap():
+    index = ['2025-07', '2025-08', '2025-09', '2025-10']
+    z = _frame([0.5, Z_THRESHOLD + 1, -(Z_THRESHOLD + 2), Z_THRESHOLD + 3], index)
+    value = _frame([1.0, 12.0, 2.0, 30.0], index)
+    typical = _frame([10.0] * 4, index)
+
+    findings = _flagged('mom_break', z, value, typical, min_gap=5.0)
+    # 2025-07 scores too low; 2025-08 scores high but is only 2 from typical
+    assert [(f.where, f.value) for f in findings] == [('2025-09', 2.0), ('2025-10', 30.0)]
+    assert all(f.dataset == 'upi' and f.metric == 'Volume_Billion' for f in findings)
+
+    # Only the latest rows are checked when recent is given
+    assert [f.where for f in _flagged('mom_break', z, value, typical, recent=1, min_gap=5.0)] == ['2025-10']
+
+
+def test_find_anomalies_on_a_hand_built_panel():
+    months = pd.period_range('2023-01', '2025-06', freq='M').astype(str)
+    volume = 10.0 * 1.01 ** np.arange(len(months))
+    volume[-1] *= 1.3  # sudden jump in the latest month
+    data = {
+        'upi': pd.DataFrame({'Month': months, 'Volume_Billion': volume,
+                             'Value_LakhCrore': 15.0 * 1.01 ** np.arange(len(months))}),
+        'rbi_credit': pd.DataFrame({
+            'State': ['Assam', 'Bihar', 'Goa', 'Kerala', 'Punjab', 'Sikkim'],
+            'Credit_Growth_%': [10.0, 11.0, 12.0, 11.0, 10.0, 40.0],
+        }),
+    }
+
+    findings = find_anomalies(data)
+    keys = {(f.dataset, f.metric, f.where) for f in findings}
+    assert ('upi', 'Volume_Billion', '2025-06') in keys
+    assert ('rbi_credit', 'Credit_Growth_%', 'Sikkim') in keys
+    assert not any(f.metric == 'Value_LakhCrore' for f in findings)
+    assert [abs(f.score) for f in findings] == sorted((abs(f.score) for f in findings), reverse=True)
@@ -0,0 +1,33 @@
+import os
+import time
+
+from utils.answer_cache import TMP_MAX_AGE, AnswerCache
+
+
+def test_prune_keeps_writes_in_progress(tmp_path):
+    fresh = tmp_path / "a.123.deadbeef.tmp"
+    abandoned = tmp_path / "b.456.cafebabe.tmp"
+    fresh.write_text("{}", encoding='utf-8')
+    abandoned.write_text("{}", encoding='utf-8')
+    old = time.time() - TMP_MAX_AGE - 60
+    os.utime(abandoned, (old, old))
+
+    AnswerCache(disk_dir=tmp_path)
+
+    assert fresh.exists()
+    assert not abandoned.exists()
+
+
+def test_put_survives_a_failed_disk_write(tmp_path):
+    blocked = tmp_path / "not_a_directory"
+    blocked.write_text("", encoding='utf-8')
+    cache = AnswerCache(disk_dir=blocked)
+
+    cache.put('key', 'answer')
+    assert cache.get('key') == 'answer'
+
+
+def test_answers_round_trip_through_disk(tmp_path):
+    AnswerCache(disk_dir=tmp_path).put('key', 'answer')
+    assert AnswerCache(disk_dir=tmp_path).get('key') == 'answer'
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,43 @@
+from concurrent.futures import Future
+
+from utils.chat_memory import MAX_RECENT_MESSAGES, MIN_RECENT_MESSAGES, ChatMemory
+
+
+class WordCounter:
+    def estimate(self, text):
+        return len(text.split())
+
+
+def test_old_turns_are_evicted_to_disk_and_summarised(tmp_path):
+    memory = ChatMemory('conversation', counter=WordCounter(), recent_budget=1000, disk_dir=tmp_path)
+    for i in range(MAX_RECENT_MESSAGES + 2):
+        memory.add('user' if i % 2 == 0 else 'assistant', f"Message {i}. More detail follows.")
+
+    assert len(memory.messages) == MAX_RECENT_MESSAGES
+    assert memory.paged_out == 2
+    assert [m['content'] for m in memory.load_paged()] == ["Message 0. More detail follows.",
+                                                           "Message 1. More detail follows."]
+    assert memory.summary == "- User asked: Message 0.\n- Assistant answered: Message 1."
+    assert memory.prompt_history().startswith("Earlier in this conversation:\n- User asked: Message 0.")
+
+
+def test_token_budget_keeps_the_latest_exchange(tmp_path):
+    memory = ChatMemory('conversation', counter=WordCounter(), recent_budget=5, disk_dir=tmp_path)
+    for i in range(4):
+        memory.add('user', f"question number {i} with several words")
+
+    assert len(memory.messages) == MIN_RECENT_MESSAGES
+    assert memory.messages[-1]['content'] == "question number 3 with several words"
+
+
+def test_summarizer_result_replaces_the_extractive_summary(tmp_path):
+    future = Future()
+    memory = ChatMemory('conversation', counter=WordCounter(), recent_budget=5, disk_dir=tmp_path,
+                        summarizer=lambda previous, turns: future)
+    for i in range(3):
+        memory.add('user', f"question number {i} with several words")
+    assert memory.summary.startswith("- User asked")
+
+    future.set_result("User is comparing question numbers.")
+    memory.prompt_history()
+    assert memory.summary == "User is comparing question numbers."
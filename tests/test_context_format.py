@@ -0,0 +1,48 @@
+import csv
+import io
+
+import pandas as pd
+import pytest
+
+from utils.context_format import KEYFRAME_EVERY, encode_table
+
+
+def _decode_delta(text):
+    """Rebuild absolute values from a delta-encoded table"""
+    lines = [line for line in text.splitlines() if not line.startswith('(')]
+    rows = list(csv.reader(io.StringIO("\n".join(lines))))
+    header, body = rows[0], rows[1:]
+    values, previous = [], None
+    for i, row in enumerate(body):
+        if i % KEYFRAME_EVERY == 0:
+            current = [float(cell) for cell in row[1:]]
+        else:
+            current = [p + float(cell) for p, cell in zip(previous, row[1:])]
+        values.append([row[0]] + current)
+        previous = current
+    return header, values
+
+
+def test_delta_encoding_round_trips_to_the_rounded_values():
+    df = pd.DataFrame({
+        'Month': [f"2025-{m:02d}" for m in range(1, 13)],
+        'Volume_Billion': [16.63, 16.11, 18.3, 17.89, 18.68, 18.4, 19.47, 20.01, 19.63, 20.7, 21.55, 20.99],
+        'Value_LakhCrore': [23.48, 21.96, 24.77, 23.95, 25.14, 24.04, 25.08, 24.85, 24.9, 27.28, 26.32, 27.97],
+    })
+
+    header, values = _decode_delta(encode_table(df, fmt='delta', precision=2))
+
+    assert header == ['Month', 'Volume (bn txns)', 'Value (₹ lakh cr)']
+    for decoded, (_, row) in zip(values, df.iterrows()):
+        assert decoded[0] == row['Month']
+        assert decoded[1:] == pytest.approx([round(row['Volume_Billion'], 2), round(row['Value_LakhCrore'], 2)], abs=1e-9)
+
+
+def test_compact_hoists_units_and_trims_zeros():
+    df = pd.DataFrame({'State': ['Goa, North'], 'CD_Ratio': [980.0]})
+    assert encode_table(df, fmt='compact') == 'State,CD ratio (%)\n"Goa, North",980'
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        encode_table(pd.DataFrame({'a': [1]}), fmt='yaml')
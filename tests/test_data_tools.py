@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from utils.data_tools import DataTools
+
+
+@pytest.fixture
+def tools():
+    return DataTools({
+        'rbi_credit': pd.DataFrame({
+            'State': ['Assam', 'Karnataka', 'Kerala'],
+            'Credit_Growth_%': [21.0, 15.0, 12.0],
+            'As_Of_Date': ['2025-09-30'] * 3,
+        }),
+    })
+
+
+def test_json_numbers_are_coerced_to_the_annotated_types(tools):
+    result = tools.call('top_states', {'metric': 'Credit_Growth_%', 'n': 2.0, 'unexpected': 'ignored'})
+    assert result['states'] == [['Assam', 21.0], ['Karnataka', 15.0]]
+
+
+@pytest.mark.parametrize('name, args, message', [
+    ('top_states', {'metric': 'Credit_Growth_%', 'n': 'many'}, "Argument n must be int"),
+    ('top_states', {'metric': 'Nonexistent'}, "Unknown metric Nonexistent"),
+    ('compare_state', {'state': 'Atlantis', 'metric': 'Credit_Growth_%'}, "Unknown state Atlantis"),
+    ('get_latest', {'dataset': 'upi'}, "Dataset upi is not loaded"),
+    ('drop_tables', {}, "Unknown function drop_tables"),
+])
+def test_bad_arguments_return_an_error_instead_of_raising(tools, name, args, message):
+    result = tools.call(name, args)
+    assert message in result['error']
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from utils.dbie_ingest import credit_history, normalize_indicator
+
+
+def test_normalize_indicator_drops_units():
+    assert normalize_indicator("Credit (Rs. Crore)") == "credit"
+    assert normalize_indicator("Aggregate Deposits (₹ crore)") == "aggregate deposits"
+    assert normalize_indicator("Credit-Deposit Ratio (%)") == "credit deposit ratio"
+
+
+def test_ratio_and_count_indicators_are_not_summed_into_amounts():
+    records = pd.DataFrame([
+        ('Karnataka', '2024-03-31', 'Credit (Rs. Crore)', 800.0),
+        ('Karnataka', '2024-03-31', 'Deposits (Rs. Crore)', 1000.0),
+        ('Karnataka', '2024-03-31', 'Credit-Deposit Ratio (%)', 80.0),
+        ('Karnataka', '2024-03-31', 'Number of Credit Accounts', 5000.0),
+        ('Karnataka', '2024-03-31', 'Deposit Growth (%)', 9.0),
+        ('Karnataka', '2025-03-31', 'Credit (Rs. Crore)', 880.0),
+        ('Karnataka', '2025-03-31', 'Deposits (Rs. Crore)', 1100.0),
+        ('Karnataka', '2025-03-31', 'Credit-Deposit Ratio (%)', 80.0),
+    ], columns=['State', 'Period', 'Indicator', 'Value'])
+
+    history = credit_history(records, ['State'])
+
+    assert history['Credit_Crore'].tolist() == [800.0, 880.0]
+    assert history['Deposit_Crore'].tolist() == [1000.0, 1100.0]
+    assert history['CD_Ratio'].tolist() == [80.0, 80.0]
+    assert history['Credit_Growth_%'].iloc[-1] == 10.0
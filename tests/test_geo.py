@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from utils import geo
+
+
+SQUARE = {'type': 'FeatureCollection', 'features': [{
+    'type': 'Feature', 'properties': {'ST_NM': 'Goa'},
+    'geometry': {'type': 'Polygon', 'coordinates': [[[73.7, 15.0], [74.3, 15.0], [74.3, 15.8], [73.7, 15.8], [73.7, 15.0]]]}
+}]}
+
+
+@pytest.fixture
+def asset(tmp_path, monkeypatch):
+    path = tmp_path / "india_states.geojson"
+    monkeypatch.setattr(geo, 'STATES_ASSET', path)
+    monkeypatch.setattr(geo, 'cache_dir', lambda namespace: tmp_path)
+    monkeypatch.setattr(geo, '_state_geojson_cache', {})
+    return path
+
+
+def test_missing_asset_fails_clearly_and_is_not_cached(asset):
+    with pytest.raises(geo.StateBoundariesMissing, match="--vendor"):
+        geo.load_state_geojson()
+
+    asset.write_text(json.dumps(SQUARE), encoding='utf-8')
+    states = geo.load_state_geojson()
+    assert states['features'][0]['properties']['ST_NM'] == 'Goa'
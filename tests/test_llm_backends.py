@@ -0,0 +1,20 @@
+import pytest
+
+from utils.llm_backends import BackendConfigError, StubBackend, get_backend
+
+
+def test_missing_gemini_key_raises_config_error(monkeypatch):
+    monkeypatch.setenv("PULSEAI_LLM_BACKEND", "gemini")
+    with pytest.raises(BackendConfigError, match="GEMINI_API_KEY"):
+        get_backend(None)
+
+
+def test_unknown_backend_raises_config_error(monkeypatch):
+    monkeypatch.setenv("PULSEAI_LLM_BACKEND", "nope")
+    with pytest.raises(BackendConfigError, match="nope"):
+        get_backend("key")
+
+
+def test_stub_backend_needs_no_key(monkeypatch):
+    monkeypatch.setenv("PULSEAI_LLM_BACKEND", "stub")
+    assert isinstance(get_backend(None), StubBackend)
@@ -0,0 +1,61 @@
+from collections import deque
+
+from utils.llm_scheduler import LLMScheduler, Ticket, PRIORITY_INTERACTIVE
+
+
+class HookLimiter:
+    """Grants every request; runs a one-off hook inside try_acquire, between _peek and _pop"""
+
+    rpm = 60
+
+    def __init__(self):
+        self.hook = None
+
+    def try_acquire(self, tokens):
+        hook, self.hook = self.hook, None
+        if hook:
+            hook()
+        return 0.0
+
+
+class ClosedLimiter:
+    """Never grants, so the dispatcher leaves the queues to the test"""
+
+    rpm = 60
+
+    def try_acquire(self, tokens):
+        return 60.0
+
+
+def test_requeue_between_peek_and_pop_dispatches_each_ticket_once():
+    limiter = HookLimiter()
+    scheduler = LLMScheduler(limiter=limiter)
+    retrying = Ticket(lambda: "retried", PRIORITY_INTERACTIVE, 'session', 10, stream=False)
+    retrying.status = 'running'
+    # An executor thread puts a failed ticket back while the dispatcher holds the peeked head
+    limiter.hook = lambda: scheduler._requeue(retrying, 0)
+
+    first = scheduler.submit(lambda: "first", session_id='session')
+    second = scheduler.submit(lambda: "second", session_id='session')
+
+    assert first.result(timeout=5) == "first"
+    assert second.result(timeout=5) == "second"
+    assert retrying.future.result(timeout=5) == "retried"
+    assert scheduler.queue_depths()['interactive'] == 0
+    assert scheduler.stats['failed'] == 0
+
+
+def test_pop_removes_the_peeked_ticket_not_the_new_head():
+    scheduler = LLMScheduler(limiter=ClosedLimiter())
+    peeked = Ticket(lambda: None, PRIORITY_INTERACTIVE, 'session', 10, stream=False)
+    retrying = Ticket(lambda: None, PRIORITY_INTERACTIVE, 'session', 10, stream=False)
+    retrying.status = 'running'
+    with scheduler._lock:
+        scheduler._queues[PRIORITY_INTERACTIVE]['session'] = deque([peeked])
+    scheduler._requeue(retrying, 0)
+
+    scheduler._pop(peeked)
+
+    assert peeked.status == 'running'
+    assert retrying.status == 'queued'
+    assert list(scheduler._queues[PRIORITY_INTERACTIVE]['session']) == [retrying]
@@ -0,0 +1,77 @@
+import threading
+
+from utils.prefix_cache import PrefixCache
+
+
+class FakeBackend:
+    model_name = 'fake-model'
+    min_cache_tokens = 10
+
+    def __init__(self):
+        self.created = []
+        self.release = threading.Event()
+
+    def create_cache(self, system_instruction, content, ttl):
+        self.release.wait(timeout=5)
+        self.created.append(content)
+        return f"cachedContents/{len(self.created)}"
+
+    def refresh_cache(self, name, ttl):
+        pass
+
+    def delete_cache(self, name):
+        pass
+
+
+class FakeCounter:
+    def count(self, text, exact=False):
+        return len(text)
+
+    def estimate(self, text):
+        return len(text)
+
+
+class InlineScheduler:
+    """Runs submitted jobs on a thread, like the scheduler's executor"""
+
+    def __init__(self):
+        self.threads = []
+
+    def submit(self, fn, **kwargs):
+        thread = threading.Thread(target=fn)
+        thread.start()
+        self.threads.append(thread)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+
+def test_get_falls_back_until_the_background_build_finishes(tmp_path):
+    backend, scheduler = FakeBackend(), InlineScheduler()
+    cache = PrefixCache(backend, FakeCounter(), scheduler, path=tmp_path / "registry.json")
+
+    # Creation is still blocked upstream, so callers get the full-prompt fallback immediately
+    assert cache.get("system", "a long dataset context", version="v1") is None
+    assert cache.get("system", "a long dataset context", version="v1") is None
+    backend.release.set()
+    scheduler.join()
+
+    assert cache.get("system", "a long dataset context", version="v1") == "cachedContents/1"
+    assert len(backend.created) == 1
+    assert cache.stats()['creates'] == 1
+
+
+def test_registry_keeps_prefixes_created_by_other_processes(tmp_path):
+    path = tmp_path / "registry.json"
+    first_backend, second_backend = FakeBackend(), FakeBackend()
+    first_backend.release.set()
+    second_backend.release.set()
+    first = PrefixCache(first_backend, FakeCounter(), path=path)
+    second = PrefixCache(second_backend, FakeCounter(), path=path)
+
+    first.build("system", "context for the first worker")
+    second.build("system", "context for the second worker")
+
+    reader = PrefixCache(FakeBackend(), FakeCounter(), path=path)
+    assert reader.stats()['prefixes'] == 2
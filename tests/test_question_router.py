@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from utils.question_router import route_question
+
+
+@pytest.fixture
+def data():
+    months = pd.period_range('2024-01', '2025-10', freq='M').astype(str)
+    return {
+        'upi': pd.DataFrame({
+            'Month': months,
+            'Volume_Billion': [12.0 + 0.2 * i for i in range(len(months))],
+            'Value_LakhCrore': [18.0 + 0.1 * i for i in range(len(months))],
+            'Avg_Transaction_Size': [1500.0] * len(months),
+        }),
+        'rbi_policy': pd.DataFrame({
+            'Date': ['2023-02-08', '2025-02-07', '2025-06-06'],
+            'Repo_Rate': [6.5, 6.25, 5.5],
+            'Reverse_Repo': [3.35, 3.35, 3.35],
+            'CRR': [4.5, 4.0, 3.0],
+            'SLR': [18.0, 18.0, 18.0],
+            'Policy_Stance': ['Withdrawal of accommodation', 'Neutral', 'Neutral'],
+        }),
+        'nse': pd.DataFrame({
+            'Symbol': ['TCS', 'INFY', 'RELIANCE'],
+            'LTP': [4100.0, 1800.0, 2900.0],
+            'Change_%': [1.2, -0.8, 0.3],
+            'High': [4120.0, 1820.0, 2910.0],
+            'Low': [4050.0, 1790.0, 2880.0],
+            'Date': ['2025-10-17'] * 3,
+        }),
+        'rbi_credit': pd.DataFrame({
+            'State': ['Assam', 'Karnataka', 'Tamil Nadu', 'Kerala'],
+            'Credit_Crore': [80000.0, 900000.0, 1100000.0, 400000.0],
+            'Deposit_Crore': [150000.0, 1300000.0, 1200000.0, 700000.0],
+            'Credit_Growth_%': [21.0, 15.0, 14.0, 12.0],
+            'Deposit_Growth_%': [11.0, 10.0, 9.0, 8.0],
+            'CD_Ratio': [53.0, 69.0, 92.0, 57.0],
+            'Digital_Adoption_%': [55.0, 82.0, 78.0, 80.0],
+            'UPI_Volume_Crore': [40.0, 300.0, 280.0, 120.0],
+            'As_Of_Date': ['2025-09-30'] * 4,
+        }),
+        'mutual_funds': pd.DataFrame({
+            'Month': ['2025-10'] * 2,
+            'Category': ['Equity', 'Debt'],
+            'AUM_LakhCrore': [33.0, 17.0],
+            'Accounts_Lakh': [1500.0, 90.0],
+        }),
+    }
+
+
+@pytest.mark.parametrize('question', [
+    "What is the interest rate on savings accounts in SBI?",   # unknown product and bank
+    "What was the highest repo rate in 2023?",                 # superlative over history, and a year
+    "Is TCS a good buy?",                                      # advice
+    "What is the digital payment share of UPI?",               # a metric no template computes
+    "Most credit growth state in the south?",                  # region qualifier
+    "What was UPI volume in 2023?",                            # year without a month
+    "What was the repo rate in Oct 2023?",                     # past month; only the latest rate is templated
+    "TCS share price in Oct 2024",                             # past quote; only the latest session is loaded
+    "Karnataka credit growth in Mar 2024",                     # past period of the state figures
+])
+def test_qualified_questions_go_to_the_llm(data, question):
+    assert route_question(question, data) is None
+
+
+@pytest.mark.parametrize('question, expected', [
+    ("What is the latest UPI transaction volume?", "2025-10"),
+    ("What was UPI volume in Oct 2024?", "2024-10"),
+    ("Which state has the highest credit growth?", "Assam"),
+    ("Top 2 states by digital adoption", "Kerala"),
+    ("Karnataka credit growth", "Karnataka"),
+    ("What is the current repo rate?", "5.5%"),
+    ("TCS share price", "TCS"),
+    ("What is the total mutual fund AUM?", "50.00"),
+    ("UPI का महीने का वॉल्यूम क्या है?", "2025-10"),
+])
+def test_plain_lookups_are_answered_directly(data, question, expected):
+    answer = route_question(question, data)
+    assert answer is not None and expected in answer
@@ -0,0 +1,29 @@
+from utils.retrieval import BM25Index, Passage, tokenize
+
+
+def _passage(text):
+    return Passage('docs', 'test', text)
+
+
+def test_bm25_ranks_by_term_rarity_and_frequency():
+    index = BM25Index([
+        _passage("UPI volume rose in October as festive payments peaked"),
+        _passage("Repo rate held at 5.5 percent by the monetary policy committee"),
+        _passage("Karnataka credit growth outpaced deposit growth"),
+        _passage("Credit growth credit growth in Kerala and credit demand"),
+    ])
+
+    results = index.search("kerala credit growth", k=3)
+    assert [p.text.split()[0] for p, _ in results] == ["Credit", "Karnataka"]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_bm25_returns_nothing_without_a_matching_term():
+    index = BM25Index([_passage("UPI volume rose in October")])
+    assert index.search("sensex") == []
+
+
+def test_hindi_terms_match_english_passages():
+    assert tokenize("रेपो दर क्या है?") == ['repo', 'rate']
+    index = BM25Index([_passage("Repo rate held at 5.5 percent"), _passage("UPI volume rose")])
+    assert index.search("रेपो दर")[0][0].text.startswith("Repo")
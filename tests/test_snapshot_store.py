@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from utils import columnar_store
+from utils.snapshot_store import SNAPSHOT_DATASET, append_snapshot, backfill_snapshots, snapshot_dates
+from utils.columnar_store import read_dataset
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar_store, 'STORE_DIR', tmp_path)
+
+
+def _snapshot(date):
+    return read_dataset(SNAPSHOT_DATASET, filters={'As_Of_Date': date}).set_index('State')
+
+
+def test_overlaid_rows_are_filed_under_their_own_period():
+    backfill_snapshots(pd.DataFrame({
+        'State': ['Kerala', 'Goa'], 'Period': ['2025-03-31'] * 2, 'Credit_Crore': [400.0, 50.0],
+    }))
+    # Kerala carries the DBIE period's figures, Assam the refresh date's
+    append_snapshot(pd.DataFrame({
+        'State': ['Kerala', 'Assam'], 'Credit_Crore': [410.0, 80.0], 'CD_Ratio': [57.0, 53.0],
+        'As_Of_Date': ['2025-03-31', '2025-09-30'],
+    }))
+
+    assert snapshot_dates() == ['2025-03-31', '2025-09-30']
+    assert list(_snapshot('2025-09-30').index) == ['Assam']
+    dbie = _snapshot('2025-03-31')
+    assert sorted(dbie.index) == ['Goa', 'Kerala']
+    assert dbie.loc['Kerala', 'Credit_Crore'] == 410.0
+    assert dbie.loc['Goa', 'Credit_Crore'] == 50.0
@@ -0,0 +1,35 @@
+from utils.stream_renderer import CURSOR, StreamRenderer
+
+
+class FakeElement:
+    def __init__(self):
+        self.body = None
+
+    def markdown(self, text):
+        self.body = text
+
+    def caption(self, text):
+        self.body = text
+
+
+class FakeContainer:
+    def __init__(self):
+        self.elements = []
+
+    def empty(self):
+        self.elements.append(FakeElement())
+        return self.elements[-1]
+
+
+def test_finished_paragraphs_are_frozen_outside_code_fences():
+    container = FakeContainer()
+    renderer = StreamRenderer(container, fps=1e9)
+
+    renderer.feed("First paragraph.\n\n```\ncode\n\nstill code")
+    renderer.feed("\n```\n\nLast")
+    assert [e.body for e in container.elements] == [
+        "First paragraph.\n\n", "```\ncode\n\nstill code\n```\n\n", f"Last{CURSOR}"
+    ]
+
+    assert renderer.finish() == "First paragraph.\n\n```\ncode\n\nstill code\n```\n\nLast"
+    assert container.elements[-1].body == "Last"
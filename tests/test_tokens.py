@@ -0,0 +1,30 @@
+from utils.tokens import Section, pack_sections
+
+
+class WordCounter:
+    def count(self, text, exact=False):
+        return len(text.split())
+
+    estimate = count
+
+
+def test_pack_sections_fits_the_budget_in_priority_order():
+    sections = [
+        Section('examples', "one two three four five six", priority=3),
+        Section('upi', "upi one two three", priority=1, relevance=0.5),
+        Section('nse', "nse one two", priority=2),
+        Section('policy', "policy one two three", priority=1, relevance=0.9),
+    ]
+
+    text, included, dropped = pack_sections(sections, budget=10, counter=WordCounter())
+
+    # Both priority-1 sections (8 words) fit; nse (3 more) and examples would overflow
+    assert included == ['upi', 'policy']
+    assert dropped == ['examples', 'nse']
+    assert text == "upi one two three\n\npolicy one two three"
+
+
+def test_pack_sections_skips_a_section_too_large_for_what_is_left():
+    sections = [Section('big', "a b c d e f", priority=1), Section('small', "x y", priority=2)]
+    _, included, dropped = pack_sections(sections, budget=4, counter=WordCounter())
+    assert included == ['small'] and dropped == ['big']
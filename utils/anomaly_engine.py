@@ -0,0 +1,166 @@
+"""
+PulseAI - Anomaly Engine
+Vectorized statistical anomaly detection over every loaded series at once.
+Deterministic and local; only the findings are passed to the LLM for narration.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+Z_THRESHOLD = 3.5      # robust z cut-off (Iglewicz & Hoaglin)
+MAD_SCALE = 1.4826     # scales the MAD to the standard deviation under normality
+SEASON = 12            # months
+MIN_SEASONAL_POINTS = 2 * SEASON
+RECENT_PERIODS = 6     # time series findings are reported for the latest months only
+MAX_FINDINGS = 8
+# Smallest deviation worth reporting, so near-constant series don't flag tiny moves
+MIN_GROWTH_GAP = 5.0        # percentage points from the typical MoM/YoY growth
+MIN_SEASONAL_GAP = 0.05     # 5% from the trend x seasonal expectation
+
+# Dataset -> (entity column, metrics compared across entities)
+CROSS_SECTIONS = {
+    'rbi_credit': ('State', ['Credit_Growth_%', 'Deposit_Growth_%', 'CD_Ratio', 'Digital_Adoption_%']),
+    'nse': ('Symbol', ['Change_%']),
+}
+
+DATASET_LABELS = {
+    'upi': "UPI",
+    'mutual_funds': "Mutual fund",
+    'rbi_credit': "State banking",
+    'nse': "NSE",
+}
+
+Finding = namedtuple('Finding', ['kind', 'dataset', 'metric', 'where', 'value', 'typical', 'score'])
+
+
+def robust_z(frame):
+    """Column-wise (x - median) / (1.4826 * MAD); NaN for columns without spread"""
+    deviation = frame.sub(frame.median())
+    mad = deviation.abs().median() * MAD_SCALE
+    return deviation.div(mad.replace(0, np.nan))
+
+
+def _medians_like(frame):
+    """Frame of the same shape holding each column's median"""
+    return pd.DataFrame(np.broadcast_to(frame.median().to_numpy(), frame.shape),
+                        index=frame.index, columns=frame.columns)
+
+
+def monthly_panel(data_dict):
+    """Every monthly series as one column of a (YYYY-MM x (dataset, metric)) frame"""
+    frames = []
+    upi = data_dict.get('upi')
+    if isinstance(upi, pd.DataFrame) and not upi.empty:
+        frame = upi.set_index('Month').select_dtypes('number')
+        frame.columns = pd.MultiIndex.from_product([['upi'], frame.columns])
+        frames.append(frame)
+
+    mf = data_dict.get('mutual_funds')
+    if isinstance(mf, pd.DataFrame) and not mf.empty:
+        values = list(mf.select_dtypes('number').columns)
+        frame = mf.pivot_table(index='Month', columns='Category', values=values, aggfunc='sum')
+        frame.columns = pd.MultiIndex.from_tuples(
+            [('mutual_funds', f"{category} {value}") for value, category in frame.columns]
+        )
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame()
+    panel = pd.concat(frames, axis=1).sort_index().astype(float)
+    panel.index = panel.index.astype(str)
+    return panel
+
+
+def _flagged(kind, z, value, typical, recent=None, min_gap=0.0, relative=False):
+    """Findings where |z| exceeds the threshold and value is at least min_gap from typical
+
+    The gap is absolute, or a fraction of typical when relative. Only the last
+    `recent` rows are checked when given.
+    """
+    if recent:
+        z, value, typical = z.tail(recent), value.tail(recent), typical.tail(recent)
+    scores = z.to_numpy(dtype=float)
+    values = value.to_numpy(dtype=float)
+    typicals = typical.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gaps = np.abs(values / typicals - 1) if relative else np.abs(values - typicals)
+    rows, cols = np.nonzero((np.abs(np.nan_to_num(scores)) > Z_THRESHOLD) & (np.nan_to_num(gaps) >= min_gap))
+    return [
+        Finding(kind, z.columns[c][0], z.columns[c][1], str(z.index[r]),
+                float(values[r, c]), float(typicals[r, c]), float(scores[r, c]))
+        for r, c in zip(rows, cols)
+    ]
+
+
+def _time_series_findings(panel):
+    if panel.empty:
+        return []
+    findings = []
+
+    # MoM and YoY breaks: growth rates far from the series' own typical growth
+    for kind, periods in (('mom_break', 1), ('yoy_break', SEASON)):
+        growth = panel.pct_change(periods, fill_method=None) * 100
+        findings += _flagged(kind, robust_z(growth), growth, _medians_like(growth), RECENT_PERIODS, MIN_GROWTH_GAP)
+
+    # Multiplicative decomposition: centred 12-month trend x median seasonal factor per calendar month
+    trend = panel.rolling(SEASON, center=True, min_periods=SEASON // 2).mean()
+    ratio = panel / trend
+    seasonal = ratio.groupby(panel.index.str[5:7]).transform('median')
+    residual_z = robust_z(ratio - seasonal)
+    residual_z.loc[:, panel.count() < MIN_SEASONAL_POINTS] = np.nan
+    findings += _flagged('seasonal_residual', residual_z, panel, trend * seasonal, RECENT_PERIODS,
+                         MIN_SEASONAL_GAP, relative=True)
+    return findings
+
+
+def _cross_section_findings(data_dict, panel):
+    findings = []
+    for dataset, (entity, metrics) in CROSS_SECTIONS.items():
+        df = data_dict.get(dataset)
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            continue
+        frame = df.set_index(entity)[[m for m in metrics if m in df]].astype(float)
+        frame.columns = pd.MultiIndex.from_product([[dataset], frame.columns])
+        findings += _flagged('cross_section', robust_z(frame), frame, _medians_like(frame))
+
+    # Latest month's AUM growth compared across fund categories
+    if 'mutual_funds' in panel.columns.get_level_values(0) and len(panel) > 1:
+        aum = panel['mutual_funds'].filter(like='AUM')
+        latest = aum.pct_change(fill_method=None).iloc[[-1]] * 100
+        frame = latest.T.rename(columns=lambda _: f"AUM growth % ({aum.index[-1]})")
+        frame.index = [name.replace(' AUM_LakhCrore', '') for name in frame.index]
+        frame.columns = pd.MultiIndex.from_product([['mutual_funds'], frame.columns])
+        findings += _flagged('cross_section', robust_z(frame), frame, _medians_like(frame))
+    return findings
+
+
+def find_anomalies(data_dict, max_findings=MAX_FINDINGS):
+    """Strongest anomalies across all datasets, most extreme first
+
+    Each (dataset, metric, period or entity) is reported once, by the
+    detector that scored it highest.
+    """
+    panel = monthly_panel(data_dict)
+    strongest = {}
+    for finding in _time_series_findings(panel) + _cross_section_findings(data_dict, panel):
+        key = (finding.dataset, finding.metric, finding.where)
+        if key not in strongest or abs(finding.score) > abs(strongest[key].score):
+            strongest[key] = finding
+    return sorted(strongest.values(), key=lambda f: -abs(f.score))[:max_findings]
+
+
+def describe(finding):
+    """One-line plain description of a finding, used as-is when no LLM is available"""
+    label = f"{DATASET_LABELS.get(finding.dataset, finding.dataset)} {finding.metric.replace('_', ' ')}"
+    if finding.kind == 'mom_break':
+        text = f"{label} moved {finding.value:+.1f}% month-on-month in {finding.where}, against a typical {finding.typical:+.1f}%"
+    elif finding.kind == 'yoy_break':
+        text = f"{label} moved {finding.value:+.1f}% year-on-year in {finding.where}, against a typical {finding.typical:+.1f}%"
+    elif finding.kind == 'seasonal_residual':
+        text = (f"{label} was {finding.value:,.2f} in {finding.where}, "
+                f"against {finding.typical:,.2f} expected from its trend and seasonality")
+    else:
+        text = f"{finding.where} stands out on {label}: {finding.value:,.2f} against a median of {finding.typical:,.2f}"
+    return f"{text} (robust z {finding.score:+.1f})"
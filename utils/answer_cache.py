@@ -0,0 +1,172 @@
+"""
+PulseAI - Chat Answer Cache
+LRU + TTL cache of generated answers, optionally persisted to disk
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+ANSWER_CACHE_DIR = Path(__file__).parent.parent / "data" / "processed" / "answer_cache"
+MAX_ENTRIES = 512
+TTL_SECONDS = 6 * 3600  # answers are also invalidated by the data version in the key
+PERSIST_TO_DISK = os.getenv("PULSEAI_ANSWER_DISK_CACHE", "1") == "1"
+REPLAY_CHUNK_CHARS = 24
+TMP_MAX_AGE = 600  # seconds; older .tmp files were left by a writer that died mid-write
+
+PUNCTUATION_PATTERN = re.compile(r'[^\wऀ-ॿ\s]')
+
+
+def normalize_question(question):
+    """Case, width, punctuation and whitespace insensitive form of a question"""
+    text = unicodedata.normalize('NFKC', str(question)).lower().replace('।', ' ')
+    text = PUNCTUATION_PATTERN.sub(' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def answer_key(question, data_version, prompt_version, model=''):
+    raw = f"{model}|{prompt_version}|{data_version}|{normalize_question(question)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def replay_stream(text, chunk_chars=REPLAY_CHUNK_CHARS):
+    """Yield a cached answer in small chunks so it renders like a live stream"""
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
+
+
+class AnswerCache:
+    """Thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, disk_dir=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.disk_dir and self.disk_dir.exists():
+            self._prune_disk()
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.json"
+
+    def _prune_disk(self):
+        """Drop expired files and keep at most max_entries, including files left by earlier processes"""
+        now = time.time()
+        files = []
+        for path in self.disk_dir.glob("*.json"):
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            # Files are written once, when the entry is created
+            if now - mtime > self.ttl:
+                path.unlink(missing_ok=True)
+            else:
+                files.append((mtime, path))
+        for _, stale in sorted(files, reverse=True)[self.max_entries:]:
+            stale.unlink(missing_ok=True)
+        # Younger .tmp files may be another worker's write in progress
+        for leftover in self.disk_dir.glob("*.tmp"):
+            try:
+                if now - leftover.stat().st_mtime > TMP_MAX_AGE:
+                    leftover.unlink(missing_ok=True)
+            except OSError:
+                continue
+
+    def _is_expired(self, key, entry):
+        """True for an entry past its TTL, whose disk file is then deleted"""
+        if time.time() - entry['created'] <= self.ttl:
+            return False
+        if self.disk_dir:
+            self._disk_path(key).unlink(missing_ok=True)
+        return True
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir or not self._disk_path(key).exists():
+            return None
+        try:
+            return json.loads(self._disk_path(key).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key):
+        """Cached answer text, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+
+        if entry is None or self._is_expired(key, entry):
+            with self._lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self.hits += 1
+        return entry['answer']
+
+    def contains(self, key):
+        """Whether key has a live entry, without counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+        return entry is not None and not self._is_expired(key, entry)
+
+    def put(self, key, answer):
+        entry = {'answer': answer, 'created': time.time()}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        if self.disk_dir:
+            # Per-writer temporary name, so two processes storing the same key never share one
+            tmp_path = self.disk_dir / f"{key}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding='utf-8')
+                tmp_path.replace(self._disk_path(key))
+            except OSError:
+                # The answer is still cached in memory; a failed disk write must not fail it
+                try:
+                    tmp_path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            if self.disk_dir:
+                self._disk_path(key).unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+_answer_cache = AnswerCache(disk_dir=ANSWER_CACHE_DIR if PERSIST_TO_DISK else None)
+
+
+def get_answer_cache():
+    """Process-wide answer cache"""
+    return _answer_cache
@@ -0,0 +1,144 @@
+"""
+PulseAI - Chart Insights
+AI insights for Dashboard and Map charts, keyed by a fingerprint of each chart's data and generated in the background
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import streamlit as st
+
+from .answer_cache import AnswerCache
+
+INSIGHT_CACHE_DIR = Path(__file__).parent.parent / "data" / "processed" / "insight_cache"
+MAX_ENTRIES = 256
+TTL_SECONDS = 7 * 24 * 3600  # keys change with the data, so entries only expire to bound the disk
+MAX_SUMMARY_ROWS = 30
+RETRY_SECONDS = 300  # wait before retrying a pre-generation whose request failed
+
+# Map page metrics (column -> label), all pre-generated for the map panel
+MAP_METRICS = {
+    'Credit_Growth_%': "Credit Growth %",
+    'Deposit_Growth_%': "Deposit Growth %",
+    'CD_Ratio': "CD Ratio",
+    'Digital_Adoption_%': "Digital Adoption %",
+    'UPI_Volume_Crore': "UPI Volume",
+}
+HEATMAP_COLUMNS = ['State', 'Credit_Growth_%', 'Deposit_Growth_%', 'CD_Ratio', 'Digital_Adoption_%']
+
+_insight_cache = AnswerCache(max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, disk_dir=INSIGHT_CACHE_DIR)
+
+# Chart-set fingerprint -> time its background generation started
+_pregenerating = {}
+_pregen_lock = threading.Lock()
+
+
+def get_insight_cache():
+    """Process-wide chart insight cache, persisted so restarts spend no quota on unchanged data"""
+    return _insight_cache
+
+
+def summarize_frame(frame, max_rows=MAX_SUMMARY_ROWS):
+    """The data behind a chart as compact CSV; its hash is the chart's fingerprint in the cache key"""
+    return frame.head(max_rows).round(2).to_csv(index=False)
+
+
+def dashboard_charts(data):
+    """Dashboard chart id -> (chart type, frame plotted)"""
+    charts = {}
+    if not data['upi'].empty:
+        charts['dashboard/upi_trend'] = (
+            "UPI monthly transaction volume trend (area chart)",
+            data['upi'][['Month', 'Volume_Billion']].tail(24)
+        )
+    if not data['rbi_credit'].empty:
+        charts['dashboard/top_credit_states'] = (
+            "Top 5 states by credit growth (bar chart)",
+            data['rbi_credit'].nlargest(5, 'Credit_Growth_%')[['State', 'Credit_Growth_%']]
+        )
+    if not data['nse'].empty:
+        charts['dashboard/nse_performers'] = (
+            "NSE top performers by daily change (bar chart)",
+            data['nse'][['Symbol', 'Change_%']]
+        )
+    if not data['mutual_funds'].empty:
+        mf = data['mutual_funds']
+        charts['dashboard/mf_aum'] = (
+            "Mutual fund AUM by category for the latest month (donut chart)",
+            mf[mf['Month'] == mf['Month'].max()][['Category', 'AUM_LakhCrore']]
+        )
+    return charts
+
+
+def map_charts(state_frame):
+    """Map chart id -> (chart type, frame plotted) for every selectable metric"""
+    if state_frame.empty:
+        return {}
+    charts = {}
+    for column, label in MAP_METRICS.items():
+        if column in state_frame and state_frame[column].notna().any():
+            charts[f"map/{column}"] = (
+                f"{label} across Indian states (choropleth map with top 10 ranking)",
+                state_frame[['State', column]].dropna().sort_values(column, ascending=False)
+            )
+    if set(HEATMAP_COLUMNS) <= set(state_frame.columns):
+        charts['map/heatmap'] = (
+            "Credit growth, deposit growth, CD ratio and digital adoption of the top 15 states by credit growth (heatmap)",
+            state_frame.nlargest(15, 'Credit_Growth_%')[HEATMAP_COLUMNS]
+        )
+    return charts
+
+
+def _pregenerate(rag, charts):
+    """Generate missing insights on a daemon thread, at most once per chart set until RETRY_SECONDS pass"""
+    fingerprint = hash(tuple(sorted(charts.items())))
+    now = time.time()
+    with _pregen_lock:
+        if now - _pregenerating.get(fingerprint, 0) < RETRY_SECONDS:
+            return
+        _pregenerating[fingerprint] = now
+        for stale in [k for k, started in _pregenerating.items() if now - started >= RETRY_SECONDS]:
+            del _pregenerating[stale]
+
+    threading.Thread(
+        target=rag.get_chart_insights_batch,
+        args=(charts,),
+        kwargs={'cache': _insight_cache},
+        name="insight-pregen",
+        daemon=True
+    ).start()
+
+
+def load_insights(data, state_frame=None):
+    """Cached insights for every Dashboard and Map chart, without waiting on the API
+
+    Charts whose data changed since the last refresh are generated in the
+    background (one batched request, lowest priority) and appear on a later
+    rerun. Returns None when the LLM is not configured.
+    """
+    try:
+        from .gemini_rag import get_rag_instance
+        rag = get_rag_instance()
+    except Exception:
+        return None
+
+    frames = {**dashboard_charts(data), **map_charts(data['rbi_credit'] if state_frame is None else state_frame)}
+    charts = {chart_id: (chart_type, summarize_frame(frame)) for chart_id, (chart_type, frame) in frames.items()}
+    insights = rag.cached_chart_insights(charts, cache=_insight_cache)
+
+    missing = {chart_id: chart for chart_id, chart in charts.items() if chart_id not in insights}
+    if missing:
+        _pregenerate(rag, missing)
+    return insights
+
+
+def render_insight(insights, chart_id):
+    """Insight panel under a chart; nothing when the LLM is not configured"""
+    if insights is None:
+        return
+    with st.expander("💡 AI Insights"):
+        if chart_id in insights:
+            st.markdown(insights[chart_id])
+        else:
+            st.caption("Insights for the latest data are being generated and will appear on the next refresh.")
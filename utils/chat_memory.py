@@ -0,0 +1,186 @@
+"""
+PulseAI - Chat Memory
+Token-bounded conversation window with a rolling summary; older turns are paged to disk
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from .tokens import TokenCounter
+
+CHAT_HISTORY_DIR = Path(__file__).parent.parent / "data" / "processed" / "chat_history"
+RECENT_TOKEN_BUDGET = 3000   # recent turns sent verbatim
+SUMMARY_TOKEN_BUDGET = 400   # rolling summary of everything older
+MAX_RECENT_MESSAGES = 12     # also bounds what each rerun renders
+MIN_RECENT_MESSAGES = 2      # always keep the latest exchange verbatim
+SUMMARY_LINE_CHARS = 160
+# Paged-out turns are deleted once their conversation has been idle this long
+HISTORY_RETENTION_SECONDS = float(os.getenv("PULSEAI_CHAT_HISTORY_HOURS", "24")) * 3600
+
+
+def prune_chat_history(disk_dir=CHAT_HISTORY_DIR, max_age=HISTORY_RETENTION_SECONDS):
+    """Delete paged conversation files not written to within max_age seconds"""
+    disk_dir = Path(disk_dir)
+    if not disk_dir.exists():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in disk_dir.glob("*.jsonl"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue  # removed by another session meanwhile
+    return removed
+
+
+def _first_sentence(text, limit=SUMMARY_LINE_CHARS):
+    text = re.sub(r'\s+', ' ', re.sub(r'[*_#>`]', '', text)).strip()
+    sentence = re.split(r'(?<=[.!?।])\s', text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + "…"
+
+
+class ChatMemory:
+    """One conversation: recent messages in memory, older ones on disk, summarised for the prompt
+
+    Only the recent window and the summary live in session state, so memory
+    and prompt size stay flat however long the conversation runs.
+    """
+
+    def __init__(self, conversation_id=None, counter=None, recent_budget=RECENT_TOKEN_BUDGET,
+                 summary_budget=SUMMARY_TOKEN_BUDGET, disk_dir=CHAT_HISTORY_DIR, summarizer=None):
+        self.conversation_id = conversation_id or uuid.uuid4().hex
+        self.counter = counter or TokenCounter()
+        self.recent_budget = recent_budget
+        self.summary_budget = summary_budget
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            # Every new conversation sweeps the ones left idle past the retention period
+            prune_chat_history(self.disk_dir)
+        # summarizer(previous_summary, turns_text) -> Future of a compressed summary
+        self.summarizer = summarizer
+
+        self.messages = []
+        self.summary_lines = []
+        self.summary = ""
+        self.paged_out = 0
+        self.total_messages = 0
+        self.total_chars = 0
+        self.role_counts = {}
+        self._pending_summary = None
+        self._unsummarized = []  # lines added while a compression was in flight
+        self._lock = threading.Lock()
+
+    @property
+    def history_path(self):
+        return self.disk_dir / f"{self.conversation_id}.jsonl"
+
+    def add(self, role, content):
+        message = {"role": role, "content": content}
+        with self._lock:
+            self.messages.append(message)
+            self.total_messages += 1
+            self.total_chars += len(content)
+            self.role_counts[role] = self.role_counts.get(role, 0) + 1
+            self._enforce_budget()
+
+    def _tokens(self, messages):
+        return sum(self.counter.estimate(m["content"]) for m in messages)
+
+    def _enforce_budget(self):
+        evicted = []
+        while len(self.messages) > MIN_RECENT_MESSAGES and (
+            len(self.messages) > MAX_RECENT_MESSAGES or self._tokens(self.messages) > self.recent_budget
+        ):
+            evicted.append(self.messages.pop(0))
+        if evicted:
+            self._page_out(evicted)
+            self._fold_into_summary(evicted)
+
+    def _page_out(self, messages):
+        self.paged_out += len(messages)
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.history_path, 'a', encoding='utf-8') as f:
+                for message in messages:
+                    f.write(json.dumps(message, ensure_ascii=False) + "\n")
+
+    def _set_summary_lines(self, lines):
+        """Keep the newest lines that fit the summary budget"""
+        while len(lines) > 1 and self.counter.estimate("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        self.summary_lines = lines
+        self.summary = "\n".join(lines)
+
+    def _fold_into_summary(self, messages):
+        """Extractive summary now; an LLM compression replaces it when the summarizer finishes"""
+        previous = self.summary
+        new_lines = []
+        for message in messages:
+            prefix = "User asked" if message["role"] == "user" else "Assistant answered"
+            new_lines.append(f"- {prefix}: {_first_sentence(message['content'])}")
+        self._set_summary_lines(self.summary_lines + new_lines)
+
+        if self.summarizer is None:
+            return
+        if self._pending_summary is not None:
+            self._unsummarized.extend(new_lines)
+            return
+        turns = "\n".join(f"{m['role'].title()}: {m['content']}" for m in messages)
+        try:
+            self._pending_summary = self.summarizer(previous, turns)
+            self._unsummarized = []
+        except Exception:
+            self._pending_summary = None
+
+    def _apply_pending_summary(self):
+        future = self._pending_summary
+        if future is None or not future.done():
+            return
+        self._pending_summary = None
+        try:
+            compressed = (future.result() or "").strip()
+        except Exception:
+            return
+        if compressed and self.counter.estimate(compressed) <= self.summary_budget:
+            self._set_summary_lines([compressed] + self._unsummarized)
+        self._unsummarized = []
+
+    def prompt_history(self, exclude_last=False):
+        """Summary plus recent turns as prompt text ('' for a fresh conversation)"""
+        with self._lock:
+            self._apply_pending_summary()
+            recent = self.messages[:-1] if exclude_last else list(self.messages)
+            parts = []
+            if self.summary:
+                parts.append(f"Earlier in this conversation:\n{self.summary}")
+            if recent:
+                parts.append("Recent turns:\n" + "\n".join(f"{m['role'].title()}: {m['content']}" for m in recent))
+            return "\n\n".join(parts)
+
+    def last_user_question(self, before_last=True):
+        """Previous user question, used to give follow-ups retrieval context"""
+        users = [m["content"] for m in self.messages if m["role"] == "user"]
+        if before_last:
+            users = users[:-1]
+        return users[-1] if users else ""
+
+    def load_paged(self, limit=50):
+        """Most recent messages that were paged out to disk"""
+        if not self.disk_dir or not self.history_path.exists():
+            return []
+        with open(self.history_path, encoding='utf-8') as f:
+            lines = f.readlines()[-limit:]
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def clear(self):
+        if self.disk_dir:
+            self.history_path.unlink(missing_ok=True)
+        self.__init__(counter=self.counter, recent_budget=self.recent_budget, summary_budget=self.summary_budget,
+                      disk_dir=self.disk_dir, summarizer=self.summarizer)
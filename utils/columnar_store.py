@@ -0,0 +1,88 @@
+"""
+PulseAI - Partitioned Columnar Store
+Hive-style Parquet partitions under data/processed/store
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+STORE_DIR = Path(__file__).parent.parent / "data" / "processed" / "store"
+
+
+def dataset_dir(dataset):
+    """Root directory of one dataset"""
+    return STORE_DIR / dataset
+
+
+def _partition_path(dataset, partition_cols, values):
+    """store/<dataset>/<col>=<value>/..."""
+    path = dataset_dir(dataset)
+    for col, value in zip(partition_cols, values):
+        path = path / f"{col}={value}"
+    return path
+
+
+def write_partitions(dataset, df, partition_cols, part_name):
+    """Write a frame as one Parquet file per partition, returning the files written"""
+    if df.empty:
+        return []
+
+    written = []
+    for values, group in df.groupby(partition_cols, sort=False, dropna=False):
+        values = values if isinstance(values, tuple) else (values,)
+        part_dir = _partition_path(dataset, partition_cols, values)
+        part_dir.mkdir(parents=True, exist_ok=True)
+        part_file = part_dir / f"part-{part_name}.parquet"
+        group.drop(columns=partition_cols).to_parquet(part_file, index=False)
+        written.append(str(part_file))
+    return written
+
+
+def _parse_partition_dirs(part_file, root):
+    """Recover partition column values from the directory names"""
+    values = {}
+    for segment in part_file.relative_to(root).parts[:-1]:
+        if '=' in segment:
+            col, value = segment.split('=', 1)
+            values[col] = value
+    return values
+
+
+def read_dataset(dataset, filters=None, columns=None):
+    """Read a dataset, pruning partitions with equality filters like {'Year': '2024'}"""
+    root = dataset_dir(dataset)
+    if not root.exists():
+        return pd.DataFrame()
+
+    filters = {k: str(v) for k, v in (filters or {}).items()}
+    frames = []
+    for part_file in sorted(root.rglob("*.parquet")):
+        partition_values = _parse_partition_dirs(part_file, root)
+        if any(partition_values.get(k) != v for k, v in filters.items() if k in partition_values):
+            continue
+        df = pd.read_parquet(part_file, columns=columns)
+        for col, value in partition_values.items():
+            df[col] = value
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    for col, value in filters.items():
+        if col in df.columns:
+            df = df[df[col].astype(str) == value]
+    return df.reset_index(drop=True)
+
+
+def remove_files(paths):
+    """Delete previously written part files and prune empty partition directories"""
+    for path in paths:
+        part_file = Path(path)
+        if part_file.exists():
+            part_file.unlink()
+        parent = part_file.parent
+        while parent != STORE_DIR and parent.exists() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
@@ -0,0 +1,130 @@
+"""
+PulseAI - Shared RAG Context Cache
+One context string per data version, shared by every session in the process,
+assembled from section fragments cached per dataset version
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+CONTEXT_CACHE_DIR = Path(__file__).parent.parent / "data" / "processed" / "context_cache"
+MAX_MEMORY_ENTRIES = 4  # a couple of data versions x context sizes
+MAX_SECTION_ENTRIES = 32  # every section for a few versions of each dataset
+PERSIST_TO_DISK = os.getenv("PULSEAI_CONTEXT_DISK_CACHE", "1") == "1"
+
+
+def _hash_frame(digest, df):
+    if isinstance(df, pd.DataFrame):
+        digest.update(",".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+
+def data_version(data_dict):
+    """Content fingerprint of the loaded datasets"""
+    digest = hashlib.sha256()
+    for name in sorted(data_dict):
+        digest.update(name.encode())
+        _hash_frame(digest, data_dict[name])
+    return digest.hexdigest()[:16]
+
+
+def frame_version(df):
+    """Content fingerprint of one dataset, so its context section survives changes to the others"""
+    digest = hashlib.sha256()
+    _hash_frame(digest, df)
+    return digest.hexdigest()[:16]
+
+
+class ContextCache:
+    """LRU of context strings keyed by version, with optional disk persistence"""
+
+    def __init__(self, max_entries=MAX_MEMORY_ENTRIES, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.builds = 0
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.txt"
+
+    def _remember(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Cached context for key, from memory or disk"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self.disk_dir and self._disk_path(key).exists():
+            text = self._disk_path(key).read_text(encoding='utf-8')
+            with self._lock:
+                self._remember(key, text)
+            return text
+        return None
+
+    def get_or_build(self, key, builder):
+        """Return the cached context, building it at most once per key"""
+        text = self.get(key)
+        if text is not None:
+            return text
+
+        # Concurrent sessions for a new version wait for one build instead of racing
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            text = self.get(key)
+            if text is None:
+                text = builder()
+                self.builds += 1
+                with self._lock:
+                    self._remember(key, text)
+                if self.disk_dir:
+                    self.disk_dir.mkdir(parents=True, exist_ok=True)
+                    tmp_path = self._disk_path(key).with_suffix('.tmp')
+                    tmp_path.write_text(text, encoding='utf-8')
+                    tmp_path.replace(self._disk_path(key))
+                    self._prune_disk()
+        with self._lock:
+            self._build_locks.pop(key, None)
+        return text
+
+    def _prune_disk(self):
+        """Keep only the most recent versions on disk"""
+        files = sorted(self.disk_dir.glob("*.txt"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in files[self.max_entries * 2:]:
+            stale.unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'chars': sum(len(t) for t in self._entries.values()),
+                'builds': self.builds
+            }
+
+
+_context_cache = ContextCache(disk_dir=CONTEXT_CACHE_DIR if PERSIST_TO_DISK else None)
+# Fragments are cheap to keep in memory; whole contexts are what is persisted
+_section_cache = ContextCache(max_entries=MAX_SECTION_ENTRIES)
+
+
+def get_context_cache():
+    """Process-wide context cache"""
+    return _context_cache
+
+
+def get_section_cache():
+    """Process-wide cache of rendered context sections, keyed by each section's own dataset version"""
+    return _section_cache
@@ -0,0 +1,98 @@
+"""
+PulseAI - Context Table Serializer
+Compact table encodings for LLM prompts: tight CSV, units hoisted into headers,
+configurable precision and optional delta encoding for time series
+"""
+
+import os
+
+import numpy as np
+
+TABLE_FORMATS = ('padded', 'compact', 'delta')
+DEFAULT_TABLE_FORMAT = os.getenv("PULSEAI_CONTEXT_TABLES", "compact")
+DEFAULT_PRECISION = int(os.getenv("PULSEAI_CONTEXT_PRECISION", "2"))
+KEYFRAME_EVERY = 6  # delta format: an absolute row this often, so no value needs a long running sum
+
+# Column -> (header label, unit); the unit is written once in the header, not in every cell
+COLUMN_UNITS = {
+    'Volume_Billion': ("Volume", "bn txns"),
+    'Value_LakhCrore': ("Value", "₹ lakh cr"),
+    'Avg_Transaction_Size': ("Avg txn size", None),
+    'Credit_Crore': ("Credit", "₹ cr"),
+    'Deposit_Crore': ("Deposit", "₹ cr"),
+    'Credit_Growth_%': ("Credit growth", "%"),
+    'Deposit_Growth_%': ("Deposit growth", "%"),
+    'CD_Ratio': ("CD ratio", "%"),
+    'Digital_Adoption_%': ("Digital adoption", "%"),
+    'UPI_Volume_Crore': ("UPI volume", "cr"),
+    'LTP': ("LTP", "₹"),
+    'Open': ("Open", "₹"),
+    'High': ("High", "₹"),
+    'Low': ("Low", "₹"),
+    'Change_%': ("Change", "%"),
+    'AUM_LakhCrore': ("AUM", "₹ lakh cr"),
+    'Accounts_Lakh': ("Accounts", "lakh"),
+    'Repo_Rate': ("Repo", "%"),
+    'Reverse_Repo': ("Reverse repo", "%"),
+    'CRR': ("CRR", "%"),
+    'SLR': ("SLR", "%"),
+    'Policy_Stance': ("Stance", None),
+}
+
+
+def column_header(column):
+    label, unit = COLUMN_UNITS.get(column, (column.replace('_', ' '), None))
+    return f"{label} ({unit})" if unit else label
+
+
+def format_number(value, precision=DEFAULT_PRECISION, signed=False):
+    """Fixed precision with trailing zeros dropped: 980.00 -> 980, 16.60 -> 16.6"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return f"{int(value):+d}" if signed else str(int(value))
+    text = f"{float(value):+.{precision}f}" if signed else f"{float(value):.{precision}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return "+0" if signed and text in ('+0', '-0') else text
+
+
+def _cell(value):
+    text = str(value)
+    return f'"{text}"' if ',' in text or '"' in text else text
+
+
+def encode_table(df, fmt=DEFAULT_TABLE_FORMAT, precision=DEFAULT_PRECISION):
+    """Render a table for the prompt
+
+    padded: DataFrame.to_string, the original layout.
+    compact: CSV with units in the header and numbers at `precision` decimals.
+    delta: compact, but numeric columns hold the change from the previous row
+    (rows are assumed to be in period order), with an absolute row every
+    KEYFRAME_EVERY rows.
+    """
+    if fmt == 'padded':
+        return df.to_string(index=False)
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format {fmt}. Use one of {TABLE_FORMATS}")
+
+    numeric = [column in set(df.select_dtypes('number').columns) for column in df.columns]
+    lines = [",".join(_cell(column_header(c)) for c in df.columns)]
+    previous = None
+    for i, row in enumerate(df.itertuples(index=False, name=None)):
+        keyframe = fmt != 'delta' or i % KEYFRAME_EVERY == 0
+        cells = []
+        for j, value in enumerate(row):
+            if not numeric[j]:
+                cells.append(_cell(value))
+            elif keyframe:
+                cells.append(format_number(value, precision))
+            else:
+                # Difference of the rounded values, so adding up deltas reproduces the printed numbers
+                change = round(float(value), precision) - round(float(previous[j]), precision)
+                cells.append(format_number(round(change, precision), precision, signed=True))
+        lines.append(",".join(cells))
+        previous = row
+    if fmt == 'delta' and len(df) > 1:
+        lines.insert(0, f"(signed rows are changes from the row above; every {KEYFRAME_EVERY}th row from the first is absolute)")
+    return "\n".join(lines)
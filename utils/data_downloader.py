@@ -3,19 +3,29 @@ PulseAI - Intelligent Data Downloader
 Fetches data from RBI, NPCI, NSE, AMFI with smart caching
 """
 
+import logging
 import os
 import time
 import json
+import zlib
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 import streamlit as st
+from .npci_ingest import ingest_npci_reports, NPCI_PDF_DIR
+from .dbie_ingest import (
+    ingest_dbie_workbooks, load_state_credit_history, load_district_credit_history, DBIE_XLSX_DIR
+)
+from .snapshot_store import append_snapshot, backfill_snapshots
+from .columnar_store import write_partitions, read_dataset, remove_files, dataset_dir
+from .geo import build_district_lods, load_district_index
 
 # Constants
 DATA_DIR = Path(__file__).parent.parent / "data" / "raw"
 PROCESSED_DIR = Path(__file__).parent.parent / "data" / "processed"
 CACHE_DURATION = 24  # hours
+DISTRICT_DATASET = "district_credit"  # columnar store dataset, partitioned by State
 
 # Ensure directories exist
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -48,8 +58,18 @@ def download_upi_data():
         return pd.read_csv(cache_file)
     
     try:
-        # Generate synthetic UPI data (since NPCI doesn't have direct CSV API)
-        # In production, you'd scrape from their PDF reports
+        # Prefer monthly statistics parsed from NPCI PDF reports in data/raw/npci/
+        try:
+            df = ingest_npci_reports(NPCI_PDF_DIR)
+        except Exception as e:
+            # e.g. a worker process crashed: the synthetic series below keeps UPI views working
+            logging.getLogger(__name__).warning("NPCI report ingestion failed: %s", e)
+            df = pd.DataFrame()
+        if not df.empty:
+            df.to_csv(cache_file, index=False)
+            return df
+        
+        # Generate synthetic UPI data when no NPCI reports parse
         months = pd.date_range(start='2023-01-01', end='2025-10-31', freq='MS')
         
         # Realistic growth pattern
@@ -183,11 +203,103 @@ def download_rbi_credit_data():
             'As_Of_Date': '2025-09-30'
         })
     
-    df = pd.DataFrame(data)
+    df = apply_dbie_credit_figures(pd.DataFrame(data))
     df.to_csv(cache_file, index=False)
+    append_snapshot(df)  # keep every refresh for time-travel queries
     return df
 
 
+def apply_dbie_credit_figures(df):
+    """Overlay official credit/deposit figures from ingested DBIE workbooks"""
+    try:
+        ingest_dbie_workbooks(DBIE_XLSX_DIR)
+        history = load_state_credit_history()
+    except Exception as e:
+        st.warning(f"DBIE workbook ingestion failed: {str(e)}")
+        return df
+    
+    if history.empty:
+        return df
+    
+    backfill_snapshots(history)
+    latest = history[history['Period'] == history['Period'].max()].set_index('State')
+    columns = ['Credit_Crore', 'Deposit_Crore', 'Credit_Growth_%', 'Deposit_Growth_%', 'CD_Ratio']
+    
+    # update() skips NaNs, so states without a prior DBIE period keep their growth figures
+    df = df.set_index('State').astype({c: float for c in columns})
+    covered = df.index.intersection(latest.index)
+    df.update(latest.loc[covered, columns])
+    df.loc[covered, 'As_Of_Date'] = latest['Period'].iloc[0]
+    return df.reset_index()
+
+
+def download_district_data():
+    """Build the district-level credit store, one partition per state"""
+    marker = dataset_dir(DISTRICT_DATASET) / "_built"
+    geometry_rebuilt = build_district_lods()
+    
+    if not geometry_rebuilt and is_cache_valid(marker):
+        return True
+    
+    history = load_district_credit_history()
+    if not history.empty:
+        df = history[history['Period'] == history['Period'].max()].rename(columns={'Period': 'As_Of_Date'})
+    else:
+        df = generate_synthetic_district_data(download_rbi_credit_data(), load_district_index())
+    
+    if df.empty:
+        return False
+    
+    # Replace the previous build so districts dropped upstream do not linger
+    remove_files(dataset_dir(DISTRICT_DATASET).rglob("*.parquet"))
+    write_partitions(DISTRICT_DATASET, df, ['State'], "latest")
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    return True
+
+
+def generate_synthetic_district_data(state_df, district_index):
+    """Split each state's totals across its districts for demo drill-down"""
+    if state_df.empty or not district_index:
+        return pd.DataFrame()
+    
+    states = state_df.set_index('State')
+    data = []
+    for state, districts in district_index.items():
+        if state not in states.index:
+            continue
+        row = states.loc[state]
+        
+        # Stable per-district weights (crc32 is not salted per process like hash())
+        weights = [1 + zlib.crc32(f"{state}/{d}".encode()) % 100 for d in districts]
+        total = sum(weights)
+        
+        for district, weight in zip(districts, weights):
+            share = weight / total
+            jitter = (zlib.crc32(district.encode()) % 60 - 30) / 10  # ±3 points
+            credit = row['Credit_Crore'] * share
+            deposit = row['Deposit_Crore'] * share * (1 + jitter / 100)
+            
+            data.append({
+                'State': state,
+                'District': district,
+                'Credit_Crore': round(credit, 2),
+                'Deposit_Crore': round(deposit, 2),
+                'Credit_Growth_%': round(row['Credit_Growth_%'] + jitter, 2),
+                'Deposit_Growth_%': round(row['Deposit_Growth_%'] - jitter / 2, 2),
+                'CD_Ratio': round(credit / deposit * 100, 2),
+                'As_Of_Date': row['As_Of_Date']
+            })
+    
+    return pd.DataFrame(data)
+
+
+@st.cache_data(ttl=3600)
+def load_state_district_data(state):
+    """District rows for one state (reads a single partition)"""
+    return read_dataset(DISTRICT_DATASET, {'State': state})
+
+
 def download_mutual_fund_data():
     """Download mutual fund AUM data"""
     cache_file = DATA_DIR / "mf_aum.csv"
@@ -0,0 +1,223 @@
+"""
+PulseAI - Data Tools
+Typed, vectorized lookups over the loaded datasets that the model calls in tool mode.
+Every function returns a small JSON-serialisable dict, so prompt size does not grow with the data.
+"""
+
+import inspect
+
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 36  # longest series returned in one call
+MAX_ROWS = 25
+
+# Time series datasets -> period column
+SERIES_PERIODS = {
+    'upi': 'Month',
+    'mutual_funds': 'Month',
+    'rbi_policy': 'Date',
+}
+
+STATE_DATASET = 'rbi_credit'
+
+
+def _plain(value):
+    """numpy/pandas scalars to JSON types, floats rounded to 2 places"""
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else round(float(value), 2)
+    if isinstance(value, (pd.Timestamp,)):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def _records(df):
+    """Rows as compact column-major JSON"""
+    return {'columns': list(df.columns), 'rows': [[_plain(v) for v in row] for row in df.itertuples(index=False)]}
+
+
+class DataTools:
+    """Functions bound to one data_dict; names, annotations and docstrings form the tool schema"""
+
+    def __init__(self, data_dict):
+        self.data = data_dict
+
+    def functions(self):
+        return [
+            self.describe_datasets,
+            self.get_latest,
+            self.get_series,
+            self.top_states,
+            self.compare_state,
+            self.get_state_history,
+            self.top_districts,
+        ]
+
+    def call(self, name, args):
+        """Run a tool by name with model-supplied arguments, coerced to the annotated types"""
+        functions = {fn.__name__: fn for fn in self.functions()}
+        if name not in functions:
+            return {'error': f"Unknown function {name}. Available: {sorted(functions)}"}
+        fn = functions[name]
+        params = inspect.signature(fn).parameters
+        kwargs = {}
+        for key, value in dict(args or {}).items():
+            if key not in params:
+                continue
+            annotation = params[key].annotation
+            try:
+                # JSON numbers arrive as floats
+                kwargs[key] = annotation(value) if annotation in (int, float, str, bool) else value
+            except (TypeError, ValueError):
+                return {'error': f"Argument {key} must be {annotation.__name__}"}
+        try:
+            return fn(**kwargs)
+        except (KeyError, ValueError, IndexError) as e:
+            return {'error': str(e)}
+
+    # -- helpers ------------------------------------------------------------
+
+    def _frame(self, dataset):
+        df = self.data.get(dataset)
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            raise KeyError(f"Dataset {dataset} is not loaded. Available: {self._loaded()}")
+        return df
+
+    def _loaded(self):
+        return sorted(k for k, v in self.data.items() if isinstance(v, pd.DataFrame) and not v.empty)
+
+    @staticmethod
+    def _numeric_column(df, metric):
+        numeric = list(df.select_dtypes('number').columns)
+        if metric not in numeric:
+            raise ValueError(f"Unknown metric {metric}. Numeric columns: {numeric}")
+        return metric
+
+    def _state(self, state):
+        states = self._frame(STATE_DATASET)['State']
+        match = states[states.str.lower() == state.strip().lower()]
+        if match.empty:
+            raise ValueError(f"Unknown state {state}. States: {sorted(states)}")
+        return match.iloc[0]
+
+    # -- tools --------------------------------------------------------------
+
+    def describe_datasets(self) -> dict:
+        """List the loaded datasets with their row counts, columns and period covered. Call this first if unsure which dataset or metric name to use."""
+        result = {}
+        for name in self._loaded():
+            df = self.data[name]
+            info = {'rows': len(df), 'numeric_columns': list(df.select_dtypes('number').columns)}
+            period = SERIES_PERIODS.get(name) or ('As_Of_Date' if 'As_Of_Date' in df else 'Date' if 'Date' in df else None)
+            if period:
+                info['period'] = [str(df[period].min()), str(df[period].max())]
+            if 'Category' in df:
+                info['categories'] = sorted(df['Category'].unique().tolist())
+            result[name] = info
+        return result
+
+    def get_latest(self, dataset: str) -> dict:
+        """Latest figures of a dataset: last month for upi and rbi_policy, all categories of the latest month for mutual_funds, all quotes for nse, all states for rbi_credit."""
+        df = self._frame(dataset)
+        if dataset == 'mutual_funds':
+            df = df[df['Month'] == df['Month'].max()]
+        elif dataset in SERIES_PERIODS:
+            df = df.tail(1)
+        return _records(df.head(MAX_ROWS))
+
+    def get_series(self, dataset: str, metric: str, start: str = "", end: str = "", category: str = "") -> dict:
+        """Monthly series of a metric from upi, mutual_funds or rbi_policy. start and end are YYYY-MM or YYYY-MM-DD (inclusive, optional). For mutual_funds pass a category, otherwise AUM is summed across categories."""
+        if dataset not in SERIES_PERIODS:
+            raise ValueError(f"Series are available for {sorted(SERIES_PERIODS)}; use get_state_history for states")
+        df = self._frame(dataset)
+        metric = self._numeric_column(df, metric)
+        period = SERIES_PERIODS[dataset]
+
+        if dataset == 'mutual_funds':
+            if category:
+                df = df[df['Category'].str.lower() == category.lower()]
+                if df.empty:
+                    raise ValueError(f"Unknown category {category}")
+            else:
+                df = df.groupby(period, as_index=False)[metric].sum()
+
+        periods = df[period].astype(str)
+        mask = np.ones(len(df), dtype=bool)
+        if start:
+            mask &= (periods >= start).to_numpy()
+        if end:
+            mask &= (periods.str[:len(end)] <= end).to_numpy()
+        df = df[mask]
+
+        values = df[metric].to_numpy(dtype=float)
+        points = [[p, _plain(v)] for p, v in zip(df[period].astype(str).tolist()[-MAX_POINTS:], values[-MAX_POINTS:])]
+        result = {'dataset': dataset, 'metric': metric, 'points': points}
+        if len(values) > MAX_POINTS:
+            result['truncated_to_last'] = MAX_POINTS
+        if len(values) >= 2 and values[0]:
+            result['change_pct'] = _plain((values[-1] / values[0] - 1) * 100)
+        return result
+
+    def top_states(self, metric: str, n: int = 5, ascending: bool = False) -> dict:
+        """Top n states by a rbi_credit metric (e.g. Credit_Growth_%, CD_Ratio, Digital_Adoption_%). ascending=true returns the lowest instead."""
+        df = self._frame(STATE_DATASET)
+        metric = self._numeric_column(df, metric)
+        n = max(1, min(MAX_ROWS, n))
+        rows = df.nsmallest(n, metric) if ascending else df.nlargest(n, metric)
+        return {
+            'metric': metric,
+            'as_of': str(df['As_Of_Date'].max()),
+            'states': [[s, _plain(v)] for s, v in zip(rows['State'], rows[metric])],
+            'national_mean': _plain(df[metric].mean()),
+        }
+
+    def compare_state(self, state: str, metric: str) -> dict:
+        """One state's rbi_credit metric against the national mean and median, with its rank among all states."""
+        df = self._frame(STATE_DATASET)
+        metric = self._numeric_column(df, metric)
+        state = self._state(state)
+        values = df[metric].to_numpy(dtype=float)
+        value = float(df.loc[df['State'] == state, metric].iloc[0])
+        mean = values.mean()
+        return {
+            'state': state,
+            'metric': metric,
+            'value': _plain(value),
+            'national_mean': _plain(mean),
+            'national_median': _plain(np.median(values)),
+            'rank': int((values > value).sum()) + 1,
+            'of': len(values),
+            'diff_vs_mean': _plain(value - mean),
+            'pct_vs_mean': _plain((value / mean - 1) * 100) if mean else None,
+        }
+
+    def get_state_history(self, state: str, metric: str) -> dict:
+        """A state's rbi_credit metric across every stored snapshot date, oldest first."""
+        from .snapshot_store import get_snapshot_index
+
+        state = self._state(state)
+        series = get_snapshot_index().series(state, metric)
+        if series.empty:
+            return {'state': state, 'metric': metric, 'points': [], 'note': 'No snapshot history for this metric'}
+        series = series.tail(MAX_POINTS)
+        return {'state': state, 'metric': metric, 'points': [[str(d), _plain(v)] for d, v in series.items()]}
+
+    def top_districts(self, state: str, metric: str, n: int = 5, ascending: bool = False) -> dict:
+        """Top n districts of a state by a district metric (Credit_Crore, Deposit_Crore, Credit_Growth_%, Deposit_Growth_%, CD_Ratio)."""
+        from .data_downloader import load_state_district_data
+
+        state = self._state(state)
+        df = load_state_district_data(state)
+        if df.empty:
+            return {'state': state, 'districts': [], 'note': 'No district data for this state'}
+        metric = self._numeric_column(df, metric)
+        n = max(1, min(MAX_ROWS, n))
+        rows = df.nsmallest(n, metric) if ascending else df.nlargest(n, metric)
+        return {
+            'state': state,
+            'metric': metric,
+            'districts': [[d, _plain(v)] for d, v in zip(rows['District'], rows[metric])],
+            'district_count': len(df),
+        }
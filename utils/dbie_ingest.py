@@ -0,0 +1,283 @@
+"""
+PulseAI - RBI DBIE Workbook Ingestion
+Streams state/district credit & deposit workbooks into the columnar store
+"""
+
+import calendar
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .file_cache import file_sha256, HashManifest
+from .columnar_store import write_partitions, read_dataset, remove_files
+
+DBIE_XLSX_DIR = Path(__file__).parent.parent / "data" / "raw" / "dbie"
+CACHE_NAMESPACE = "dbie"
+STATE_DATASET = "dbie_state"
+DISTRICT_DATASET = "dbie_district"
+PARTITION_COLS = ['Year']
+BATCH_ROWS = 50000  # long-format rows buffered before each Parquet flush
+HEADER_SCAN_ROWS = 30  # DBIE sheets carry a title block above the header
+
+ID_COLUMNS = {
+    'state': 'State',
+    'state/ut': 'State',
+    'state name': 'State',
+    'region': 'Region',
+    'district': 'District',
+    'district name': 'District',
+    'population group': 'Population_Group',
+    'bank group': 'Bank_Group',
+}
+
+MONTH_PATTERN = re.compile(r'([A-Za-z]{3,9})[\s\-\.,]*((?:19|20)\d{2})')
+FISCAL_PATTERN = re.compile(r'((?:19|20)\d{2})\s*[-/]\s*(\d{2,4})')
+YEAR_PATTERN = re.compile(r'\b((?:19|20)\d{2})\b')
+
+
+def _month_end(year, month):
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _match_month(text):
+    """Regex match and month number for labels like 'March 2024' or 'Sep-2025'"""
+    for match in MONTH_PATTERN.finditer(text):
+        for fmt in ('%b', '%B'):
+            try:
+                return match, datetime.strptime(match.group(1).title(), fmt).month
+            except ValueError:
+                continue
+    return None
+
+
+def parse_period(value):
+    """Turn a DBIE column header into a period end date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or '')
+
+    month_match = _match_month(text)
+    if month_match:
+        match, month = month_match
+        return _month_end(int(match.group(2)), month)
+
+    # Fiscal years like 2023-24 end on 31 March of the later year
+    match = FISCAL_PATTERN.search(text)
+    if match:
+        return date(int(match.group(1)) + 1, 3, 31)
+
+    match = YEAR_PATTERN.search(text)
+    if match:
+        return date(int(match.group(1)), 3, 31)
+    return None
+
+
+def _period_text(header):
+    """The substring of a header that names its period"""
+    text = str(header or '')
+    month_match = _match_month(text)
+    if month_match:
+        return month_match[0].group(0)
+    for pattern in (FISCAL_PATTERN, YEAR_PATTERN):
+        match = pattern.search(text)
+        if match:
+            return match.group(0)
+    return ''
+
+
+def _indicator_label(header):
+    """Header text with the period stripped, e.g. 'Credit (Rs. Crore)'"""
+    label = str(header or '').replace(_period_text(header), '')
+    return re.sub(r'\s+', ' ', label).strip(' -:,') or None
+
+
+def _parse_header(row):
+    """Id and value column layout if this row is a header, else None"""
+    labels = [str(cell).strip().lower() if cell is not None else '' for cell in row]
+    id_cols = {i: ID_COLUMNS[label] for i, label in enumerate(labels) if label in ID_COLUMNS}
+    if not id_cols:
+        return None
+    value_cols = {}
+    for i, cell in enumerate(row):
+        if i in id_cols or cell is None:
+            continue
+        period = parse_period(cell)
+        if period is not None:
+            value_cols[i] = (period, _indicator_label(cell))
+    return (id_cols, value_cols) if value_cols else None
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def stream_workbook_records(xlsx_path):
+    """Yield long-format records sheet by sheet without loading the workbook"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            layout = None
+            for _, row in zip(range(HEADER_SCAN_ROWS), rows):
+                layout = _parse_header(row)
+                if layout:
+                    break
+            if not layout:
+                continue
+            id_cols, value_cols = layout
+
+            # Merged cells leave the state blank on every district row after the first
+            last_ids = {}
+            for row in rows:
+                ids = {}
+                for i, name in id_cols.items():
+                    cell = row[i] if i < len(row) else None
+                    if cell is None or str(cell).strip() == '':
+                        cell = last_ids.get(name) if name != 'District' else None
+                    ids[name] = str(cell).strip() if cell is not None else None
+                if not any(ids.values()):
+                    continue
+                last_ids = ids
+
+                for i, (period, indicator) in value_cols.items():
+                    value = _number(row[i]) if i < len(row) else None
+                    if value is None:
+                        continue
+                    record = dict(ids)
+                    record.update({
+                        'Sheet': ws.title,
+                        'Indicator': indicator or ws.title,
+                        'Period': period.isoformat(),
+                        'Year': period.year,
+                        'Value': value
+                    })
+                    yield record
+    finally:
+        wb.close()
+
+
+def convert_workbook(xlsx_path, digest, batch_rows=BATCH_ROWS):
+    """Convert one workbook into state/district datasets in bounded-size batches"""
+    written = []
+    batches = {STATE_DATASET: [], DISTRICT_DATASET: []}
+    batch_no = {STATE_DATASET: 0, DISTRICT_DATASET: 0}
+
+    def flush(dataset):
+        if not batches[dataset]:
+            return
+        df = pd.DataFrame(batches[dataset])
+        part_name = f"{digest[:16]}-{batch_no[dataset]:05d}"
+        written.extend(write_partitions(dataset, df, PARTITION_COLS, part_name))
+        batches[dataset] = []
+        batch_no[dataset] += 1
+
+    for record in stream_workbook_records(xlsx_path):
+        dataset = DISTRICT_DATASET if record.get('District') else STATE_DATASET
+        batches[dataset].append(record)
+        if len(batches[dataset]) >= batch_rows:
+            flush(dataset)
+
+    flush(STATE_DATASET)
+    flush(DISTRICT_DATASET)
+    return written
+
+
+def ingest_dbie_workbooks(xlsx_dir=DBIE_XLSX_DIR):
+    """Convert every DBIE workbook in a directory, skipping files whose hash is unchanged"""
+    xlsx_dir = Path(xlsx_dir)
+    if not xlsx_dir.exists():
+        return []
+
+    manifest = HashManifest(CACHE_NAMESPACE)
+    converted = []
+    for xlsx_file in sorted(xlsx_dir.glob("*.xlsx")):
+        digest = file_sha256(xlsx_file)
+        record = manifest.get(digest)
+        if record and all(Path(p).exists() for p in record['files']):
+            continue
+
+        # A changed workbook replaces the partitions its previous version wrote
+        for old_digest in manifest.find_source(xlsx_file):
+            remove_files(manifest.pop(old_digest)['files'])
+
+        files = convert_workbook(xlsx_file, digest)
+        manifest.put(digest, {
+            'source': str(xlsx_file),
+            'files': files,
+            'converted_at': datetime.now().isoformat(timespec='seconds')
+        })
+        converted.append(xlsx_file.name)
+    return converted
+
+
+# Indicator labels (normalised: lower case, units and punctuation removed) that hold the
+# outstanding amounts; ratios, growth rates and account counts also mention credit or deposits
+CREDIT_INDICATORS = {
+    'credit', 'bank credit', 'gross credit', 'total credit', 'credit outstanding', 'outstanding credit',
+    'gross bank credit', 'credit amount outstanding',
+}
+DEPOSIT_INDICATORS = {
+    'deposit', 'deposits', 'aggregate deposits', 'total deposits', 'bank deposits', 'deposits outstanding',
+    'outstanding deposits', 'deposit amount outstanding',
+}
+UNIT_PATTERN = re.compile(r'\(.*?\)|\b(?:rs|inr|in|crore|crores|cr)\b|₹')
+
+
+def normalize_indicator(label):
+    """'Credit (Rs. Crore)' -> 'credit', 'Credit-Deposit Ratio (%)' -> 'credit deposit ratio'"""
+    text = UNIT_PATTERN.sub(' ', str(label or '').lower())
+    return re.sub(r'[^a-z]+', ' ', text).strip()
+
+
+def credit_history(records, keys):
+    """Credit & deposits per period for the given id columns, with growth and CD ratio
+
+    records is the long format written by convert_workbook; only the
+    outstanding-amount indicators are summed.
+    """
+    if records.empty or any(k not in records.columns for k in keys):
+        return pd.DataFrame()
+
+    indicator = records['Indicator'].map(normalize_indicator)
+    credit = records[indicator.isin(CREDIT_INDICATORS)]
+    deposit = records[indicator.isin(DEPOSIT_INDICATORS)]
+    if credit.empty or deposit.empty:
+        return pd.DataFrame()
+
+    group_cols = keys + ['Period']
+    credit = credit.groupby(group_cols, as_index=False)['Value'].sum().rename(columns={'Value': 'Credit_Crore'})
+    deposit = deposit.groupby(group_cols, as_index=False)['Value'].sum().rename(columns={'Value': 'Deposit_Crore'})
+    history = credit.merge(deposit, on=group_cols, how='inner').sort_values(group_cols)
+
+    grouped = history.groupby(keys)
+    history['Credit_Growth_%'] = (grouped['Credit_Crore'].pct_change() * 100).round(2)
+    history['Deposit_Growth_%'] = (grouped['Deposit_Crore'].pct_change() * 100).round(2)
+    history['CD_Ratio'] = (history['Credit_Crore'] / history['Deposit_Crore'] * 100).round(2)
+    return history.reset_index(drop=True)
+
+
+def load_state_credit_history():
+    """State-wise credit & deposits per period from ingested workbooks"""
+    return credit_history(read_dataset(STATE_DATASET), ['State'])
+
+
+def load_district_credit_history():
+    """District-wise credit & deposits per period from ingested workbooks"""
+    return credit_history(read_dataset(DISTRICT_DATASET), ['State', 'District'])
+
+
+if __name__ == "__main__":
+    print(f"Ingesting DBIE workbooks from {DBIE_XLSX_DIR}...")
+    print(f"Converted: {ingest_dbie_workbooks() or 'nothing new'}")
+    print(load_state_credit_history().tail(10))
@@ -0,0 +1,70 @@
+"""
+PulseAI - Content-Addressed File Cache
+Hash source files so unchanged inputs are never reprocessed
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+PROCESSED_DIR = Path(__file__).parent.parent / "data" / "processed"
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MB reads keep memory flat on large files
+
+
+def file_sha256(filepath, chunk_size=HASH_CHUNK_SIZE):
+    """Hash file contents in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_dir(namespace):
+    """Directory holding cached outputs for one ingestion stage"""
+    path = PROCESSED_DIR / namespace
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_path(namespace, digest, suffix):
+    """Cached output path for a source file hash"""
+    return cache_dir(namespace) / f"{digest}{suffix}"
+
+
+
+class HashManifest:
+    """JSON manifest mapping source file hashes to their converted outputs"""
+
+    def __init__(self, namespace):
+        self.path = cache_dir(namespace) / "_manifest.json"
+        self.entries = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, digest):
+        """Record stored for a hash, if any"""
+        return self.entries.get(digest)
+
+    def find_source(self, source):
+        """Hashes previously recorded for a source path"""
+        return [d for d, record in self.entries.items() if record.get('source') == str(source)]
+
+    def put(self, digest, record):
+        """Store a record and persist atomically"""
+        self.entries[digest] = record
+        self._save()
+
+    def pop(self, digest):
+        """Forget a hash and persist"""
+        record = self.entries.pop(digest, None)
+        self._save()
+        return record
+
+    def _save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.entries, indent=2), encoding='utf-8')
+        tmp_path.replace(self.path)
@@ -5,72 +5,97 @@ Zero vector DB, pure context stuffing with intelligent chunking
 
 import os
 import json
+import hashlib
 import time
+from concurrent.futures import wait as wait_futures
 from datetime import datetime
-from pathlib import Path
 import streamlit as st
-import google.generativeai as genai
 from dotenv import load_dotenv
 from .prompts import (
     SYSTEM_PROMPT, RAG_QUERY_PROMPT, REPORT_GENERATION_PROMPT,
-    FORECAST_NARRATIVE_PROMPT, ANOMALY_DETECTION_PROMPT, FEW_SHOT_EXAMPLES
+    FEW_SHOT_EXAMPLES, PROMPT_VERSION,
+    STREAM_RESUME_PROMPT, TOOL_MODE_PROMPT, CACHED_CONTEXT_PROMPT, CACHED_QUERY_PROMPT, CONVERSATION_PROMPT, CONVERSATION_SUMMARY_PROMPT,
+    BATCH_NARRATIVE_PROMPT, FORECAST_BATCH_TASK, CHART_INSIGHTS_BATCH_TASK, ANOMALY_BATCH_TASK
 )
+from .answer_cache import get_answer_cache, answer_key, replay_stream
+from .context_cache import get_context_cache, get_section_cache, data_version, frame_version
+from .retrieval import (
+    build_index, with_summaries, format_passages, chunk_sections, get_index_cache, tokenize, DEFAULT_TOP_K
+)
+from .tokens import TokenCounter, Section, pack_sections, heuristic_tokens
+from .context_format import encode_table, DEFAULT_TABLE_FORMAT, TABLE_FORMATS
+from .prefix_cache import PrefixCache
+from .question_router import route_question
+from .data_tools import DataTools
+from .llm_scheduler import (
+    get_scheduler, is_retryable_error, PRIORITY_INTERACTIVE, PRIORITY_REPORT, PRIORITY_INSIGHT, PRIORITY_PREFETCH
+)
+from .llm_backends import get_backend
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Bump when build_context_from_data output changes so cached contexts are rebuilt
+CONTEXT_FORMAT_VERSION = 4
 
-class GeminiRAG:
-    def __init__(self, api_key=None):
-        """Initialize Gemini with free tier limits"""
-        # Try multiple sources for API key (secure priority order)
-        self.api_key = (
-            api_key or 
-            os.getenv("GEMINI_API_KEY") or  # From .env file
-            st.secrets.get("GEMINI_API_KEY")  # From Streamlit secrets (cloud deployment)
-        )
-        
-        if not self.api_key:
-            st.error("⚠️ GEMINI_API_KEY not found! Add it to .streamlit/secrets.toml")
-            st.stop()
-        
-        genai.configure(api_key=self.api_key)
-        
-        # Use Gemini 2.5 Flash - latest model with enhanced capabilities
-        self.model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            generation_config={
-                'temperature': 0.7,
-                'top_p': 0.95,
-                'top_k': 40,
-                'max_output_tokens': 2048,
-            }
-        )
-        
-        # Rate limiting (15 RPM free tier)
-        self.last_request_time = 0
-        self.min_request_interval = 4  # seconds (15 RPM = 4s interval)
-    
-    def _rate_limit(self):
-        """Enforce free tier rate limits"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_request_interval:
-            time.sleep(self.min_request_interval - elapsed)
-        self.last_request_time = time.time()
-    
-    def build_context_from_data(self, data_dict, max_tokens=700000):
-        """Build comprehensive context from all datasets"""
-        context_parts = []
-        
-        # Add few-shot examples first
-        context_parts.append("=== REFERENCE EXAMPLES ===\n" + FEW_SHOT_EXAMPLES)
-        
-        # UPI Data Summary
-        if 'upi' in data_dict and not data_dict['upi'].empty:
-            df = data_dict['upi']
-            recent = df.tail(12)
-            
-            upi_summary = f"""
+# Context layout, least frequently refreshed first: a refresh leaves every section
+# before the changed one byte-identical, so prompt prefixes up to it stay cacheable
+SECTION_ORDER = ('examples', 'rbi_policy', 'rbi_credit', 'mutual_funds', 'upi', 'nse')
+
+# Lower number = packed first when the token budget is tight
+SECTION_PRIORITIES = {
+    'upi': 1,
+    'rbi_credit': 1,
+    'rbi_policy': 1,
+    'nse': 2,
+    'mutual_funds': 2,
+    'examples': 3,
+}
+
+# Tool mode: model rounds allowed per question, and the declarations' share of each request
+MAX_TOOL_ROUNDS = 6
+TOOL_DECLARATION_TOKENS = 1500
+
+# Narratives per structured-output request; larger batches risk truncating the JSON reply
+BATCH_MAX_ITEMS = 6
+
+# RAG mode answers from retrieved passages. With this on, it answers from the whole context
+# cached upstream instead once that prefix exists: fewer input tokens per question, but
+# retrieval no longer selects what the model reads
+CACHED_FULL_CONTEXT = os.getenv("PULSEAI_CACHED_FULL_CONTEXT", "0") == "1"
+
+
+def _secret_api_key():
+    """GEMINI_API_KEY from Streamlit secrets, or None when no secrets file exists"""
+    try:
+        return st.secrets.get("GEMINI_API_KEY")
+    except Exception:
+        return None
+
+
+def _parse_json_object(text):
+    """JSON object from a structured-output reply, tolerating a markdown code fence"""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    replies = json.loads(text)
+    if not isinstance(replies, dict):
+        raise ValueError("expected a JSON object")
+    return replies
+
+
+def _table(df, table_format):
+    return encode_table(df, 'compact' if table_format == 'delta' else table_format)
+
+
+def _series(df, table_format):
+    # Delta encoding only suits rows in period order
+    return encode_table(df, table_format)
+
+
+def _upi_section(df, table_format):
+    recent = df.tail(12)
+    return f"""
 === UPI TRANSACTION DATA (Last 12 Months) ===
 Latest Month: {recent.iloc[-1]['Month']}
 Latest Volume: {recent.iloc[-1]['Volume_Billion']:.2f} billion transactions
@@ -78,26 +103,23 @@ Latest Value: ₹{recent.iloc[-1]['Value_LakhCrore']:.2f} lakh crore
 Average Transaction Size: ₹{recent.iloc[-1]['Avg_Transaction_Size']:.2f}
 
 Monthly Trend:
-{recent[['Month', 'Volume_Billion', 'Value_LakhCrore']].to_string(index=False)}
+{_series(recent[['Month', 'Volume_Billion', 'Value_LakhCrore']], table_format)}
 
 Key Insights:
 - YoY Growth: {((recent.iloc[-1]['Volume_Billion'] / recent.iloc[-12]['Volume_Billion'] - 1) * 100):.1f}%
 - Peak Month: {recent.loc[recent['Volume_Billion'].idxmax(), 'Month']}
 - Average Monthly Volume: {recent['Volume_Billion'].mean():.2f} billion
 """
-            context_parts.append(upi_summary)
-        
-        # RBI Credit Data
-        if 'rbi_credit' in data_dict and not data_dict['rbi_credit'].empty:
-            df = data_dict['rbi_credit']
-            top_states = df.nlargest(10, 'Credit_Crore')
-            
-            credit_summary = f"""
+
+
+def _credit_section(df, table_format):
+    top_states = df.nlargest(10, 'Credit_Crore')
+    return f"""
 === RBI STATE-WISE BANKING DATA (As of {df.iloc[0]['As_Of_Date']}) ===
 Total States Covered: {len(df)}
 
 Top 10 States by Credit Outstanding:
-{top_states[['State', 'Credit_Crore', 'Credit_Growth_%', 'CD_Ratio', 'Digital_Adoption_%']].to_string(index=False)}
+{_table(top_states[['State', 'Credit_Crore', 'Credit_Growth_%', 'CD_Ratio', 'Digital_Adoption_%']], table_format)}
 
 National Averages:
 - Average Credit Growth: {df['Credit_Growth_%'].mean():.2f}%
@@ -105,50 +127,41 @@ National Averages:
 - Average Digital Adoption: {df['Digital_Adoption_%'].mean():.2f}%
 
 Fastest Growing States (Credit):
-{df.nlargest(5, 'Credit_Growth_%')[['State', 'Credit_Growth_%']].to_string(index=False)}
+{_table(df.nlargest(5, 'Credit_Growth_%')[['State', 'Credit_Growth_%']], table_format)}
 
 Highest Digital Adoption:
-{df.nlargest(5, 'Digital_Adoption_%')[['State', 'Digital_Adoption_%']].to_string(index=False)}
+{_table(df.nlargest(5, 'Digital_Adoption_%')[['State', 'Digital_Adoption_%']], table_format)}
 """
-            context_parts.append(credit_summary)
-        
-        # NSE Stocks
-        if 'nse' in data_dict and not data_dict['nse'].empty:
-            df = data_dict['nse']
-            
-            nse_summary = f"""
+
+
+def _nse_section(df, table_format):
+    return f"""
 === NSE TOP 10 STOCKS (As of {df.iloc[0]['Date']}) ===
-{df[['Symbol', 'LTP', 'Change_%', 'High', 'Low']].to_string(index=False)}
+{_table(df[['Symbol', 'LTP', 'Change_%', 'High', 'Low']], table_format)}
 
 Market Snapshot:
 - Top Gainer: {df.loc[df['Change_%'].idxmax(), 'Symbol']} ({df['Change_%'].max():.2f}%)
 - Top Loser: {df.loc[df['Change_%'].idxmin(), 'Symbol']} ({df['Change_%'].min():.2f}%)
 - Average Change: {df['Change_%'].mean():.2f}%
 """
-            context_parts.append(nse_summary)
-        
-        # Mutual Funds
-        if 'mutual_funds' in data_dict and not data_dict['mutual_funds'].empty:
-            df = data_dict['mutual_funds']
-            latest_month = df['Month'].max()
-            latest_data = df[df['Month'] == latest_month]
-            
-            mf_summary = f"""
+
+
+def _mutual_fund_section(df, table_format):
+    latest_month = df['Month'].max()
+    latest_data = df[df['Month'] == latest_month]
+    return f"""
 === MUTUAL FUND AUM DATA ({latest_month}) ===
 Category-wise AUM:
-{latest_data[['Category', 'AUM_LakhCrore', 'Accounts_Lakh']].to_string(index=False)}
+{_table(latest_data[['Category', 'AUM_LakhCrore', 'Accounts_Lakh']], table_format)}
 
 Total Industry AUM: ₹{latest_data['AUM_LakhCrore'].sum():.2f} lakh crore
 Total Investor Accounts: {latest_data['Accounts_Lakh'].sum():.2f} lakh
 """
-            context_parts.append(mf_summary)
-        
-        # RBI Policy
-        if 'rbi_policy' in data_dict and not data_dict['rbi_policy'].empty:
-            df = data_dict['rbi_policy']
-            latest = df.iloc[-1]
-            
-            policy_summary = f"""
+
+
+def _policy_section(df, table_format):
+    latest = df.iloc[-1]
+    return f"""
 === RBI MONETARY POLICY (Latest: {latest['Date']}) ===
 Current Rates:
 - Repo Rate: {latest['Repo_Rate']}%
@@ -158,109 +171,533 @@ Current Rates:
 - Policy Stance: {latest['Policy_Stance']}
 
 Recent Changes:
-{df.tail(6)[['Date', 'Repo_Rate', 'Policy_Stance']].to_string(index=False)}
+{_series(df.tail(6)[['Date', 'Repo_Rate', 'Policy_Stance']], table_format)}
 """
-            context_parts.append(policy_summary)
+
+
+# Dataset -> renderer of its context section
+SECTION_RENDERERS = {
+    'upi': _upi_section,
+    'rbi_credit': _credit_section,
+    'nse': _nse_section,
+    'mutual_funds': _mutual_fund_section,
+    'rbi_policy': _policy_section,
+}
+
+
+class GeminiRAG:
+    def __init__(self, api_key=None, backend=None):
+        """Initialize the RAG engine on Gemini (or the backend named by PULSEAI_LLM_BACKEND)"""
+        if backend is None:
+            # Try multiple sources for API key (secure priority order)
+            self.api_key = (
+                api_key or 
+                os.getenv("GEMINI_API_KEY") or  # From .env file
+                _secret_api_key()  # From Streamlit secrets (cloud deployment)
+            )
+            # Raises with setup instructions when the key is missing; pages show the error
+            backend = get_backend(self.api_key)
         
-        # Join all parts
-        full_context = "\n\n".join(context_parts)
+        self.backend = backend
+        self.max_output_tokens = backend.max_output_tokens
+        self.token_counter = TokenCounter(backend)
+        self.table_format = DEFAULT_TABLE_FORMAT  # see context_format.encode_table
         
-        # Truncate if needed (rough estimate: 1 token ≈ 4 chars)
-        max_chars = max_tokens * 4
-        if len(full_context) > max_chars:
-            full_context = full_context[:max_chars] + "\n\n[Context truncated to fit token limit]"
+        # Rate limiting (15 RPM free tier) is shared by every session and worker process via the scheduler
+        self.scheduler = get_scheduler()
+        # Upstream cached prefixes of SYSTEM_PROMPT + context, reused by every session
+        self.prefix_cache = PrefixCache(backend, self.token_counter, self.scheduler)
+    
+    def _estimate_request_tokens(self, prompt, cached=None):
+        """TPM cost reserved for a request: prompt plus the largest possible reply
+        
+        Cached prefix tokens are reserved too, as they may still count as input.
+        """
+        if cached is not None:
+            return (self.prefix_cache.cached_tokens(cached[0]) + self.token_counter.estimate(cached[1])
+                    + self.max_output_tokens)
+        return self.token_counter.estimate(prompt) + self.max_output_tokens
+    
+    def _prompt_key(self, prompt, cached=None):
+        """Identity of a request for coalescing; the prompt embeds the context version"""
+        if cached is not None:
+            prompt = "{}|{}".format(*cached)
+        return hashlib.sha256(f"{self.backend.model_name}|{prompt}".encode('utf-8')).hexdigest()
+    
+    def _cached_request(self, question, context, version=None):
+        """(cached prefix name, prompt to send after it) for a RAG question, or None
+        
+        The prefix holds SYSTEM_PROMPT and the context upstream, keyed by the
+        context hash, so the request carries only the question.
+        """
+        name = self.prefix_cache.get(SYSTEM_PROMPT, CACHED_CONTEXT_PROMPT.format(context=context), version)
+        return (name, CACHED_QUERY_PROMPT.format(question=question)) if name else None
+    
+    def _backend_generate(self, prompt, cached=None):
+        """Backend call, after the cached prefix when given; prompt is sent in full if the prefix is gone"""
+        if cached is None:
+            return self.backend.generate(prompt)
+        try:
+            return self.backend.generate(cached[1], cached_content=cached[0])
+        except Exception as e:
+            if is_retryable_error(e):
+                raise
+            self.prefix_cache.discard(cached[0])
+            return self.backend.generate(prompt)
+    
+    def _backend_stream(self, prompt, cached=None):
+        """Streaming counterpart of _backend_generate"""
+        if cached is None:
+            yield from self.backend.stream(prompt)
+            return
+        started = False
+        try:
+            for chunk in self.backend.stream(cached[1], cached_content=cached[0]):
+                started = True
+                yield chunk
+        except Exception as e:
+            if started or is_retryable_error(e):
+                raise
+            # Expired or deleted upstream: forget it and answer from the full prompt
+            self.prefix_cache.discard(cached[0])
+            yield from self.backend.stream(prompt)
+    
+    def _generate(self, prompt, priority, cached=None):
+        """Queue a non-streaming call through the scheduler and wait for its text
+        
+        Rate limits and transient errors are retried by the scheduler, so an
+        exception here means retries were exhausted.
+        """
+        # Identical prompts already in flight (e.g. the same narrative from two pages) share one call
+        future = self.scheduler.submit(
+            lambda: self._backend_generate(prompt, cached),
+            priority=priority,
+            est_tokens=self._estimate_request_tokens(prompt, cached),
+            dedupe_key=self._prompt_key(prompt, cached)
+        )
+        return future.result()
+    
+    def _await(self, future, on_wait=None):
+        """Result of a scheduled call, reporting queue position while it waits"""
+        while on_wait is not None and future.ticket.status == 'queued' and not future.done():
+            on_wait(self.scheduler.queue_position(future.ticket), self.scheduler.wait_estimate(future.ticket))
+            wait_futures([future], timeout=0.5)
+        return future.result()
+    
+    def build_context_from_data(self, data_dict, max_tokens=700000, question=None, table_format=None):
+        """Build comprehensive context from all datasets
+        
+        Each section is rendered once per version of its own dataset and
+        reused from the section cache, so refreshing one dataset re-renders
+        only its section. Sections are laid out in SECTION_ORDER, least
+        volatile first, so the text before a changed section stays identical.
+        """
+        table_format = table_format or self.table_format
+        cache = get_section_cache()
+        
+        sections = []
+        for name in SECTION_ORDER:
+            if name == 'examples':
+                key = f"v{CONTEXT_FORMAT_VERSION}-examples-{PROMPT_VERSION}"
+                text = cache.get_or_build(key, lambda: "=== REFERENCE EXAMPLES ===\n" + FEW_SHOT_EXAMPLES)
+            else:
+                df = data_dict.get(name)
+                if df is None or df.empty:
+                    continue
+                key = f"v{CONTEXT_FORMAT_VERSION}-{table_format}-{name}-{frame_version(df)}"
+                text = cache.get_or_build(key, lambda: SECTION_RENDERERS[name](df, table_format))
+            sections.append(Section(name, text))
+        
+        # Rank whole sections by priority, then by overlap with the question
+        question_terms = set(tokenize(question)) if question else set()
+        sections = [
+            s._replace(
+                priority=SECTION_PRIORITIES.get(s.name, 2),
+                relevance=len(question_terms & set(tokenize(s.text)))
+            )
+            for s in sections
+        ]
+        
+        # Exact counts are memoised per text, so only re-rendered sections cost a count call;
+        # they calibrate the estimates the packer uses
+        for section in sections:
+            self.token_counter.count(section.text, exact=True)
+        full_context, _, dropped = pack_sections(sections, max_tokens, self.token_counter)
+        
+        if dropped:
+            full_context += f"\n\n[Omitted to fit token budget: {', '.join(dropped)}]"
         
         return full_context
     
-    def query(self, question, context, stream=False):
-        """Query Gemini with RAG context"""
-        self._rate_limit()
+    def ensure_context(self, data_dict, max_tokens=700000):
+        """Build the shared context for this data version once, returning its cache key"""
+        key = f"v{CONTEXT_FORMAT_VERSION}-{self.table_format}-{data_version(data_dict)}-{max_tokens}"
+        get_context_cache().get_or_build(key, lambda: self.build_context_from_data(data_dict, max_tokens))
+        return key
+    
+    def get_context(self, key):
+        """Context text for a key returned by ensure_context"""
+        return get_context_cache().get(key) or ""
+    
+    def retrieve_context(self, question, data_dict, k=DEFAULT_TOP_K, max_tokens=700000):
+        """Only the top-k passages relevant to the question, packed into max_tokens"""
+        context_key = self.ensure_context(data_dict)
+        index = get_index_cache().get_or_build(
+            context_key,
+            lambda: build_index(data_dict, self.get_context(context_key))
+        )
+        results = index.search(question, k=k)
+        if not results:
+            # Nothing matched lexically: fall back to the dataset summaries
+            results = [(p, 0.0) for p in chunk_sections(self.get_context(context_key))]
+        else:
+            results = with_summaries(index, results)
         
-        # Build prompt
-        prompt = RAG_QUERY_PROMPT.format(context=context, question=question)
-        full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
+        # Summaries rank with their best-matching row; passages are never split
+        best = {}
+        for passage, score in results:
+            best[passage.source] = max(best.get(passage.source, 0.0), score)
+        sections = [
+            Section(
+                name=f"{passage.source}:{i}",
+                text=format_passages([(passage, score)]),
+                priority=1,
+                relevance=best.get(passage.section, score) if passage.source == 'summary' else score
+            )
+            for i, (passage, score) in enumerate(results)
+        ]
+        packed, _, _ = pack_sections(sections, max_tokens, self.token_counter)
+        return packed
+    
+    def answer_question(self, question, data_dict, max_tokens=700000, on_wait=None, mode='rag',
+                        history="", previous_question=""):
+        """Stream an answer, replaying it from the answer cache when already generated
+        
+        mode='rag' sends retrieved passages; mode='tools' lets the model call data functions.
+        history is the conversation summary and recent turns (see ChatMemory.prompt_history);
+        previous_question widens retrieval for follow-ups like "and Karnataka?".
+        """
+        # Plain lookups are answered from the dataframes without spending quota
+        direct = route_question(question, data_dict)
+        if direct is not None:
+            yield from replay_stream(direct)
+            return
         
+        cache = get_answer_cache()
+        key = self._answer_key(question, data_dict, mode, history, max_tokens)
+        
+        cached = cache.get(key)
+        if cached is not None:
+            yield from replay_stream(cached)
+            return
+        
+        full_question = CONVERSATION_PROMPT.format(history=history, question=question) if history else question
+        chunks = []
         try:
-            if stream:
-                response = self.model.generate_content(full_prompt, stream=True)
-                for chunk in response:
-                    if chunk.text:
-                        yield chunk.text
+            if mode == 'tools':
+                chunks.append(self.answer_with_tools(full_question, data_dict, on_wait=on_wait))
+                yield from replay_stream(chunks[0])
             else:
-                response = self.model.generate_content(full_prompt)
-                return response.text
+                search = f"{previous_question} {question}".strip()
+                context = self.retrieve_context(search, data_dict, max_tokens=max_tokens)
+                cached = self._cached_data_request(full_question, data_dict, max_tokens)
+                for chunk in self._stream_answer(self._rag_prompt(full_question, context), on_wait, cached):
+                    chunks.append(chunk)
+                    yield chunk
+        except Exception as e:
+            # Failed or partial answers are shown but never cached
+            yield self._query_error(e)
+            return
+        
+        # Only complete answers are cached
+        answer = "".join(chunks)
+        if answer.strip():
+            cache.put(key, answer)
+    
+    def _cached_data_request(self, question, data_dict, max_tokens=700000):
+        """_cached_request over the whole shared context for this data version, or None
+        
+        Only used with CACHED_FULL_CONTEXT: the question is then answered from
+        every dataset while sending fewer tokens than its retrieved passages,
+        instead of from the passages retrieval selected.
+        """
+        if not CACHED_FULL_CONTEXT:
+            return None
+        context = self.get_context(self.ensure_context(data_dict, max_tokens))
+        return self._cached_request(question, context, data_version(data_dict)) if context else None
+    
+    def _answer_key(self, question, data_dict, mode='rag', history="", max_tokens=700000):
+        # RAG answers depend on how much context the window setting let through
+        prompt_version = f"{PROMPT_VERSION}-t{max_tokens}" if mode == 'rag' else f"{PROMPT_VERSION}-{mode}"
+        if mode == 'rag' and CACHED_FULL_CONTEXT:
+            prompt_version += "-full"  # answered from the whole context, not retrieved passages
+        if history:
+            # A follow-up's answer depends on the conversation so far
+            prompt_version = f"{prompt_version}-h{hashlib.sha256(history.encode('utf-8')).hexdigest()[:12]}"
+        return answer_key(question, data_version(data_dict), prompt_version, self.backend.model_name)
+    
+    def prefetch_answer(self, question, data_dict, max_tokens=700000):
+        """Generate and cache the answer a fresh conversation would get, using idle quota
+        
+        Queued at PRIORITY_PREFETCH, which the scheduler dispatches only when no
+        other request is waiting and recent quota use is low. Returns the
+        Future of the generation, or None when the question is routed to the
+        data or already cached.
+        """
+        if route_question(question, data_dict) is not None:
+            return None
+        cache = get_answer_cache()
+        key = self._answer_key(question, data_dict, max_tokens=max_tokens)
+        if cache.contains(key):
+            return None
         
+        prompt = self._rag_prompt(question, self.retrieve_context(question, data_dict, max_tokens=max_tokens))
+        cached = self._cached_data_request(question, data_dict, max_tokens)
+        future = self.scheduler.submit(
+            lambda: self._backend_generate(prompt, cached),
+            priority=PRIORITY_PREFETCH,
+            session_id='prefetch',
+            est_tokens=self._estimate_request_tokens(prompt, cached),
+            # Kept apart from interactive calls so none of them can coalesce onto a prefetch ticket
+            dedupe_key=self._prompt_key(f"prefetch|{self._prompt_key(prompt, cached)}")
+        )
+        
+        def store(done):
+            if done.exception() is None and (done.result() or "").strip():
+                cache.put(key, done.result())
+        
+        future.add_done_callback(store)
+        return future
+    
+    def answer_with_tools(self, question, data_dict, on_wait=None):
+        """Answer by letting the model call typed data functions; returns the final text
+        
+        Each model round is one scheduled request, so tool mode is rate limited
+        like any other call, and the prompt stays the same size however large
+        the datasets grow.
+        """
+        tools = DataTools(data_dict)
+        session = self.backend.start_tool_session(
+            tools.functions(),
+            system_instruction=f"{SYSTEM_PROMPT}\n\n{TOOL_MODE_PROMPT}"
+        )
+        
+        message = question
+        for _ in range(MAX_TOOL_ROUNDS):
+            future = self.scheduler.submit(
+                lambda message=message: session.send(message),
+                priority=PRIORITY_INTERACTIVE,
+                est_tokens=self._estimate_request_tokens(json.dumps(message, ensure_ascii=False, default=str))
+                + TOOL_DECLARATION_TOKENS
+            )
+            calls, text = self._await(future, on_wait)
+            if not calls:
+                return text
+            message = [(name, tools.call(name, args)) for name, args in calls]
+        raise RuntimeError(f"No answer after {MAX_TOOL_ROUNDS} rounds of data function calls")
+    
+    def query(self, question, context, stream=False, on_wait=None):
+        """Query Gemini with RAG context
+        
+        Returns the answer text, or a generator of chunks when stream=True.
+        on_wait(position, wait_seconds) is called while the request is queued.
+        """
+        full_prompt = self._rag_prompt(question, context)
+        # Contexts above the provider's minimum are cached upstream and reused by later calls
+        cached = self._cached_request(question, context)
+        
+        if stream:
+            return self._stream_query(full_prompt, on_wait, cached)
+        
+        try:
+            return self._generate(full_prompt, PRIORITY_INTERACTIVE, cached)
         except Exception as e:
-            error_msg = f"Error querying Gemini: {str(e)}"
-            if "429" in str(e) or "quota" in str(e).lower():
-                error_msg = "⚠️ Rate limit exceeded. Free tier allows 15 requests/minute. Please wait..."
-            return error_msg
+            return self._query_error(e)
+    
+    @staticmethod
+    def _rag_prompt(question, context):
+        prompt = RAG_QUERY_PROMPT.format(context=context, question=question)
+        return f"{SYSTEM_PROMPT}\n\n{prompt}"
+    
+    def _stream_query(self, full_prompt, on_wait=None, cached=None):
+        """Stream chunks, ending with an error message instead of raising"""
+        try:
+            yield from self._stream_answer(full_prompt, on_wait, cached)
+        except Exception as e:
+            yield self._query_error(e)
+    
+    def _stream_answer(self, full_prompt, on_wait=None, cached=None):
+        """Stream chunks through the scheduler; raises once retries are exhausted
+        
+        cached is a (prefix name, prompt) pair from _cached_request, sent
+        instead of full_prompt while the provider still holds the prefix.
+        """
+        def stream_chunks(prompt=full_prompt, cached=cached):
+            return self._backend_stream(prompt, cached)
+        
+        def resume_chunks(partial):
+            # A retried stream continues the interrupted answer instead of starting over
+            resume_cached = None
+            if cached is not None:
+                resume_cached = (cached[0], STREAM_RESUME_PROMPT.format(prompt=cached[1], partial=partial))
+            return stream_chunks(STREAM_RESUME_PROMPT.format(prompt=full_prompt, partial=partial), resume_cached)
+        
+        # Users asking the same question at once share one upstream stream;
+        # 429s and transient failures are retried by the scheduler
+        handle = self.scheduler.submit_stream(
+            stream_chunks,
+            priority=PRIORITY_INTERACTIVE,
+            est_tokens=self._estimate_request_tokens(full_prompt, cached),
+            dedupe_key=self._prompt_key(full_prompt, cached),
+            resume_fn=resume_chunks
+        )
+        if on_wait is not None:
+            while not handle.wait_started(timeout=0.5):
+                on_wait(handle.position(), handle.wait_estimate())
+        yield from handle
+    
+    @staticmethod
+    def _query_error(e):
+        error_msg = f"Error querying Gemini: {str(e)}"
+        if "429" in str(e) or "quota" in str(e).lower():
+            error_msg = "⚠️ Rate limit exceeded. Free tier allows 15 requests/minute. Please wait..."
+        return error_msg
+    
+    def summarize_conversation(self, previous_summary, turns):
+        """Future of a compressed conversation summary, generated at the lowest priority"""
+        prompt = CONVERSATION_SUMMARY_PROMPT.format(summary=previous_summary or "(none)", turns=turns)
+        return self.scheduler.submit(
+            lambda: self.backend.generate(prompt),
+            priority=PRIORITY_INSIGHT,
+            est_tokens=self._estimate_request_tokens(prompt)
+        )
     
     def generate_report_summary(self, data_summary, month_year):
         """Generate executive summary for boardroom report"""
-        self._rate_limit()
-        
         prompt = REPORT_GENERATION_PROMPT.format(
             month_year=month_year,
             data_summary=data_summary
         )
         
         try:
-            response = self.model.generate_content(f"{SYSTEM_PROMPT}\n\n{prompt}")
-            return response.text
+            return self._generate(f"{SYSTEM_PROMPT}\n\n{prompt}", PRIORITY_REPORT)
         except Exception as e:
             return f"Error generating report: {str(e)}"
     
+    def _batch_keys(self, task, items):
+        """Cache key per item: its fields, the task prompt and prompt version, and the model"""
+        prompt_version = f"{PROMPT_VERSION}-batch-{hashlib.sha256(task.encode('utf-8')).hexdigest()[:8]}"
+        return {
+            item_id: answer_key(json.dumps(fields, sort_keys=True, default=str), '', prompt_version,
+                                self.backend.model_name)
+            for item_id, fields in items.items()
+        }
+    
+    def _cached_batch(self, task, items, cache=None):
+        """Items of a batch that are already cached, without making a request"""
+        cache = cache or get_answer_cache()
+        results = {}
+        for item_id, key in self._batch_keys(task, items).items():
+            cached = cache.get(key)
+            if cached is not None:
+                results[item_id] = cached
+        return results
+    
+    def _generate_batch(self, task, items, priority, error_text, cache=None):
+        """Texts for many items from one structured-output request, cached per item
+        
+        items maps an id to a JSON-serialisable dict describing that item. Cached
+        items are not sent again, and the rest go out BATCH_MAX_ITEMS per request,
+        all queued at once. Returns id -> text; failed items get error_text
+        (formatted with {error}) and are not cached.
+        """
+        cache = cache or get_answer_cache()
+        keys = self._batch_keys(task, items)
+        results = self._cached_batch(task, items, cache)
+        missing = [item_id for item_id in items if item_id not in results]
+        
+        batches = []
+        for start in range(0, len(missing), BATCH_MAX_ITEMS):
+            # Short aliases keep the response schema's property names simple
+            aliases = {f"item{n + 1}": item_id for n, item_id in enumerate(missing[start:start + BATCH_MAX_ITEMS])}
+            payload = json.dumps({alias: items[item_id] for alias, item_id in aliases.items()},
+                                 indent=1, sort_keys=True, default=str, ensure_ascii=False)
+            prompt = f"{SYSTEM_PROMPT}\n\n" + BATCH_NARRATIVE_PROMPT.format(task=task, items=payload)
+            future = self.scheduler.submit(
+                lambda p=prompt, k=list(aliases): self.backend.generate_json(p, k),
+                priority=priority,
+                est_tokens=self._estimate_request_tokens(prompt),
+                dedupe_key=self._prompt_key(f"json|{prompt}")
+            )
+            batches.append((aliases, future))
+        
+        for aliases, future in batches:
+            try:
+                replies = _parse_json_object(future.result())
+            except Exception as e:
+                results.update({item_id: error_text.format(error=e) for item_id in aliases.values()})
+                continue
+            for alias, item_id in aliases.items():
+                text = replies.get(alias)
+                if isinstance(text, str) and text.strip():
+                    results[item_id] = text.strip()
+                    cache.put(keys[item_id], results[item_id])
+                else:
+                    results[item_id] = error_text.format(error="no text returned for this item")
+        return results
+    
+    def generate_forecast_narratives(self, forecasts):
+        """Storytelling narratives for several forecasts in one request
+        
+        forecasts maps a metric name to a dict of current_value, predicted_value,
+        change_percent and trend. Returns metric name -> narrative.
+        """
+        items = {name: dict(metric_name=name, **fields) for name, fields in forecasts.items()}
+        return self._generate_batch(FORECAST_BATCH_TASK, items, PRIORITY_REPORT, "Error generating narrative: {error}")
+    
     def generate_forecast_narrative(self, metric_name, current_value, predicted_value, change_percent, trend):
         """Generate storytelling narrative for forecasts"""
-        self._rate_limit()
-        
-        prompt = FORECAST_NARRATIVE_PROMPT.format(
-            metric_name=metric_name,
-            current_value=current_value,
-            predicted_value=predicted_value,
-            change_percent=change_percent,
-            trend=trend
-        )
-        
-        try:
-            response = self.model.generate_content(f"{SYSTEM_PROMPT}\n\n{prompt}")
-            return response.text
-        except Exception as e:
-            return f"Error generating narrative: {str(e)}"
+        return self.generate_forecast_narratives({
+            metric_name: {
+                'current_value': current_value,
+                'predicted_value': predicted_value,
+                'change_percent': change_percent,
+                'trend': trend,
+            }
+        })[metric_name]
     
-    def detect_anomalies(self, data_points):
-        """Detect anomalies in financial data"""
-        self._rate_limit()
+    def narrate_anomalies(self, findings):
+        """Narration per finding from anomaly_engine.find_anomalies, in one request
         
-        prompt = ANOMALY_DETECTION_PROMPT.format(data_points=data_points)
+        Only the findings are sent, never the raw series. Returns {index: text}
+        for the findings narrated; callers fall back to anomaly_engine.describe.
+        """
+        items = {i: dict(finding._asdict(), value=round(finding.value, 2), typical=round(finding.typical, 2),
+                         score=round(finding.score, 1))
+                 for i, finding in enumerate(findings)}
+        narrated = self._generate_batch(ANOMALY_BATCH_TASK, items, PRIORITY_REPORT, "")
+        return {i: text for i, text in narrated.items() if text}
+    
+    @staticmethod
+    def _chart_items(charts):
+        return {chart_id: {'chart_type': chart_type, 'data_summary': summary}
+                for chart_id, (chart_type, summary) in charts.items()}
+    
+    def get_chart_insights_batch(self, charts, cache=None):
+        """Insights for several charts in one request
         
-        try:
-            response = self.model.generate_content(f"{SYSTEM_PROMPT}\n\n{prompt}")
-            return response.text
-        except Exception as e:
-            return f"Error detecting anomalies: {str(e)}"
+        charts maps a chart id to (chart_type, data_summary). Returns chart id -> bullet insights.
+        """
+        return self._generate_batch(CHART_INSIGHTS_BATCH_TASK, self._chart_items(charts), PRIORITY_INSIGHT,
+                                    "Unable to generate insights at this time.", cache=cache)
+    
+    def cached_chart_insights(self, charts, cache=None):
+        """The subset of get_chart_insights_batch already cached; never makes a request"""
+        return self._cached_batch(CHART_INSIGHTS_BATCH_TASK, self._chart_items(charts), cache)
     
     def get_chart_insights(self, chart_type, data_summary):
         """Generate insights from chart data"""
-        self._rate_limit()
-        
-        prompt = f"""Analyze this {chart_type} and provide 3 key business insights:
-
-Data Summary:
-{data_summary}
-
-Provide insights in this format:
-• [Insight 1]
-• [Insight 2]
-• [Insight 3]
-"""
-        
-        try:
-            response = self.model.generate_content(f"{SYSTEM_PROMPT}\n\n{prompt}")
-            return response.text
-        except Exception as e:
-            return "Unable to generate insights at this time."
+        return self.get_chart_insights_batch({chart_type: (chart_type, data_summary)})[chart_type]
 
 
 # Global instance (initialized in app)
@@ -274,9 +711,123 @@ def get_rag_instance():
     return _rag_instance
 
 
-if __name__ == "__main__":
-    # Test RAG
+def run_benchmark(concurrency=20, questions=5):
+    """Fire concurrent chat queries from separate sessions and report latency percentiles
+    
+    Meant for PULSEAI_LLM_BACKEND=stub, where it runs offline against the
+    configured latency, throughput and failure injection.
+    """
+    import threading
+    import numpy as np
+    
     rag = GeminiRAG()
     test_context = "UPI transactions in Oct 2025: 16.5 billion, ₹20.64 lakh crore"
-    response = rag.query("What was UPI volume in Oct 2025?", test_context)
-    print(response)
+    ttft, totals = [], []
+    
+    def session(i):
+        # Each thread is its own session for the scheduler's round robin
+        start = time.time()
+        first = None
+        for _ in rag.query(f"Question {i % questions}: what was UPI volume?", test_context, stream=True):
+            first = first or time.time()
+        ttft.append((first or time.time()) - start)
+        totals.append(time.time() - start)
+    
+    threads = [threading.Thread(target=session, args=(i,), name=f"bench-{i}") for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    print(f"backend={rag.backend.model_name} sessions={concurrency} distinct_questions={questions}")
+    print(f"TTFT  p50={np.percentile(ttft, 50):.2f}s p95={np.percentile(ttft, 95):.2f}s")
+    print(f"Total p50={np.percentile(totals, 50):.2f}s p95={np.percentile(totals, 95):.2f}s")
+    print({k: v for k, v in rag.scheduler.metrics().items() if k != 'queued'})
+
+
+def run_context_benchmark(max_tokens=700000):
+    """Context tokens per table format, and time to first token for one question with each
+    
+    Calls the backend directly (no scheduler), so it measures prompt size
+    rather than queueing; with the stub, prefill time follows
+    PULSEAI_STUB_PREFILL_TOKENS_PER_SEC.
+    """
+    from .data_downloader import load_all_data
+    
+    rag = GeminiRAG()
+    data = load_all_data()
+    question = "What was the UPI volume in the latest month?"
+    baseline = None
+    print(f"backend={rag.backend.model_name} max_tokens={max_tokens:,}")
+    for table_format in TABLE_FORMATS:
+        start = time.time()
+        context = rag.build_context_from_data(data, max_tokens, table_format=table_format)
+        build_ms = (time.time() - start) * 1000
+        tokens = rag.token_counter.count(context, exact=True)
+        baseline = baseline or tokens
+        
+        start = time.time()
+        next(iter(rag.backend.stream(rag._rag_prompt(question, context))), None)
+        ttft = time.time() - start
+        # The digit-aware estimate matters for the stub, whose own count is characters / 4
+        print(f"{table_format:8} {tokens:>7,} tokens ({tokens / baseline:5.1%} of padded) · "
+              f"~{heuristic_tokens(context):>7,.0f} digit-aware · {len(context):>6,} chars · "
+              f"build {build_ms:5.1f} ms · TTFT {ttft:.2f}s")
+
+
+def run_prefix_benchmark(questions=5, max_tokens=700000):
+    """Input tokens and time to first token per question, full prompt versus upstream-cached context
+    
+    Like run_context_benchmark, calls the backend directly. The stub models
+    cached prefixes, so this runs offline; its minimum cache size is
+    PULSEAI_STUB_MIN_CACHE_TOKENS.
+    """
+    from .data_downloader import load_all_data
+    
+    rag = GeminiRAG()
+    data = load_all_data()
+    context = rag.build_context_from_data(data, max_tokens)
+    asked = [f"Question {i}: what was the UPI volume in the latest month?" for i in range(questions)]
+    print(f"backend={rag.backend.model_name} questions={questions} context={rag.token_counter.count(context, exact=True):,} tokens")
+    
+    start = time.time()
+    # Built up front; in the app the first questions send the full prompt while it is created
+    name = rag.prefix_cache.build(SYSTEM_PROMPT, CACHED_CONTEXT_PROMPT.format(context=context), data_version(data))
+    create_s = time.time() - start
+    if name is None:
+        print(f"No cached prefix (context below the {rag.backend.min_cache_tokens:,} token minimum, "
+              f"or caching unavailable): {rag.prefix_cache.stats()}")
+        return
+    print(f"prefix {name} created in {create_s:.2f}s")
+    
+    for label in ('full', 'cached'):
+        tokens, ttft = [], []
+        for question in asked:
+            prompt = rag._rag_prompt(question, context)
+            request = rag._cached_request(question, context, data_version(data)) if label == 'cached' else None
+            tokens.append(rag.token_counter.count(request[1] if request else prompt, exact=True))
+            start = time.time()
+            next(iter(rag._backend_stream(prompt, request)), None)
+            ttft.append(time.time() - start)
+        print(f"{label:6} {sum(tokens) / len(tokens):>7,.0f} input tokens/question · "
+              f"avg TTFT {sum(ttft) / len(ttft):.2f}s")
+    print(rag.prefix_cache.stats())
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if "--context-bench" in sys.argv:
+        run_context_benchmark()
+    elif "--prefix-bench" in sys.argv:
+        args = sys.argv[sys.argv.index("--prefix-bench") + 1:]
+        run_prefix_benchmark(*(int(a) for a in args[:1]))
+    elif "--bench" in sys.argv:
+        args = sys.argv[sys.argv.index("--bench") + 1:]
+        run_benchmark(*(int(a) for a in args[:2]))
+    else:
+        # Test RAG
+        rag = GeminiRAG()
+        test_context = "UPI transactions in Oct 2025: 16.5 billion, ₹20.64 lakh crore"
+        response = rag.query("What was UPI volume in Oct 2025?", test_context)
+        print(response)
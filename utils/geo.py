@@ -0,0 +1,358 @@
+"""
+PulseAI - Geometry Utilities
+Topology-preserving simplification and level-of-detail district geometry
+"""
+
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import requests
+from dotenv import load_dotenv
+
+from .file_cache import file_sha256, HashManifest, cache_dir
+
+load_dotenv()
+
+GEO_RAW_DIR = Path(__file__).parent.parent / "data" / "raw" / "geo"
+DISTRICT_SOURCE = GEO_RAW_DIR / "india_districts.geojson"
+CACHE_NAMESPACE = "geo"
+
+# Vendored state boundaries (fetched once with `python -m utils.geo --vendor`)
+STATES_ASSET = Path(__file__).parent.parent / "assets" / "geo" / "india_states.geojson"
+STATES_REMOTE_URL = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+
+# Size vs fidelity: larger tolerance = smaller payload, coarser borders (0 keeps full detail)
+STATE_MAP_TOLERANCE = float(os.getenv("PULSEAI_MAP_TOLERANCE", "0.01"))
+
+# Douglas-Peucker tolerance in degrees per zoom level (0.01° ≈ 1.1 km)
+LOD_TOLERANCES = {
+    'low': 0.05,      # national overview
+    'medium': 0.01,   # single state
+    'high': 0.002,    # zoomed into a few districts
+}
+DEFAULT_DISTRICT_LOD = 'medium'
+
+# The vendored asset is stored at the finest level so every map tolerance can be derived from it
+VENDOR_TOLERANCE = LOD_TOLERANCES['high']
+
+# Property names used by the common India district GeoJSON releases
+DISTRICT_NAME_KEYS = ['district', 'DISTRICT', 'dtname', 'DT_NM', 'NAME_2']
+STATE_NAME_KEYS = ['state', 'ST_NM', 'st_nm', 'STATE', 'NAME_1']
+
+COORD_PRECISION = 6
+
+
+# ----------------------------------------------------------------------------
+# Topology-preserving simplification
+# ----------------------------------------------------------------------------
+
+def _douglas_peucker(points, tolerance):
+    """Indices of points kept by Douglas-Peucker (endpoints always kept)"""
+    n = len(points)
+    if n < 3:
+        return list(range(n))
+
+    pts = np.asarray(points, dtype=float)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = pts[end] - pts[start]
+        inner = pts[start + 1:end] - pts[start]
+        seg_len = np.hypot(*seg)
+        if seg_len == 0:
+            dists = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dists = np.abs(seg[0] * inner[:, 1] - seg[1] * inner[:, 0]) / seg_len
+        idx = int(np.argmax(dists))
+        if dists[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep).tolist()
+
+
+def _key(point):
+    return (round(point[0], COORD_PRECISION), round(point[1], COORD_PRECISION))
+
+
+def _iter_rings(geometry):
+    """Yield every ring list of a Polygon/MultiPolygon, in place-editable form"""
+    if not geometry:
+        return
+    if geometry['type'] == 'Polygon':
+        yield from geometry['coordinates']
+    elif geometry['type'] == 'MultiPolygon':
+        for polygon in geometry['coordinates']:
+            yield from polygon
+
+
+def _find_junctions(rings):
+    """Vertices where borders meet: any point with other than two distinct neighbours"""
+    neighbours = {}
+    for ring in rings:
+        keys = [_key(p) for p in ring[:-1]]
+        n = len(keys)
+        for i, k in enumerate(keys):
+            adj = neighbours.setdefault(k, set())
+            adj.add(keys[i - 1])
+            adj.add(keys[(i + 1) % n])
+    return {k for k, adj in neighbours.items() if len(adj) != 2}
+
+
+def _simplify_ring(ring, junctions, arc_cache, tolerance):
+    """Simplify a closed ring arc by arc so shared borders simplify identically"""
+    points = ring[:-1]
+    n = len(points)
+    if n < 4:
+        return ring
+
+    keys = [_key(p) for p in points]
+    cuts = [i for i, k in enumerate(keys) if k in junctions]
+    if not cuts:
+        # Isolated ring (islands, outer coastline): anchor at the first vertex
+        # and the vertex farthest from it so the loop cannot collapse
+        pts = np.asarray(points, dtype=float)
+        far = int(np.argmax(np.hypot(*(pts - pts[0]).T)))
+        cuts = [0, far] if far else [0]
+
+    # Rotate so the ring starts on a cut point
+    start = cuts[0]
+    points = points[start:] + points[:start]
+    keys = keys[start:] + keys[:start]
+    cuts = sorted((c - start) % n for c in cuts) + [n]
+
+    result = []
+    for a, b in zip(cuts, cuts[1:]):
+        arc = points[a:b + 1] if b < n else points[a:] + points[:1]
+        arc_keys = tuple(keys[a:b + 1] if b < n else keys[a:] + keys[:1])
+
+        # Neighbouring polygons walk shared arcs in opposite directions
+        if arc_keys in arc_cache:
+            kept = arc_cache[arc_keys]
+        elif arc_keys[::-1] in arc_cache:
+            kept = arc_cache[arc_keys[::-1]][::-1]
+        else:
+            kept = [arc[i] for i in _douglas_peucker(arc, tolerance)]
+            arc_cache[arc_keys] = kept
+        result.extend(kept[:-1])
+
+    if len(result) < 3:
+        return ring
+    return result + [result[0]]
+
+
+def simplify_geojson(geojson, tolerance):
+    """Simplify a FeatureCollection without opening gaps between neighbours"""
+    features = geojson.get('features', [])
+    rings = [ring for f in features for ring in _iter_rings(f.get('geometry'))]
+    junctions = _find_junctions(rings)
+    arc_cache = {}
+
+    simplified = []
+    for feature in features:
+        geometry = feature.get('geometry')
+        if geometry and geometry['type'] == 'Polygon':
+            coords = [_simplify_ring(r, junctions, arc_cache, tolerance) for r in geometry['coordinates']]
+        elif geometry and geometry['type'] == 'MultiPolygon':
+            coords = [[_simplify_ring(r, junctions, arc_cache, tolerance) for r in polygon]
+                      for polygon in geometry['coordinates']]
+        else:
+            simplified.append(feature)
+            continue
+        simplified.append({
+            'type': 'Feature',
+            'properties': feature.get('properties', {}),
+            'geometry': {'type': geometry['type'], 'coordinates': _round_coords(coords)}
+        })
+    return {'type': 'FeatureCollection', 'features': simplified}
+
+
+def _round_coords(coords, precision=4):
+    """Trim coordinate precision (4 dp ≈ 11 m) to shrink the serialized payload"""
+    if coords and isinstance(coords[0], (int, float)):
+        return [round(c, precision) for c in coords]
+    return [_round_coords(c, precision) for c in coords]
+
+
+# ----------------------------------------------------------------------------
+# State boundaries
+# ----------------------------------------------------------------------------
+
+class StateBoundariesMissing(FileNotFoundError):
+    """The vendored state boundaries have not been generated yet"""
+
+    def __init__(self, path=STATES_ASSET):
+        super().__init__(f"State boundaries not found at {path}; "
+                         "run `python -m utils.geo --vendor` once and commit the file")
+
+
+# (size, mtime, tolerance) -> simplified boundaries; only successful loads are kept
+_state_geojson_cache = {}
+
+
+def vendor_state_geojson(url=STATES_REMOTE_URL, dest=STATES_ASSET, tolerance=VENDOR_TOLERANCE):
+    """Download the state boundaries once and store them, pre-simplified, with the app"""
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    geojson = response.json()
+    if tolerance > 0:
+        geojson = simplify_geojson(geojson, tolerance)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with open(dest, 'w', encoding='utf-8') as f:
+        json.dump(geojson, f, separators=(',', ':'))
+    return dest
+
+
+def load_state_geojson(tolerance=STATE_MAP_TOLERANCE):
+    """Simplified state boundaries, built once per tolerance and cached on disk and in memory
+
+    Raises StateBoundariesMissing when the asset has not been vendored; the
+    missing result is not cached, so the map works as soon as the file exists.
+    """
+    try:
+        stat = STATES_ASSET.stat()
+    except FileNotFoundError:
+        raise StateBoundariesMissing() from None
+    memo_key = (stat.st_size, stat.st_mtime_ns, tolerance)
+    if memo_key in _state_geojson_cache:
+        return _state_geojson_cache[memo_key]
+
+    digest = file_sha256(STATES_ASSET)
+    cached = cache_dir(CACHE_NAMESPACE) / f"states_{digest[:16]}_{tolerance:g}.geojson"
+    if cached.exists():
+        with open(cached, encoding='utf-8') as f:
+            geojson = json.load(f)
+    else:
+        with open(STATES_ASSET, encoding='utf-8') as f:
+            geojson = json.load(f)
+        if tolerance > 0:
+            geojson = simplify_geojson(geojson, tolerance)
+        with open(cached, 'w', encoding='utf-8') as f:
+            json.dump(geojson, f, separators=(',', ':'))
+
+    if len(_state_geojson_cache) >= 4:
+        _state_geojson_cache.clear()
+    _state_geojson_cache[memo_key] = geojson
+    return geojson
+
+
+# ----------------------------------------------------------------------------
+# District level-of-detail store
+# ----------------------------------------------------------------------------
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '_', str(name).lower()).strip('_')
+
+
+def _first_property(properties, keys):
+    for key in keys:
+        if properties.get(key):
+            return str(properties[key]).strip()
+    return None
+
+
+def district_lod_dir(level):
+    return cache_dir(CACHE_NAMESPACE) / "districts" / level
+
+
+def build_district_lods(source=DISTRICT_SOURCE, tolerances=LOD_TOLERANCES):
+    """Pre-simplify the nationwide district GeoJSON per zoom level, split by state"""
+    source = Path(source)
+    if not source.exists():
+        return False
+
+    digest = file_sha256(source)
+    manifest = HashManifest(CACHE_NAMESPACE)
+    record = manifest.get(digest)
+    if record and record.get('levels') == sorted(tolerances) and (cache_dir(CACHE_NAMESPACE) / "district_index.json").exists():
+        return False
+
+    with open(source, encoding='utf-8') as f:
+        geojson = json.load(f)
+
+    # Normalise names once so every level and the data store share the same keys
+    index = {}
+    for feature in geojson.get('features', []):
+        props = feature.get('properties') or {}
+        state = _first_property(props, STATE_NAME_KEYS)
+        district = _first_property(props, DISTRICT_NAME_KEYS)
+        feature['properties'] = {'state': state, 'district': district}
+        if state and district:
+            index.setdefault(state, []).append(district)
+
+    for level, tolerance in tolerances.items():
+        simplified = simplify_geojson(geojson, tolerance)
+        by_state = {}
+        for feature in simplified['features']:
+            by_state.setdefault(feature['properties']['state'], []).append(feature)
+
+        level_dir = district_lod_dir(level)
+        level_dir.mkdir(parents=True, exist_ok=True)
+        for state, features in by_state.items():
+            if not state:
+                continue
+            with open(level_dir / f"{slugify(state)}.geojson", 'w', encoding='utf-8') as f:
+                json.dump({'type': 'FeatureCollection', 'features': features}, f, separators=(',', ':'))
+
+    index_file = cache_dir(CACHE_NAMESPACE) / "district_index.json"
+    index_file.write_text(json.dumps({s: sorted(d) for s, d in sorted(index.items())}, indent=1), encoding='utf-8')
+    manifest.put(digest, {'source': str(source), 'levels': sorted(tolerances)})
+    _load_state_districts.cache_clear()
+    return True
+
+
+def load_district_index():
+    """State -> district names for every district with geometry"""
+    index_file = cache_dir(CACHE_NAMESPACE) / "district_index.json"
+    if not index_file.exists():
+        return {}
+    return json.loads(index_file.read_text(encoding='utf-8'))
+
+
+@lru_cache(maxsize=64)
+def _load_state_districts(state_slug, level):
+    path = district_lod_dir(level) / f"{state_slug}.geojson"
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_state_district_geojson(state, level=DEFAULT_DISTRICT_LOD):
+    """District geometry for one state only, at the requested level of detail"""
+    return _load_state_districts(slugify(state), level)
+
+
+def _geojson_stats(geojson):
+    vertices = sum(len(r) for f in geojson['features'] for r in _iter_rings(f.get('geometry')))
+    return vertices, len(json.dumps(geojson, separators=(',', ':')))
+
+
+if __name__ == "__main__":
+    if "--vendor" in sys.argv:
+        print(f"Vendoring state boundaries to {vendor_state_geojson()}")
+
+    if not STATES_ASSET.exists():
+        print(StateBoundariesMissing())
+    else:
+        with open(STATES_ASSET, encoding='utf-8') as f:
+            full_vertices, full_bytes = _geojson_stats(json.load(f))
+        print(f"Full: {full_vertices:,} vertices, {full_bytes / 1024:,.0f} KB")
+        for tolerance in (0.002, 0.005, 0.01, 0.02, 0.05):
+            vertices, size = _geojson_stats(load_state_geojson(tolerance))
+            print(f"tolerance={tolerance}: {vertices:,} vertices, {size / 1024:,.0f} KB")
+
+    print(f"Building district LODs from {DISTRICT_SOURCE}...")
+    print("Rebuilt" if build_district_lods() else "Up to date (or no source file)")
+    for state, districts in load_district_index().items():
+        print(f"{state}: {len(districts)} districts")
@@ -0,0 +1,364 @@
+"""
+PulseAI - LLM Backends
+Gemini and a deterministic local stub behind one interface, selected with PULSEAI_LLM_BACKEND
+"""
+
+import datetime
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+MAX_OUTPUT_TOKENS = 2048
+COUNT_TIMEOUT = 5  # seconds
+MIN_CACHE_TOKENS = 1024  # smallest cached content Gemini 2.5 Flash accepts
+
+# Stub behaviour, all overridable from the environment
+STUB_LATENCY = float(os.getenv("PULSEAI_STUB_LATENCY", "0.5"))            # seconds to first chunk
+STUB_TOKENS_PER_SEC = float(os.getenv("PULSEAI_STUB_TOKENS_PER_SEC", "60"))
+STUB_PREFILL_TOKENS_PER_SEC = float(os.getenv("PULSEAI_STUB_PREFILL_TOKENS_PER_SEC", "20000"))  # prompt reading
+STUB_ERROR_RATE = float(os.getenv("PULSEAI_STUB_ERROR_RATE", "0"))        # transient 503s, some mid-stream
+STUB_RATE_LIMIT_RATE = float(os.getenv("PULSEAI_STUB_429_RATE", "0"))     # injected 429s
+STUB_SEED = int(os.getenv("PULSEAI_STUB_SEED", "0"))
+STUB_MIN_CACHE_TOKENS = int(os.getenv("PULSEAI_STUB_MIN_CACHE_TOKENS", str(MIN_CACHE_TOKENS)))
+STUB_ANSWER_TOKENS = 120
+STUB_CHUNK_TOKENS = 8
+
+STUB_VOCABULARY = (
+    "UPI volume credit deposit growth state repo rate RBI NPCI month lakh crore billion "
+    "transactions digital adoption ratio policy inflation liquidity trend seasonal festive "
+    "Maharashtra Karnataka Tamil Nadu Uttar Pradesh percent YoY MoM steady rise decline"
+).split()
+
+
+class LLMBackend:
+    """Interface the RAG engine talks to; one instance is shared by all sessions"""
+
+    model_name = None
+    max_output_tokens = MAX_OUTPUT_TOKENS
+    min_cache_tokens = MIN_CACHE_TOKENS
+
+    def generate(self, prompt, cached_content=None):
+        """Complete response text; cached_content names a prefix from create_cache to answer after"""
+        raise NotImplementedError
+
+    def stream(self, prompt, cached_content=None):
+        """Iterator of response text chunks"""
+        raise NotImplementedError
+
+    def generate_json(self, prompt, keys):
+        """JSON object text with one string value per key (structured output)"""
+        raise NotImplementedError
+
+    def count_tokens(self, text):
+        """Exact token count; raises if the backend cannot count"""
+        raise NotImplementedError
+
+    def start_tool_session(self, functions, system_instruction=None):
+        """Conversation in which the model may call the given Python functions; returns a ToolSession"""
+        raise NotImplementedError
+
+    def create_cache(self, system_instruction, content, ttl):
+        """Store a prompt prefix upstream for ttl seconds; returns its name"""
+        raise NotImplementedError
+
+    def refresh_cache(self, name, ttl):
+        """Extend a cached prefix to expire ttl seconds from now"""
+        raise NotImplementedError
+
+    def delete_cache(self, name):
+        raise NotImplementedError
+
+
+class ToolSession:
+    """One function-calling conversation
+
+    send() takes the user message (str) or a list of (function name, result)
+    pairs, makes one model call, and returns (calls, text): the function
+    calls the model wants as (name, args) pairs, or its final text.
+    """
+
+    def send(self, message):
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """google.generativeai GenerativeModel"""
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL, max_output_tokens=MAX_OUTPUT_TOKENS):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.max_output_tokens = max_output_tokens
+        self.generation_config = {
+            'temperature': 0.7,
+            'top_p': 0.95,
+            'top_k': 40,
+            'max_output_tokens': max_output_tokens,
+        }
+        self.model = genai.GenerativeModel(model_name, generation_config=self.generation_config)
+        self._cached_models = {}  # cached content name -> GenerativeModel answering after it
+        self._cache_lock = threading.Lock()
+
+    def _model_for(self, cached_content):
+        if cached_content is None:
+            return self.model
+        import google.generativeai as genai
+
+        with self._cache_lock:
+            model = self._cached_models.get(cached_content)
+        if model is None:
+            # Looks the cache up upstream, so a name created by another worker process works too
+            model = genai.GenerativeModel.from_cached_content(cached_content, generation_config=self.generation_config)
+            with self._cache_lock:
+                self._cached_models[cached_content] = model
+        return model
+
+    def generate(self, prompt, cached_content=None):
+        return self._model_for(cached_content).generate_content(prompt).text
+
+    def stream(self, prompt, cached_content=None):
+        for chunk in self._model_for(cached_content).generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+    def generate_json(self, prompt, keys):
+        generation_config = dict(
+            self.generation_config,
+            response_mime_type='application/json',
+            response_schema={
+                'type': 'OBJECT',
+                'properties': {key: {'type': 'STRING'} for key in keys},
+                'required': list(keys),
+            }
+        )
+        return self.model.generate_content(prompt, generation_config=generation_config).text
+
+    def count_tokens(self, text):
+        response = self.model.count_tokens(text, request_options={'timeout': COUNT_TIMEOUT, 'retry': None})
+        return int(response.total_tokens)
+
+    def start_tool_session(self, functions, system_instruction=None):
+        import google.generativeai as genai
+
+        # Declarations are built from the functions' signatures and docstrings
+        model = genai.GenerativeModel(
+            self.model_name,
+            generation_config=self.generation_config,
+            tools=functions,
+            system_instruction=system_instruction
+        )
+        return GeminiToolSession(model.start_chat())
+
+    def create_cache(self, system_instruction, content, ttl):
+        from google.generativeai import caching
+
+        cached = caching.CachedContent.create(
+            model=f"models/{self.model_name}",
+            display_name="pulseai-context",
+            system_instruction=system_instruction,
+            contents=[content],
+            ttl=datetime.timedelta(seconds=ttl)
+        )
+        return cached.name
+
+    def refresh_cache(self, name, ttl):
+        from google.generativeai import caching
+
+        caching.CachedContent.get(name).update(ttl=datetime.timedelta(seconds=ttl))
+
+    def delete_cache(self, name):
+        from google.generativeai import caching
+
+        with self._cache_lock:
+            self._cached_models.pop(name, None)
+        caching.CachedContent.get(name).delete()
+
+
+class GeminiToolSession(ToolSession):
+    """Manual function calling, so every model round goes through the scheduler"""
+
+    def __init__(self, chat):
+        self.chat = chat
+
+    def send(self, message):
+        import google.generativeai as genai
+
+        if not isinstance(message, str):
+            message = [
+                genai.protos.Part(function_response=genai.protos.FunctionResponse(name=name, response={'result': result}))
+                for name, result in message
+            ]
+        response = self.chat.send_message(message)
+        calls = [(part.function_call.name, dict(part.function_call.args))
+                 for part in response.parts if part.function_call]
+        return calls, (None if calls else response.text)
+
+
+class StubRateLimitError(Exception):
+    """Injected 429, shaped like Gemini's ResourceExhausted message"""
+
+
+class StubServerError(Exception):
+    """Injected transient 503"""
+
+
+class StubCacheError(Exception):
+    """Cached content rejected or missing, shaped like Gemini's 400 / 404 messages"""
+
+
+class StubBackend(LLMBackend):
+    """Offline backend streaming deterministic text at a configurable pace
+
+    The same prompt always yields the same answer. Failures are drawn from a
+    seeded generator, so a load test with the same seed and request order
+    sees the same sequence of 429s and 503s.
+    """
+
+    def __init__(self, latency=STUB_LATENCY, tokens_per_sec=STUB_TOKENS_PER_SEC, error_rate=STUB_ERROR_RATE,
+                 rate_limit_rate=STUB_RATE_LIMIT_RATE, seed=STUB_SEED, answer_tokens=STUB_ANSWER_TOKENS,
+                 prefill_tokens_per_sec=STUB_PREFILL_TOKENS_PER_SEC, min_cache_tokens=STUB_MIN_CACHE_TOKENS):
+        self.model_name = 'local-stub'
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.prefill_tokens_per_sec = prefill_tokens_per_sec
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.answer_tokens = answer_tokens
+        self.min_cache_tokens = min_cache_tokens
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._caches = {}  # name -> (prefix text, expiry time)
+        self.calls = 0
+
+    def _answer_words(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        words = random.Random(digest).choices(STUB_VOCABULARY, k=self.answer_tokens)
+        return [f"[stub {digest[:8]}]"] + words
+
+    def _draw_failure(self):
+        """None, or (exception, tokens emitted before it is raised)"""
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+            fail_after = self._rng.randrange(self.answer_tokens)
+        if roll < self.rate_limit_rate:
+            return StubRateLimitError("429 Resource has been exhausted (e.g. check quota). Please retry in 1s."), 0
+        if roll < self.rate_limit_rate + self.error_rate:
+            return StubServerError("503 The model is overloaded. Please try again later."), fail_after
+        return None
+
+    def _time_to_first_token(self, prompt):
+        """Fixed latency plus prompt reading time, so smaller prompts answer sooner"""
+        return self.latency + self.count_tokens(prompt) / self.prefill_tokens_per_sec
+
+    def _cached_prefix(self, name):
+        """Text of a live cached prefix; raises like Gemini for unknown or expired names"""
+        if name is None:
+            return ""
+        with self._lock:
+            prefix, expires = self._caches.get(name, (None, 0))
+        if prefix is None or expires <= time.time():
+            raise StubCacheError(f"404 CachedContent not found (or permission denied): {name}")
+        return prefix
+
+    def stream(self, prompt, cached_content=None):
+        failure = self._draw_failure()
+        # Cached prefix tokens were read when the cache was created, so only the prompt adds prefill time
+        prefix = self._cached_prefix(cached_content)
+        time.sleep(self._time_to_first_token(prompt))
+        if failure is not None and failure[1] == 0:
+            raise failure[0]
+
+        words = self._answer_words(prefix + prompt)
+        for start in range(0, len(words), STUB_CHUNK_TOKENS):
+            if failure is not None and start >= failure[1]:
+                raise failure[0]
+            chunk = words[start:start + STUB_CHUNK_TOKENS]
+            time.sleep(len(chunk) / self.tokens_per_sec)
+            yield " ".join(chunk) + " "
+
+    def generate(self, prompt, cached_content=None):
+        return "".join(self.stream(prompt, cached_content)).strip()
+
+    def generate_json(self, prompt, keys):
+        failure = self._draw_failure()
+        time.sleep(self._time_to_first_token(prompt) + len(keys) * self.answer_tokens / self.tokens_per_sec)
+        if failure is not None:
+            raise failure[0]
+        return json.dumps({key: " ".join(self._answer_words(f"{prompt}|{key}")) for key in keys})
+
+    def count_tokens(self, text):
+        return int(math.ceil(len(text) / 4))
+
+    def start_tool_session(self, functions, system_instruction=None):
+        return StubToolSession(self, functions)
+
+    def create_cache(self, system_instruction, content, ttl):
+        prefix = f"{system_instruction}\n\n{content}"
+        if self.count_tokens(prefix) < self.min_cache_tokens:
+            raise StubCacheError(f"400 Cached content is too small. min_total_token_count={self.min_cache_tokens}")
+        time.sleep(self._time_to_first_token(prefix))
+        name = f"cachedContents/stub-{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:12]}"
+        with self._lock:
+            self._caches[name] = (prefix, time.time() + ttl)
+        return name
+
+    def refresh_cache(self, name, ttl):
+        prefix = self._cached_prefix(name)
+        with self._lock:
+            self._caches[name] = (prefix, time.time() + ttl)
+
+    def delete_cache(self, name):
+        with self._lock:
+            self._caches.pop(name, None)
+
+
+class StubToolSession(ToolSession):
+    """Calls describe_datasets (or the first function) once, then answers from the result's keys"""
+
+    def __init__(self, backend, functions):
+        self.backend = backend
+        self.names = [fn.__name__ for fn in functions]
+        self.question = ""
+
+    def send(self, message):
+        failure = self.backend._draw_failure()
+        time.sleep(self.backend.latency)
+        if failure is not None:
+            raise failure[0]
+
+        if isinstance(message, str):
+            self.question = message
+            if self.names:
+                name = 'describe_datasets' if 'describe_datasets' in self.names else self.names[0]
+                return [(name, {})], None
+        results = message if not isinstance(message, str) else []
+        called = ", ".join(f"{name} -> {sorted(result) if isinstance(result, dict) else result}"
+                           for name, result in results)
+        answer = " ".join(self.backend._answer_words(self.question))
+        return [], f"{answer}\n\n[stub tools: {called or 'none'}]"
+
+
+class BackendConfigError(RuntimeError):
+    """The LLM backend is not configured (unknown backend name or missing API key)"""
+
+
+def get_backend(api_key=None):
+    """Backend named by PULSEAI_LLM_BACKEND ('gemini' by default, or 'stub')"""
+    name = os.getenv("PULSEAI_LLM_BACKEND", "gemini").lower()
+    if name == 'stub':
+        return StubBackend()
+    if name != 'gemini':
+        raise BackendConfigError(f"Unknown PULSEAI_LLM_BACKEND: {name}")
+    if not api_key:
+        raise BackendConfigError(
+            "GEMINI_API_KEY not found. Add it to .env or .streamlit/secrets.toml, "
+            "or set PULSEAI_LLM_BACKEND=stub to run offline."
+        )
+    return GeminiBackend(api_key)
@@ -0,0 +1,607 @@
+"""
+PulseAI - LLM Request Scheduler
+Process-wide asyncio scheduler with RPM/TPM token buckets, priority classes
+and a fair queue across sessions; the buckets can be shared by every worker
+process through SQLite
+"""
+
+import asyncio
+import itertools
+import os
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+# Priority classes (lower runs first)
+PRIORITY_INTERACTIVE = 0  # chat answers
+PRIORITY_REPORT = 1       # report summaries, forecast narratives
+PRIORITY_INSIGHT = 2      # chart insights, anomaly narration
+PRIORITY_PREFETCH = 3     # speculative answers, only dispatched with idle quota
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_REPORT: 'report',
+    PRIORITY_INSIGHT: 'insight',
+    PRIORITY_PREFETCH: 'prefetch',
+}
+
+LLM_RPM = int(os.getenv("PULSEAI_LLM_RPM", "15"))         # Gemini free tier
+LLM_TPM = int(os.getenv("PULSEAI_LLM_TPM", "1000000"))
+LLM_BURST = int(os.getenv("PULSEAI_LLM_BURST", "1"))      # 1 = evenly spaced requests
+MAX_CONCURRENT_CALLS = 8
+QUOTA_DB = Path(os.getenv(
+    "PULSEAI_QUOTA_DB",
+    Path(__file__).parent.parent / "data" / "processed" / "llm_quota.sqlite"
+))
+USAGE_RETENTION = 3600  # seconds of grant history kept for utilisation metrics
+IDLE_POLL_SECONDS = 0.25  # re-pick the head of the queue at least this often while throttled
+
+# Prefetch tickets run one at a time, only after this long without other requests and
+# while quota use (all processes, last minute) is below the given share
+PREFETCH_IDLE_SECONDS = 20.0
+PREFETCH_MAX_UTILISATION = 0.5
+PREFETCH_POLL_SECONDS = 2.0
+
+# Retry policy for transient upstream failures
+MAX_RETRIES = int(os.getenv("PULSEAI_LLM_MAX_RETRIES", "4"))
+RETRY_BASE_DELAY = 2.0   # seconds, doubled per attempt
+RETRY_MAX_DELAY = 60.0
+TRANSIENT_MARKERS = ('500', '502', '503', '504', 'unavailable', 'deadline', 'timed out', 'timeout',
+                     'internal', 'connection reset', 'temporarily')
+RETRY_AFTER_PATTERNS = [
+    re.compile(r'retry[_ ]delay\s*\{\s*seconds:\s*(\d+)', re.I),   # google.rpc.RetryInfo
+    re.compile(r'retry(?:ing)? (?:in|after) ([\d.]+)\s*s', re.I),
+]
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate tokens/second"""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount):
+        """Seconds until amount tokens are available (0 = available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class LocalRateLimiter:
+    """RPM and TPM buckets for this process"""
+
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, burst=LLM_BURST):
+        self.rpm = rpm
+        self.requests = TokenBucket(max(1, burst), rpm / 60)
+        self.tokens = TokenBucket(tpm, tpm / 60)
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens):
+        """Take one request and tokens if both are available, else return the wait in seconds"""
+        with self._lock:
+            wait = max(self.requests.delay(1), self.tokens.delay(tokens))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            return 0.0
+
+
+class SharedRateLimiter:
+    """RPM and TPM buckets stored in SQLite so every worker process draws on one API key quota
+
+    Each acquisition is a single IMMEDIATE transaction, which serialises
+    refill-and-take across processes. Bucket state uses wall-clock time since
+    monotonic clocks are not comparable between processes.
+    """
+
+    def __init__(self, path=QUOTA_DB, rpm=LLM_RPM, tpm=LLM_TPM, burst=LLM_BURST):
+        self.path = Path(path)
+        self.rpm = rpm
+        self.tpm = tpm
+        # name -> (capacity, refill per second)
+        self.buckets = {
+            'requests': (float(max(1, burst)), rpm / 60),
+            'tokens': (float(tpm), tpm / 60),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS grants (ts REAL, tokens INTEGER, pid INTEGER)")
+            conn.execute("CREATE INDEX IF NOT EXISTS grants_ts ON grants (ts)")
+            conn.execute("CREATE TABLE IF NOT EXISTS throttles (ts REAL, pid INTEGER)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def try_acquire(self, tokens):
+        """Take one request and tokens if both are available, else return the wait in seconds"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = dict((name, (level, updated)) for name, level, updated in
+                          conn.execute("SELECT name, level, updated FROM buckets"))
+            levels = {}
+            wait = 0.0
+            for name, (capacity, rate) in self.buckets.items():
+                level, updated = stored.get(name, (capacity, now))
+                level = min(capacity, level + max(0.0, now - updated) * rate)
+                amount = min(1 if name == 'requests' else tokens, capacity)
+                levels[name] = (level, amount)
+                wait = max(wait, (amount - level) / rate)
+
+            if wait > 0:
+                conn.execute("COMMIT")
+                return wait
+
+            for name, (level, amount) in levels.items():
+                conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, level - amount, now))
+            conn.execute("INSERT INTO grants VALUES (?, ?, ?)", (now, tokens, os.getpid()))
+            conn.execute("DELETE FROM grants WHERE ts < ?", (now - USAGE_RETENTION,))
+            conn.execute("COMMIT")
+            return 0.0
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def record_throttle(self):
+        """Note an upstream 429 so utilisation shows when the configured quota is too high"""
+        with self._connect() as conn:
+            conn.execute("INSERT INTO throttles VALUES (?, ?)", (time.time(), os.getpid()))
+            conn.execute("DELETE FROM throttles WHERE ts < ?", (time.time() - USAGE_RETENTION,))
+
+    def utilisation(self, window=60):
+        """Quota used across all processes over the last window seconds"""
+        since = time.time() - window
+        with self._connect() as conn:
+            requests, tokens, processes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0), COUNT(DISTINCT pid) FROM grants WHERE ts >= ?",
+                (since,)
+            ).fetchone()
+            throttled = conn.execute("SELECT COUNT(*) FROM throttles WHERE ts >= ?", (since,)).fetchone()[0]
+        scale = 60 / window
+        return {
+            'requests_per_min': requests * scale,
+            'rpm_limit': self.rpm,
+            'rpm_utilisation': requests * scale / self.rpm if self.rpm else 0.0,
+            'tokens_per_min': tokens * scale,
+            'tpm_limit': self.tpm,
+            'tpm_utilisation': tokens * scale / self.tpm if self.tpm else 0.0,
+            'processes': processes,
+            'throttled': throttled,
+        }
+
+
+class Ticket:
+    """One queued LLM call"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fn, priority, session_id, est_tokens, stream, dedupe_key=None, resume_fn=None):
+        self.id = next(self._ids)
+        self.fn = fn
+        self.resume_fn = resume_fn
+        self.attempts = 0
+        self.not_before = 0.0  # backoff: not dispatched before this time
+        self.priority = priority
+        self.session_id = session_id
+        self.est_tokens = est_tokens
+        self.stream = stream
+        self.dedupe_key = dedupe_key
+        self.future = Future()
+        self.future.ticket = self  # lets holders of the Future ask for its queue position
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.status = 'queued'
+        # Streaming fan-out: every chunk so far, and one queue per consumer
+        self.buffer = []
+        self.consumers = []
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """New consumer queue, primed with the chunks already produced"""
+        consumer = queue.Queue()
+        with self._lock:
+            for item in self.buffer:
+                consumer.put(item)
+            if self.finished:
+                consumer.put(StreamHandle._DONE)
+            else:
+                self.consumers.append(consumer)
+        return consumer
+
+    def publish(self, item, final=False):
+        with self._lock:
+            if not final:
+                self.buffer.append(item)
+            else:
+                self.finished = True
+            for consumer in self.consumers:
+                consumer.put(item)
+
+
+class StreamHandle:
+    """Iterator over a scheduled streaming call, with queue visibility for the UI"""
+
+    _DONE = object()
+
+    def __init__(self, scheduler, ticket):
+        self.scheduler = scheduler
+        self.ticket = ticket
+        self.chunks = ticket.subscribe()
+
+    @property
+    def started(self):
+        return self.ticket.status != 'queued'
+
+    def position(self):
+        return self.scheduler.queue_position(self.ticket)
+
+    def wait_estimate(self):
+        return self.scheduler.wait_estimate(self.ticket)
+
+    def wait_started(self, timeout=None):
+        """Block until the call is dispatched (or timeout); returns started"""
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.started:
+            if deadline is not None and time.time() >= deadline:
+                break
+            time.sleep(0.05)
+        return self.started
+
+    def __iter__(self):
+        while True:
+            item = self.chunks.get()
+            if item is self._DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+class LLMScheduler:
+    """Runs an asyncio loop on a daemon thread that dispatches queued calls under the rate limiter"""
+
+    def __init__(self, limiter=None, max_concurrent=MAX_CONCURRENT_CALLS):
+        self.limiter = limiter or LocalRateLimiter()
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="llm")
+        # priority -> session_id -> deque of tickets; OrderedDict order is the round-robin order
+        self._queues = {p: OrderedDict() for p in PRIORITY_NAMES}
+        self._lock = threading.Lock()
+        self._in_flight = {}  # dedupe_key -> Ticket, while queued or running
+        self._last_foreground = 0.0  # when a non-prefetch request was last submitted
+        self._prefetch_running = 0
+        self.stats = {'submitted': 0, 'dispatched': 0, 'failed': 0, 'coalesced': 0, 'retried': 0, 'total_wait': 0.0}
+
+        self.loop = asyncio.new_event_loop()
+        self._wakeup = None
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run_loop, name="llm-scheduler", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    # -- public API ---------------------------------------------------------
+
+    def submit(self, fn, priority=PRIORITY_INTERACTIVE, session_id=None, est_tokens=1000, dedupe_key=None):
+        """Queue a blocking call; returns a concurrent.futures.Future
+
+        Calls with the same dedupe_key while one is queued or running share
+        that call's result instead of spending quota again.
+        """
+        ticket = self._enqueue(Ticket(fn, priority, session_id or current_session_id(), est_tokens,
+                                      stream=False, dedupe_key=dedupe_key))
+        return ticket.future
+
+    def submit_stream(self, fn, priority=PRIORITY_INTERACTIVE, session_id=None, est_tokens=1000, dedupe_key=None,
+                      resume_fn=None):
+        """Queue a call returning an iterator of chunks; returns a StreamHandle
+
+        Late joiners on the same dedupe_key get the chunks produced so far,
+        then follow the live stream. If the stream fails part-way and is
+        retried, resume_fn(partial_text) is called for the continuation so
+        consumers never see text twice; without it the stream is only
+        retried when nothing was produced yet.
+        """
+        ticket = self._enqueue(Ticket(fn, priority, session_id or current_session_id(), est_tokens,
+                                      stream=True, dedupe_key=dedupe_key, resume_fn=resume_fn))
+        return StreamHandle(self, ticket)
+
+    def queue_position(self, ticket):
+        """Requests that will be dispatched before this ticket (0 = next)"""
+        with self._lock:
+            if ticket.status != 'queued':
+                return 0
+            ahead = 0
+            for priority in sorted(self._queues):
+                sessions = self._queues[priority]
+                if priority < ticket.priority:
+                    ahead += sum(len(q) for q in sessions.values())
+                elif priority == ticket.priority:
+                    own = sessions.get(ticket.session_id, deque())
+                    rank = next((i for i, t in enumerate(own) if t is ticket), 0)
+                    # Round robin: each other session gets up to rank + 1 turns first
+                    ahead += rank + sum(min(len(q), rank + 1) for s, q in sessions.items() if s != ticket.session_id)
+            return ahead
+
+    def wait_estimate(self, ticket):
+        """Rough seconds until dispatch"""
+        interval = 60 / max(1, self.limiter.rpm)
+        return self.queue_position(ticket) * interval + interval
+
+    def queue_depths(self):
+        with self._lock:
+            return {PRIORITY_NAMES[p]: sum(len(q) for q in s.values()) for p, s in self._queues.items()}
+
+    def metrics(self):
+        """Queue depths, this process's counters and (when shared) quota utilisation"""
+        metrics = {'queued': self.queue_depths(), **self.stats}
+        metrics['avg_wait'] = self.stats['total_wait'] / self.stats['dispatched'] if self.stats['dispatched'] else 0.0
+        if hasattr(self.limiter, 'utilisation'):
+            metrics.update(self.limiter.utilisation())
+        return metrics
+
+    # -- internals ----------------------------------------------------------
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._wakeup = asyncio.Event()
+        self.loop.create_task(self._dispatcher())
+        self._ready.set()
+        self.loop.run_forever()
+
+    def _enqueue(self, ticket):
+        with self._lock:
+            self.stats['submitted'] += 1
+            if ticket.priority != PRIORITY_PREFETCH:
+                self._last_foreground = time.time()
+            key = ticket.dedupe_key and (ticket.stream, ticket.dedupe_key)
+            if key:
+                existing = self._in_flight.get(key)
+                if existing is not None:
+                    self.stats['coalesced'] += 1
+                    return existing
+                self._in_flight[key] = ticket
+            self._queues[ticket.priority].setdefault(ticket.session_id, deque()).append(ticket)
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+        return ticket
+
+    def _peek(self):
+        """(head ticket, None), or (None, seconds until a backed-off ticket is due)
+
+        Head is the best priority class, next session in round-robin order,
+        skipping sessions whose first ticket is still backing off.
+        """
+        now = time.time()
+        next_due = None
+        with self._lock:
+            for priority in sorted(self._queues):
+                for tickets in self._queues[priority].values():
+                    head = tickets[0]
+                    if head.not_before <= now:
+                        return head, None
+                    next_due = min(next_due or head.not_before, head.not_before)
+        return None, (next_due - now if next_due else None)
+
+    def _pop(self, ticket):
+        with self._lock:
+            sessions = self._queues[ticket.priority]
+            tickets = sessions[ticket.session_id]
+            # A retry may have been put back ahead of it since _peek, so remove this exact ticket
+            was_head = tickets[0] is ticket
+            tickets.remove(ticket)
+            if not tickets:
+                del sessions[ticket.session_id]
+            elif was_head:
+                sessions.move_to_end(ticket.session_id)  # next session's turn
+            ticket.status = 'running'
+            if ticket.priority == PRIORITY_PREFETCH:
+                self._prefetch_running += 1
+            ticket.attempts += 1
+            ticket.started_at = time.time()
+            self.stats['dispatched'] += 1
+            self.stats['total_wait'] += ticket.started_at - ticket.enqueued_at
+
+    def _requeue(self, ticket, delay):
+        """Put a failed ticket back at the head of its session, first in round-robin order"""
+        with self._lock:
+            sessions = self._queues[ticket.priority]
+            tickets = sessions.setdefault(ticket.session_id, deque())
+            tickets.appendleft(ticket)
+            sessions.move_to_end(ticket.session_id, last=False)
+            ticket.status = 'queued'
+            if ticket.priority == PRIORITY_PREFETCH:
+                self._prefetch_running -= 1
+            ticket.not_before = time.time() + delay
+            self.stats['retried'] += 1
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _dispatcher(self):
+        while True:
+            ticket, due_in = self._peek()
+            if ticket is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=due_in)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Only prefetch tickets are left, as _peek returns the best class first
+            wait = self._prefetch_wait() if ticket.priority == PRIORITY_PREFETCH else 0.0
+            if wait > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                wait = self.limiter.try_acquire(ticket.est_tokens)
+            except sqlite3.Error:
+                wait = IDLE_POLL_SECONDS  # quota db busy or locked: retry shortly
+            if wait > 0:
+                # Sleep in short slices so a higher-priority arrival takes the next slot
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(wait, IDLE_POLL_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._pop(ticket)
+            self.loop.run_in_executor(self.executor, self._execute, ticket)
+
+    def _prefetch_wait(self):
+        """0 when a speculative request may spend quota now, else seconds before checking again"""
+        idle_for = time.time() - self._last_foreground
+        if idle_for < PREFETCH_IDLE_SECONDS:
+            return PREFETCH_IDLE_SECONDS - idle_for
+        with self._lock:
+            # Includes foreground tickets still backing off, which _peek skipped
+            busy = self._prefetch_running or any(
+                sessions for priority, sessions in self._queues.items() if priority != PRIORITY_PREFETCH
+            )
+        if busy:
+            return PREFETCH_POLL_SECONDS
+        if hasattr(self.limiter, 'utilisation'):
+            try:
+                if self.limiter.utilisation()['rpm_utilisation'] >= PREFETCH_MAX_UTILISATION:
+                    return PREFETCH_POLL_SECONDS
+            except sqlite3.Error:
+                return PREFETCH_POLL_SECONDS
+        return 0.0
+
+    def _execute(self, ticket):
+        try:
+            if ticket.stream:
+                partial = "".join(ticket.buffer)
+                chunks = ticket.resume_fn(partial) if partial and ticket.resume_fn else ticket.fn()
+                for chunk in chunks:
+                    ticket.publish(chunk)
+                ticket.future.set_result(None)
+            else:
+                ticket.future.set_result(ticket.fn())
+        except BaseException as e:
+            if is_rate_limit_error(e) and hasattr(self.limiter, 'record_throttle'):
+                try:
+                    self.limiter.record_throttle()
+                except sqlite3.Error:
+                    pass
+            resumable = not (ticket.stream and ticket.buffer and ticket.resume_fn is None)
+            if resumable and is_retryable_error(e) and ticket.attempts <= MAX_RETRIES:
+                self._requeue(ticket, retry_delay(e, ticket.attempts))
+                return
+            self.stats['failed'] += 1
+            if ticket.stream:
+                ticket.publish(e)
+            ticket.future.set_exception(e)
+        self._finish(ticket)
+
+    def _finish(self, ticket):
+        with self._lock:
+            ticket.status = 'done'
+            if ticket.priority == PRIORITY_PREFETCH:
+                self._prefetch_running -= 1
+            if ticket.dedupe_key:
+                self._in_flight.pop((ticket.stream, ticket.dedupe_key), None)
+        if ticket.stream:
+            ticket.publish(StreamHandle._DONE, final=True)
+
+
+def is_rate_limit_error(e):
+    """True for upstream quota rejections (HTTP 429 / ResourceExhausted)"""
+    text = f"{type(e).__name__} {e}".lower()
+    return '429' in text or 'quota' in text or 'resourceexhausted' in text or 'rate limit' in text
+
+
+def is_retryable_error(e):
+    """Rate limits and transient server or network failures"""
+    if is_rate_limit_error(e) or isinstance(e, (ConnectionError, TimeoutError)):
+        return True
+    text = f"{type(e).__name__} {e}".lower()
+    return any(marker in text for marker in TRANSIENT_MARKERS)
+
+
+def retry_after_hint(e):
+    """Server-suggested wait in seconds, if the error carries one"""
+    for attr in ('retry_after', 'retry_delay'):
+        value = getattr(e, attr, None)
+        if isinstance(value, (int, float)):
+            return float(value)
+    response = getattr(e, 'response', None)
+    header = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    for pattern in RETRY_AFTER_PATTERNS:
+        match = pattern.search(str(e))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def retry_delay(e, attempt):
+    """Exponential backoff with full jitter, never shorter than a retry-after hint"""
+    backoff = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+    hint = retry_after_hint(e)
+    return max(backoff, hint) if hint is not None else backoff
+
+
+def current_session_id():
+    """Streamlit session of the calling script thread, for fair queueing"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is not None:
+            return ctx.session_id
+    except Exception:
+        pass
+    return threading.current_thread().name
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def _default_limiter():
+    """Quota shared through SQLite, or per-process buckets if the database is unusable"""
+    try:
+        return SharedRateLimiter()
+    except (sqlite3.Error, OSError):
+        return LocalRateLimiter()
+
+
+def get_scheduler():
+    """Process-wide scheduler, started on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(limiter=_default_limiter())
+        return _scheduler
@@ -0,0 +1,188 @@
+"""
+PulseAI - NPCI Report Ingestion
+Extracts UPI monthly statistics from NPCI PDF reports in parallel
+"""
+
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .file_cache import file_sha256, cache_path
+
+NPCI_PDF_DIR = Path(__file__).parent.parent / "data" / "raw" / "npci"
+CACHE_NAMESPACE = "npci"
+
+logger = logging.getLogger(__name__)
+
+# Same columns download_upi_data() produces
+UPI_COLUMNS = ['Month', 'Volume_Billion', 'Value_LakhCrore', 'Avg_Transaction_Size']
+
+MONTH_FORMATS = ['%b-%y', '%b-%Y', '%B-%y', '%B-%Y', '%b %Y', '%B %Y', '%b %y', '%B %y', '%m/%Y', '%Y-%m']
+
+# Fallback for PDFs whose tables pdfplumber cannot detect:
+# "Oct-25   632   20,701.03   27,28,113.32"
+TEXT_ROW_PATTERN = re.compile(
+    r'^\s*([A-Za-z]{3,9}[-\s]\d{2,4})\s+(?:\d+\s+)?([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s*$'
+)
+
+
+def parse_month(value):
+    """Normalise an NPCI month label to YYYY-MM"""
+    text = str(value).strip().replace("'", '-').replace('.', '')
+    for fmt in MONTH_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m')
+        except ValueError:
+            continue
+    return None
+
+
+def parse_number(value):
+    """Parse Indian-format numbers like 27,28,113.32"""
+    if value is None:
+        return None
+    text = str(value).replace(',', '').strip()
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _to_upi_row(month, volume_mn, value_cr):
+    """Convert NPCI units (Mn, Crore) to the app's UPI schema"""
+    volume_billion = volume_mn / 1000
+    value_lakh_crore = value_cr / 100000
+    avg_size = (value_cr * 10000000) / (volume_mn * 1000000) if volume_mn else 0
+    return {
+        'Month': month,
+        'Volume_Billion': round(volume_billion, 2),
+        'Value_LakhCrore': round(value_lakh_crore, 2),
+        'Avg_Transaction_Size': round(avg_size, 2)
+    }
+
+
+def _find_columns(header):
+    """Locate month, volume and value columns in a table header row"""
+    labels = [str(cell or '').lower() for cell in header]
+    month_col = next((i for i, h in enumerate(labels) if 'month' in h), None)
+    volume_col = next((i for i, h in enumerate(labels) if 'volume' in h), None)
+    value_col = next((i for i, h in enumerate(labels) if 'value' in h), None)
+    if None in (month_col, volume_col, value_col):
+        return None
+    return month_col, volume_col, value_col
+
+
+def _rows_from_tables(tables):
+    """Extract UPI rows from pdfplumber tables with a Month/Volume/Value header"""
+    rows = []
+    for table in tables:
+        columns = None
+        for raw_row in table:
+            if columns is None:
+                columns = _find_columns(raw_row)
+                continue
+            month_col, volume_col, value_col = columns
+            if max(columns) >= len(raw_row):
+                continue
+            month = parse_month(raw_row[month_col])
+            volume = parse_number(raw_row[volume_col])
+            value = parse_number(raw_row[value_col])
+            if month and volume and value:
+                rows.append(_to_upi_row(month, volume, value))
+    return rows
+
+
+def _rows_from_text(text):
+    """Regex fallback over the page text"""
+    rows = []
+    for line in (text or '').splitlines():
+        match = TEXT_ROW_PATTERN.match(line)
+        if not match:
+            continue
+        month = parse_month(match.group(1))
+        volume = parse_number(match.group(2))
+        value = parse_number(match.group(3))
+        if month and volume and value:
+            rows.append(_to_upi_row(month, volume, value))
+    return rows
+
+
+def parse_npci_pdf(pdf_path):
+    """Parse one NPCI report into UPI rows (runs inside a worker process)"""
+    import pdfplumber
+
+    rows = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page_rows = _rows_from_tables(page.extract_tables())
+            if not page_rows:
+                page_rows = _rows_from_text(page.extract_text())
+            rows.extend(page_rows)
+    return rows
+
+
+def _parse_or_error(pdf_path):
+    """(rows, None), or (None, error text) for an unreadable, encrypted or malformed PDF
+
+    Errors are returned rather than raised so one bad report cannot abort
+    the whole pool.map.
+    """
+    try:
+        return parse_npci_pdf(pdf_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def ingest_npci_reports(pdf_dir=NPCI_PDF_DIR, max_workers=None):
+    """Parse every NPCI PDF in a directory, reusing cached results by content hash
+
+    Reports that fail to parse are logged and skipped (and not cached, so
+    they are retried next time); an empty frame means nothing parsed.
+    """
+    pdf_dir = Path(pdf_dir)
+    pdf_files = sorted(pdf_dir.glob("*.pdf"), key=lambda p: (p.stat().st_mtime, p.name)) if pdf_dir.exists() else []
+    if not pdf_files:
+        return pd.DataFrame(columns=UPI_COLUMNS)
+
+    frames = {}
+    pending = {}
+    for pdf_file in pdf_files:
+        digest = file_sha256(pdf_file)
+        cached = cache_path(CACHE_NAMESPACE, digest, ".csv")
+        if cached.exists():
+            frames[pdf_file] = pd.read_csv(cached)
+        else:
+            pending[pdf_file] = cached
+
+    if pending:
+        workers = max_workers or min(len(pending), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_parse_or_error, list(pending))
+            for pdf_file, (rows, error) in zip(pending, results):
+                if error is not None:
+                    logger.warning("Skipping NPCI report %s: %s", pdf_file.name, error)
+                    continue
+                df = pd.DataFrame(rows, columns=UPI_COLUMNS)
+                df.to_csv(pending[pdf_file], index=False)
+                frames[pdf_file] = df
+
+    # Later reports revise earlier months, so the newest file wins on duplicates
+    parsed = [frames[f] for f in pdf_files if f in frames]
+    if not parsed:
+        return pd.DataFrame(columns=UPI_COLUMNS)
+    combined = pd.concat(parsed, ignore_index=True)
+    if combined.empty:
+        return pd.DataFrame(columns=UPI_COLUMNS)
+    combined = combined.drop_duplicates(subset='Month', keep='last')
+    return combined.sort_values('Month').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    print(f"Ingesting NPCI reports from {NPCI_PDF_DIR}...")
+    df = ingest_npci_reports()
+    print(df.tail(12).to_string(index=False) if not df.empty else "No NPCI PDFs found")
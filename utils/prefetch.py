@@ -0,0 +1,160 @@
+"""
+PulseAI - Answer Prefetch
+Pre-generates answers to the example questions and the most frequent opening questions
+with idle quota, so the most common first interaction is answered from the cache
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .answer_cache import normalize_question
+from .context_cache import data_version
+
+QUESTION_LOG_PATH = Path(__file__).parent.parent / "data" / "processed" / "question_log.json"
+HALF_LIFE_SECONDS = 7 * 24 * 3600  # a question asked a week ago counts half
+MAX_LOGGED_QUESTIONS = 200
+TOP_FREQUENT_QUESTIONS = 10
+# Opening questions are only logged when the deployment opts in; entries are dropped after the retention period
+LOG_QUESTIONS = os.getenv("PULSEAI_LOG_QUESTIONS", "0") == "1"
+QUESTION_RETENTION_SECONDS = float(os.getenv("PULSEAI_QUESTION_LOG_DAYS", "30")) * 24 * 3600
+
+# Shown in the chat sidebar; most sessions start with one of these
+EXAMPLE_QUESTIONS = [
+    "What is the latest UPI transaction volume?",
+    "Which state has the highest credit growth?",
+    "Explain RBI's current monetary policy stance",
+    "Compare digital adoption across top 5 states",
+    "What are the trends in mutual fund investments?",
+    "How is the stock market performing today?",
+    "Tell me about Karnataka's banking sector",
+    "UPI का महीने का वॉल्यूम क्या है?",  # Hindi
+    "What is CD ratio and why is it important?",
+    "Forecast UPI growth for next month"
+]
+
+
+class QuestionLog:
+    """Decayed counts of the questions that open conversations, persisted across restarts"""
+
+    def __init__(self, path=QUESTION_LOG_PATH, half_life=HALF_LIFE_SECONDS, enabled=LOG_QUESTIONS,
+                 retention=QUESTION_RETENTION_SECONDS):
+        self.path = Path(path) if path else None
+        self.half_life = half_life
+        self.enabled = enabled
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._entries = self._load() if enabled else {}
+        if not enabled and self.path and self.path.exists():
+            self.path.unlink(missing_ok=True)  # logging was switched off: forget what was kept
+        elif self._expire(time.time()):
+            with self._lock:
+                self._save()
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def _expire(self, now):
+        """Drop questions last asked before the retention period; True if any were dropped"""
+        stale = [k for k, entry in self._entries.items() if now - entry['last'] > self.retention]
+        for key in stale:
+            del self._entries[key]
+        return bool(stale)
+
+    def _save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self._entries, ensure_ascii=False), encoding='utf-8')
+        tmp_path.replace(self.path)
+
+    def _weight(self, entry, now):
+        return entry['count'] * 0.5 ** ((now - entry['last']) / self.half_life)
+
+    def record(self, question):
+        if not self.enabled:
+            return
+        now = time.time()
+        key = normalize_question(question)
+        if not key:
+            return
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            count = self._weight(entry, now) + 1 if entry else 1.0
+            self._entries[key] = {'text': question, 'count': count, 'last': now}
+            if len(self._entries) > MAX_LOGGED_QUESTIONS:
+                weakest = min(self._entries, key=lambda k: self._weight(self._entries[k], now))
+                del self._entries[weakest]
+            self._save()
+
+    def top(self, n=TOP_FREQUENT_QUESTIONS, min_count=2.0):
+        """Most frequent recent questions (original wording), asked at least about min_count times"""
+        now = time.time()
+        with self._lock:
+            weighted = [(self._weight(entry, now), entry['text']) for entry in self._entries.values()]
+        return [text for weight, text in sorted(weighted, reverse=True)[:n] if weight >= min_count]
+
+
+class Prefetcher:
+    """Queues speculative answers once per data version and question set"""
+
+    def __init__(self, log=None):
+        self.log = log or QuestionLog()
+        self._done = set()
+        self._lock = threading.Lock()
+        self.queued = 0
+
+    def questions(self):
+        """Example questions first, then frequent ones, without duplicates"""
+        seen = set()
+        ordered = []
+        for question in EXAMPLE_QUESTIONS + self.log.top():
+            key = normalize_question(question)
+            if key not in seen:
+                seen.add(key)
+                ordered.append(question)
+        return ordered
+
+    def schedule(self, rag, data_dict):
+        """Queue missing answers in the background; returns at once
+
+        Called on every page run, but each question is queued at most once per
+        data version, so a data refresh (new version) prefetches again.
+        """
+        version = data_version(data_dict)
+        with self._lock:
+            pending = [q for q in self.questions() if (version, normalize_question(q)) not in self._done]
+            self._done.update((version, normalize_question(q)) for q in pending)
+        if pending:
+            threading.Thread(target=self._queue, args=(rag, data_dict, pending),
+                             name="answer-prefetch", daemon=True).start()
+
+    def _queue(self, rag, data_dict, questions):
+        for question in questions:
+            try:
+                if rag.prefetch_answer(question, data_dict) is not None:
+                    self.queued += 1
+            except Exception:
+                continue
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Process-wide prefetcher"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
@@ -0,0 +1,234 @@
+"""
+PulseAI - Upstream Context Cache
+Cached-content prefixes (system prompt, reference examples and dataset context) held by the
+LLM provider and keyed by context hash, so each question sends only itself
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: registry updates are only serialized within one process
+    fcntl = None
+
+from .llm_scheduler import PRIORITY_INSIGHT
+
+PREFIX_REGISTRY_PATH = Path(__file__).parent.parent / "data" / "processed" / "prefix_cache.json"
+ENABLED = os.getenv("PULSEAI_UPSTREAM_CACHE", "1") == "1"
+TTL_SECONDS = int(os.getenv("PULSEAI_UPSTREAM_CACHE_TTL", "3600"))  # unused prefixes lapse after this
+REFRESH_SHARE = 0.25   # extend the TTL on use once less than this share of it is left
+EXPIRY_SLACK = 30      # seconds; stop using a prefix this long before the provider drops it
+FAILURE_COOLDOWN = 300  # seconds to send full prompts after the provider fails to create a cache
+
+
+def prefix_key(model, system_instruction, content):
+    """Context hash identifying a prefix; identical contexts share one upstream cache"""
+    raw = f"{model}|{system_instruction}|{content}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+class PrefixCache:
+    """Registry of upstream cached prefixes, shared with other worker processes through a JSON file
+
+    get() never waits on the provider: it returns a live prefix, or None so
+    the caller sends the full prompt while the prefix is created in the
+    background. Creation and TTL refreshes are queued through the scheduler
+    (a daemon thread without one), so they share its rate limits. Creating
+    the prefix for a new data version deletes the prefixes of the previous
+    versions upstream.
+    """
+
+    def __init__(self, backend, counter, scheduler=None, path=PREFIX_REGISTRY_PATH, ttl=TTL_SECONDS,
+                 enabled=ENABLED):
+        self.backend = backend
+        self.counter = counter
+        self.scheduler = scheduler
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pending = set()  # keys with a creation or refresh queued or running
+        self._entries = self._load()
+        self._too_small = set()
+        self._disabled_until = 0
+        self.stats_counts = {'hits': 0, 'misses': 0, 'creates': 0, 'refreshes': 0, 'fallbacks': 0, 'failures': 0}
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats_counts[stat] += 1
+
+    @contextmanager
+    def _registry_lock(self):
+        """Hold self._lock and, across worker processes, an exclusive lock on the registry"""
+        with self._lock:
+            if not self.path or fcntl is None:
+                yield
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_suffix('.lock'), 'a') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _update(self, change):
+        """Apply change(entries) to the registry as last written by any process, and save it
+
+        Re-reading under the lock keeps the other processes' prefixes instead
+        of overwriting them with this process's view.
+        """
+        with self._registry_lock():
+            entries = self._load() if self.path else self._entries
+            result = change(entries)
+            now = time.time()
+            self._entries = {k: e for k, e in entries.items() if e['expires'] > now}
+            if self.path:
+                tmp_path = self.path.with_suffix('.tmp')
+                tmp_path.write_text(json.dumps(self._entries), encoding='utf-8')
+                tmp_path.replace(self.path)
+            return result
+
+    def _live_entry(self, key):
+        """Registered prefix for key that is not about to expire, checking other processes' writes"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires'] - EXPIRY_SLACK <= now:
+                entry = self._load().get(key)
+                if entry is not None:
+                    self._entries[key] = entry
+        if entry is None or entry['expires'] - EXPIRY_SLACK <= now:
+            return None
+        return entry
+
+    def get(self, system_instruction, content, version=None):
+        """Name of a live cached prefix for this context, or None to send the full prompt
+
+        version is the data version the context was built from; contexts
+        without one (ad hoc query contexts) are only retired by their TTL.
+        """
+        if not self.enabled or time.time() < self._disabled_until:
+            return None
+        key = prefix_key(self.backend.model_name, system_instruction, content)
+        if key in self._too_small:
+            return None
+
+        entry = self._live_entry(key)
+        if entry is None:
+            self._count('misses')
+            self._schedule(key, lambda: self.build(system_instruction, content, version),
+                           self.counter.estimate(content))
+            return None
+        self._count('hits')
+        if entry['expires'] - time.time() < self.ttl * REFRESH_SHARE:
+            self._schedule(key, lambda: self._refresh(key, entry), 0)
+        return entry['name']
+
+    def _schedule(self, key, job, est_tokens):
+        """Run job once per key in the background, through the scheduler when there is one"""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        def run():
+            try:
+                return job()
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        if self.scheduler is None:
+            threading.Thread(target=run, name="prefix-cache", daemon=True).start()
+        else:
+            self.scheduler.submit(run, priority=PRIORITY_INSIGHT, session_id='prefix-cache', est_tokens=est_tokens)
+
+    def build(self, system_instruction, content, version=None):
+        """Create the prefix for this context now (blocking); its name, or None if it cannot be cached"""
+        key = prefix_key(self.backend.model_name, system_instruction, content)
+        entry = self._live_entry(key) or self._create(key, system_instruction, content, version)
+        return entry['name'] if entry else None
+
+    def _create(self, key, system_instruction, content, version):
+        tokens = self.counter.count(f"{system_instruction}\n\n{content}", exact=True)
+        if tokens < self.backend.min_cache_tokens:
+            # Below the provider's minimum; the whole prompt is small anyway
+            with self._lock:
+                self._too_small.add(key)
+            return None
+        try:
+            name = self.backend.create_cache(system_instruction, content, self.ttl)
+        except Exception:
+            # Unsupported model, quota or a network error: send full prompts for a while
+            self._count('failures')
+            self._disabled_until = time.time() + FAILURE_COOLDOWN
+            return None
+
+        entry = {'name': name, 'model': self.backend.model_name, 'version': version,
+                 'tokens': tokens, 'expires': time.time() + self.ttl}
+        self._count('creates')
+
+        def register(entries):
+            entries[key] = entry
+            stale = [k for k, e in entries.items()
+                     if version is not None and k != key and e['model'] == entry['model']
+                     and e['version'] is not None and e['version'] != version]
+            return [entries.pop(k)['name'] for k in stale]
+
+        # The data changed, so prefixes built from the old data are never used again
+        for stale_name in self._update(register):
+            self._delete_upstream(stale_name)
+        return entry
+
+    def _refresh(self, key, entry):
+        try:
+            self.backend.refresh_cache(entry['name'], self.ttl)
+        except Exception:
+            self.discard(entry['name'])
+            return
+        self._count('refreshes')
+
+        def extend(entries):
+            entries[key] = dict(entry, expires=time.time() + self.ttl)
+
+        self._update(extend)
+
+    def _delete_upstream(self, name):
+        try:
+            self.backend.delete_cache(name)
+        except Exception:
+            pass  # it expires on its own
+
+    def discard(self, name):
+        """Forget a prefix the provider no longer has; the next get() creates a new one"""
+        self._count('fallbacks')
+
+        def drop(entries):
+            for key in [k for k, e in entries.items() if e['name'] == name]:
+                del entries[key]
+
+        self._update(drop)
+
+    def cached_tokens(self, name):
+        """Tokens held in a registered prefix (0 if unknown)"""
+        with self._lock:
+            return next((e['tokens'] for e in self._entries.values() if e['name'] == name), 0)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.stats_counts, prefixes=len(self._entries), pending=len(self._pending))
@@ -3,6 +3,8 @@ PulseAI - Prompts for Gemini RAG System
 Optimized for Indian financial intelligence queries
 """
 
+import hashlib
+
 SYSTEM_PROMPT = """You are PulseAI, an elite financial intelligence assistant specializing in Indian financial markets, banking, and digital payments. You have deep expertise in:
 - RBI monetary policy and banking regulations
 - UPI and digital payment systems (NPCI)
@@ -30,6 +32,25 @@ INSTRUCTIONS:
 
 ANSWER:"""
 
+# Upstream-cached variant of RAG_QUERY_PROMPT: the context is stored once with the provider
+# (after SYSTEM_PROMPT), and each question sends only CACHED_QUERY_PROMPT
+CACHED_CONTEXT_PROMPT = """CONTEXT from RBI reports, NPCI data, and financial datasets:
+{context}"""
+
+CACHED_QUERY_PROMPT = """Based on the context above, please answer the user's question accurately and comprehensively.
+
+USER QUESTION: {question}
+
+INSTRUCTIONS:
+1. Provide a clear, structured answer
+2. Use specific numbers and dates from the context
+3. If the answer involves trends, mention the time period
+4. If data is not available in context, clearly state that
+5. Keep responses concise but informative (150-300 words)
+6. Use bullet points for multiple insights
+
+ANSWER:"""
+
 REPORT_GENERATION_PROMPT = """You are generating an executive summary for a monthly boardroom presentation on Indian financial markets for {month_year}.
 
 AVAILABLE DATA:
@@ -43,46 +64,60 @@ Generate a professional 2-paragraph executive summary (200-250 words) covering:
 
 Use formal business language suitable for C-suite executives. Include specific percentages and growth rates."""
 
-FORECAST_NARRATIVE_PROMPT = """Based on the following forecast data for {metric_name}:
+HINDI_TRANSLATION_PROMPT = """Translate the following financial insight into clear, professional Hindi while keeping technical terms in English where appropriate:
+
+{english_text}
 
-Current Value: {current_value}
-Predicted Value (30 days): {predicted_value}
-Change: {change_percent}%
-Trend: {trend}
+Keep numbers, percentages, and technical terms like 'UPI', 'NEFT', 'credit growth' in English."""
 
-Write a compelling 150-word narrative explaining:
-1. What this forecast means for Indian financial ecosystem
-2. Factors that might be driving this trend
-3. Implications for stakeholders (banks, fintechs, consumers)
-4. One actionable insight
+TOOL_MODE_PROMPT = """You can call data functions over the loaded RBI, NPCI, NSE and AMFI datasets.
+Fetch every figure you cite with these functions instead of estimating it; call describe_datasets
+first if you are unsure of a dataset or metric name. Cite the dataset and period behind each number.
+Answer in the language of the question."""
 
-Write in a storytelling style that makes data come alive."""
+CONVERSATION_PROMPT = """{history}
 
-ANOMALY_DETECTION_PROMPT = """Analyze the following financial data and identify any anomalies or unusual patterns:
+Current question (answer this one, using the conversation only to resolve references): {question}"""
 
-DATA:
-{data_points}
+CONVERSATION_SUMMARY_PROMPT = """Update the running summary of a chat about Indian financial data.
 
-Look for:
-- Sudden spikes or drops (>15% change)
-- Unusual state-wise variations
-- Deviation from seasonal patterns
-- Regulatory impact signals
+Current summary:
+{summary}
 
-Format as bullet points. Be specific with numbers and dates."""
+Turns to fold in:
+{turns}
 
-HINDI_TRANSLATION_PROMPT = """Translate the following financial insight into clear, professional Hindi while keeping technical terms in English where appropriate:
+Write at most 5 short bullet points keeping the topics, states, metrics, periods and figures
+discussed, so later follow-up questions can be understood. Output only the bullets."""
 
-{english_text}
+STREAM_RESUME_PROMPT = """{prompt}
 
-Keep numbers, percentages, and technical terms like 'UPI', 'NEFT', 'credit growth' in English."""
+Your answer was interrupted. This is what you wrote so far:
+
+{partial}
+
+Continue from exactly where it stops. Do not repeat any of it and do not add a preamble."""
 
-CHART_INSIGHTS_PROMPT = """Analyze this chart data and provide 3 key insights in 2-3 sentences:
+BATCH_NARRATIVE_PROMPT = """{task}
 
-Chart Type: {chart_type}
-Data: {data_summary}
+Do this separately for each item below. Items are given as JSON, keyed by id:
 
-Focus on: trends, outliers, comparisons, and business implications."""
+{items}
+
+Reply with one JSON object whose keys are exactly the item ids and whose values are the text for that item (markdown allowed). Do not add any other keys."""
+
+FORECAST_BATCH_TASK = """Each item is a forecast (metric, current value, predicted value in 30 days, change %, trend).
+Write a compelling narrative of about 120 words explaining what the forecast means for the Indian financial
+ecosystem, what might be driving the trend, the implications for banks, fintechs and consumers, and one
+actionable insight. Use a storytelling style that makes the data come alive."""
+
+ANOMALY_BATCH_TASK = """Each item is an anomaly found by statistical tests on Indian financial data (kind, dataset,
+metric, period or entity, observed value, typical value and robust z-score). Explain it in one or two sentences
+for a boardroom audience: state the figures, a likely driver, and what to watch or do. Do not invent other numbers."""
+
+CHART_INSIGHTS_BATCH_TASK = """Each item is a chart (chart type and a summary of its data).
+Provide 3 key business insights per chart, each as a "• " bullet on its own line. Focus on trends,
+outliers, comparisons and business implications."""
 
 FEW_SHOT_EXAMPLES = """
 EXAMPLE 1:
@@ -97,3 +132,16 @@ EXAMPLE 3:
 Q: RBI की हालिया मौद्रिक नीति क्या है?
 A: RBI ने नवंबर 2025 में repo rate को 6.50% पर अपरिवर्तित रखा है। यह लगातार तीसरी बैठक है जब rate में कोई बदलाव नहीं हुआ। Policy stance 'accommodative' बना हुआ है, जिसका मतलब है कि growth को support करना priority है।
 """
+
+
+def _prompt_digest():
+    """Hash of every prompt string in this module"""
+    digest = hashlib.sha256()
+    for name, value in sorted(globals().items()):
+        if name.isupper() and isinstance(value, str):
+            digest.update(f"{name}={value}".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+# Part of every cached answer's key, so editing any prompt above regenerates the answers
+PROMPT_VERSION = _prompt_digest()
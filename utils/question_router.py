@@ -0,0 +1,400 @@
+"""
+PulseAI - Question Router
+Answers plain lookups (latest UPI volume, top states, repo rate, top gainer...) straight from
+the loaded datasets in English or Hindi; anything open-ended goes to the LLM
+"""
+
+import re
+
+DEVANAGARI_PATTERN = re.compile(r'[ऀ-ॿ]')
+WORD_PATTERN = re.compile(r'[\wऀ-ॿ]+')
+TOP_N_PATTERN = re.compile(r'\b(?:top|bottom)\s+(\d{1,2})\b|(?:शीर्ष|टॉप)\s*(\d{1,2})')
+MONTH_PATTERN = re.compile(
+    r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s*\'?(\d{4}|\d{2})\b|\b(\d{4})-(\d{2})\b'
+)
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+MAX_TOP_N = 10
+
+# Anything asking for reasoning, causes or forecasts needs the model
+OPEN_ENDED_MARKERS = (
+    'why', 'explain', 'analy', 'impact', 'effect', 'cause', 'reason', 'predict', 'forecast',
+    'affect', 'should', 'outlook', 'insight', 'recommend', 'implication', 'suggest', 'summar', 'compare',
+    'relationship', 'correlat', 'what if', 'how will', 'how does', 'how did',
+    # Advice is never a lookup
+    'buy', 'sell', 'invest', 'good', 'worth', 'hold', 'safe', 'advice', 'better',
+    'क्यों', 'विश्लेषण', 'प्रभाव', 'कारण', 'पूर्वानुमान', 'सुझाव', 'तुलना', 'समझाइए', 'समझाओ',
+)
+
+HIGHEST_MARKERS = ('highest', 'top', 'most', 'largest', 'biggest', 'maximum', 'max', 'leading', 'best',
+                   'सबसे अधिक', 'सबसे ज्यादा', 'सबसे ज़्यादा', 'सर्वाधिक', 'शीर्ष', 'टॉप', 'सबसे बड़ा')
+LOWEST_MARKERS = ('lowest', 'least', 'smallest', 'minimum', 'min', 'bottom', 'worst', 'weakest',
+                  'सबसे कम', 'न्यूनतम', 'सबसे छोटा')
+
+# State-level metrics in rbi_credit: (column, keywords, English label, Hindi label, unit)
+STATE_METRICS = [
+    ('Credit_Growth_%', ('credit growth', 'ऋण वृद्धि', 'क्रेडिट वृद्धि', 'क्रेडिट ग्रोथ'),
+     'credit growth', 'ऋण वृद्धि', '%'),
+    ('Deposit_Growth_%', ('deposit growth', 'जमा वृद्धि'), 'deposit growth', 'जमा वृद्धि', '%'),
+    ('CD_Ratio', ('cd ratio', 'credit-deposit', 'credit deposit ratio', 'credit to deposit', 'सीडी अनुपात',
+                  'ऋण-जमा अनुपात', 'ऋण जमा अनुपात'),
+     'credit-deposit ratio', 'ऋण-जमा अनुपात', '%'),
+    ('Digital_Adoption_%', ('digital adoption', 'digital', 'डिजिटल'), 'digital adoption', 'डिजिटल अपनाने की दर', '%'),
+    ('UPI_Volume_Crore', ('upi volume', 'upi transactions', 'यूपीआई'), 'UPI volume', 'यूपीआई वॉल्यूम', ' crore'),
+    ('Deposit_Crore', ('deposit', 'deposits', 'जमा'), 'deposits', 'जमा', ' crore'),
+    ('Credit_Crore', ('credit', 'loans', 'lending', 'ऋण', 'क्रेडिट'), 'credit outstanding', 'बकाया ऋण', ' crore'),
+]
+
+POLICY_RATES = [
+    ('Reverse_Repo', ('reverse repo', 'रिवर्स रेपो'), 'reverse repo rate', 'रिवर्स रेपो दर'),
+    ('Repo_Rate', ('repo', 'रेपो', 'policy rate', 'interest rate', 'ब्याज दर'), 'repo rate', 'रेपो दर'),
+    ('CRR', ('crr', 'cash reserve', 'नकद आरक्षित'), 'CRR', 'सीआरआर'),
+    ('SLR', ('slr', 'statutory liquidity', 'वैधानिक तरलता'), 'SLR', 'एसएलआर'),
+]
+
+UPI_MARKERS = ('upi', 'यूपीआई')
+STOCK_MARKERS = ('nse', 'stock', 'share', 'gainer', 'loser', 'nifty', 'sensex', 'शेयर', 'स्टॉक')
+
+# A template answers only when every word of the question is one of these, one of its
+# route's words, or a recognised entity (state, stock, month, top-N); anything else, such as
+# a year, a region or an unknown bank, is a qualifier the template would ignore
+FILLER_WORDS = (
+    "what whats what's is are was the a an of in on for to by and me tell show give list which who "
+    "how much many current currently latest now today as per please s it its with across among all "
+    "there this that has have had do does at level levels figure number data india indian rbi "
+    "का की के क्या है हैं में से कौन सा सी कितना कितनी कितने बताइए बताओ बताएं वर्तमान अभी नवीनतम "
+    "और को पर था थी वाला वाले वाली भारत"
+)
+ROUTE_WORDS = {
+    'policy': "policy monetary rate rates stance रुख नीति नीतिगत दर",
+    'nse': "price prices ltp quote quotes trading traded trade stocks shares day high low change tracked "
+           "gainers losers gaining losing falling dropped भाव",
+    'mutual_funds': "mutual fund funds aum category categories industry total assets under management "
+                    "largest smallest म्यूचुअल फंड एयूएम श्रेणी कुल",
+    'upi': "upi volume volumes value transaction transactions txn txns monthly month growth yoy year on "
+           "peak total count size average यूपीआई वॉल्यूम महीने महीना मूल्य लेनदेन वृद्धि सालाना",
+    'rbi_credit': "state states rank ranking ranked outstanding राज्य राज्यों स्थान",
+}
+
+# Hindi state names for the most asked-about states
+HINDI_STATES = {
+    'महाराष्ट्र': 'Maharashtra', 'कर्नाटक': 'Karnataka', 'तमिलनाडु': 'Tamil Nadu', 'तमिल नाडु': 'Tamil Nadu',
+    'उत्तर प्रदेश': 'Uttar Pradesh', 'गुजरात': 'Gujarat', 'दिल्ली': 'Delhi', 'केरल': 'Kerala',
+    'बिहार': 'Bihar', 'राजस्थान': 'Rajasthan', 'पश्चिम बंगाल': 'West Bengal', 'तेलंगाना': 'Telangana',
+    'आंध्र प्रदेश': 'Andhra Pradesh', 'मध्य प्रदेश': 'Madhya Pradesh', 'पंजाब': 'Punjab', 'हरियाणा': 'Haryana',
+    'ओडिशा': 'Odisha', 'असम': 'Assam', 'झारखंड': 'Jharkhand', 'गोवा': 'Goa',
+}
+
+
+def _words(*phrase_groups):
+    words = set()
+    for phrases in phrase_groups:
+        for phrase in ([phrases] if isinstance(phrases, str) else phrases):
+            words.update(WORD_PATTERN.findall(phrase.lower()))
+    return words
+
+
+def _has_any(text, markers):
+    """Any marker present, matched from a word start so 'min' does not hit 'admin'"""
+    return any(re.search(rf'(?<![a-z]){re.escape(marker)}', text) for marker in markers)
+
+
+def _is_hindi(question):
+    return bool(DEVANAGARI_PATTERN.search(question))
+
+
+def _fmt(value, unit=''):
+    if unit == ' crore':
+        return f"₹{value:,.0f} crore"
+    if unit == '%':
+        return f"{value:,.2f}%"
+    return f"{value:,.2f}{unit}"
+
+
+def _direction(text):
+    """'high', 'low' or None"""
+    if _has_any(text, LOWEST_MARKERS):
+        return 'low'
+    if _has_any(text, HIGHEST_MARKERS):
+        return 'high'
+    return None
+
+
+def _top_n(text):
+    match = TOP_N_PATTERN.search(text)
+    if not match:
+        return 1
+    return max(1, min(MAX_TOP_N, int(match.group(1) or match.group(2))))
+
+
+def _mentioned_month(text):
+    """YYYY-MM named in the question, if any"""
+    match = MONTH_PATTERN.search(text)
+    if not match:
+        return None
+    if match.group(3):
+        return f"{match.group(3)}-{match.group(4)}"
+    year = match.group(2)
+    year = f"20{year}" if len(year) == 2 else year
+    return f"{year}-{MONTHS.index(match.group(1)) + 1:02d}"
+
+
+def _mentioned_states(text, states):
+    found = [state for state in states if re.search(rf'\b{re.escape(state.lower())}\b', text)]
+    found += [english for hindi, english in HINDI_STATES.items() if hindi in text and english in states]
+    return list(dict.fromkeys(found))
+
+
+def _state_metric(text):
+    for metric in STATE_METRICS:
+        if _has_any(text, metric[1]):
+            return metric
+    return None
+
+
+def _answer_policy(text, data, hindi):
+    df = data.get('rbi_policy')
+    if df is None or df.empty or _direction(text) is not None or MONTH_PATTERN.search(text):
+        return None  # "highest repo rate" or "repo rate in Oct 2023" asks about history, not the current level
+    latest = df.iloc[-1]
+
+    if _has_any(text, ('stance', 'रुख')):
+        if hindi:
+            return f"RBI का वर्तमान नीतिगत रुख **{latest['Policy_Stance']}** है ({latest['Date']} तक)।"
+        return f"The RBI's current policy stance is **{latest['Policy_Stance']}** (as of {latest['Date']})."
+
+    for column, markers, label, hindi_label in POLICY_RATES:
+        if _has_any(text, markers):
+            value = latest[column]
+            if hindi:
+                answer = f"वर्तमान {hindi_label} **{value}%** है ({latest['Date']} तक)।"
+            else:
+                answer = f"The current {label} is **{value}%** (as of {latest['Date']})."
+            changes = df[df[column].ne(df[column].shift())]
+            if len(changes) > 1:
+                since = changes.iloc[-1]['Date']
+                answer += f" {'यह दर' if hindi else 'It has been at this level since'} {since}{' से इस स्तर पर है।' if hindi else '.'}"
+            return answer
+    return None
+
+
+def _answer_nse(text, data, hindi):
+    df = data.get('nse')
+    if df is None or df.empty or MONTH_PATTERN.search(text):
+        return None  # only the latest session's quotes are loaded
+
+    symbols = [s for s in df['Symbol'] if re.search(rf'\b{re.escape(s.lower())}\b', text)]
+    if symbols:
+        row = df[df['Symbol'] == symbols[0]].iloc[0]
+        if hindi:
+            return (f"**{row['Symbol']}** का अंतिम भाव ₹{row['LTP']:,.2f} है ({row['Change_%']:+.2f}%), "
+                    f"दिन का उच्च ₹{row['High']:,.2f} और निम्न ₹{row['Low']:,.2f} ({row['Date']})।")
+        return (f"**{row['Symbol']}** last traded at ₹{row['LTP']:,.2f} ({row['Change_%']:+.2f}%), "
+                f"with a day high of ₹{row['High']:,.2f} and low of ₹{row['Low']:,.2f} ({row['Date']}).")
+
+    if not _has_any(text, STOCK_MARKERS):
+        return None
+    gainer = _has_any(text, ('gainer', 'gain', 'बढ़त', 'तेजी'))
+    loser = _has_any(text, ('loser', 'losing', 'fall', 'drop', 'गिरावट', 'नुकसान'))
+    if gainer == loser:
+        return None
+    n = _top_n(text)
+    rows = df.nlargest(n, 'Change_%') if gainer else df.nsmallest(n, 'Change_%')
+    if hindi:
+        label = 'सबसे ज़्यादा बढ़त वाले' if gainer else 'सबसे ज़्यादा गिरावट वाले'
+        lines = [f"{label} शेयर ({df['Date'].iloc[0]}):"]
+    else:
+        label = 'Top gainer' if gainer else 'Top loser'
+        lines = [f"{label}{'s' if n > 1 else ''} among tracked NSE stocks ({df['Date'].iloc[0]}):"]
+    lines += [f"- **{r['Symbol']}**: ₹{r['LTP']:,.2f} ({r['Change_%']:+.2f}%)" for _, r in rows.iterrows()]
+    return "\n".join(lines)
+
+
+def _answer_states(text, data, hindi):
+    df = data.get('rbi_credit')
+    if df is None or df.empty or MONTH_PATTERN.search(text):
+        return None  # past periods live in the snapshot store, not the loaded frame
+    metric = _state_metric(text)
+    if metric is None:
+        return None
+    column, _, label, hindi_label, unit = metric
+    as_of = df['As_Of_Date'].max()
+
+    states = _mentioned_states(text, list(df['State']))
+    if states:
+        lines = []
+        for state in states:
+            value = df.loc[df['State'] == state, column].iloc[0]
+            rank = int(df[column].rank(ascending=False, method='min')[df['State'] == state].iloc[0])
+            if hindi:
+                lines.append(f"**{state}** की {hindi_label} {_fmt(value, unit)} है ({len(df)} राज्यों में {rank}वां स्थान)।")
+            else:
+                lines.append(f"**{state}** {label}: {_fmt(value, unit)} (rank {rank} of {len(df)} states).")
+        national = df[column].mean()
+        lines.append(f"{'राष्ट्रीय औसत' if hindi else 'National average'}: {_fmt(national, unit)} ({as_of}).")
+        return "\n".join(lines)
+
+    direction = _direction(text)
+    if direction is None:
+        return None
+    n = _top_n(text)
+    rows = df.nlargest(n, column) if direction == 'high' else df.nsmallest(n, column)
+    if n == 1:
+        row = rows.iloc[0]
+        if hindi:
+            word = 'सबसे अधिक' if direction == 'high' else 'सबसे कम'
+            return f"{word} {hindi_label} **{row['State']}** में है: {_fmt(row[column], unit)} ({as_of})।"
+        word = 'highest' if direction == 'high' else 'lowest'
+        return f"**{row['State']}** has the {word} {label}: {_fmt(row[column], unit)} (as of {as_of})."
+
+    if hindi:
+        word = 'सबसे अधिक' if direction == 'high' else 'सबसे कम'
+        header = f"{word} {hindi_label} वाले {n} राज्य ({as_of}):"
+    else:
+        word = 'Top' if direction == 'high' else 'Bottom'
+        header = f"{word} {n} states by {label} (as of {as_of}):"
+    return "\n".join([header] + [f"{i}. **{r['State']}**: {_fmt(r[column], unit)}"
+                                 for i, (_, r) in enumerate(rows.iterrows(), 1)])
+
+
+def _answer_upi(text, data, hindi):
+    df = data.get('upi')
+    if df is None or df.empty or not _has_any(text, UPI_MARKERS):
+        return None
+    if _has_any(text, ('state', 'राज्य')):
+        return None  # state-level UPI volume lives in rbi_credit
+
+    month = _mentioned_month(text)
+    if month is not None:
+        rows = df[df['Month'] == month]
+        if rows.empty:
+            return None
+        idx = rows.index[-1]
+    else:
+        idx = df.index[-1]
+    row = df.loc[idx]
+
+    if _has_any(text, ('growth', 'yoy', 'year on year', 'वृद्धि')):
+        pos = df.index.get_loc(idx)
+        if pos < 12:
+            return None
+        prev = df.iloc[pos - 12]
+        volume_growth = (row['Volume_Billion'] / prev['Volume_Billion'] - 1) * 100
+        value_growth = (row['Value_LakhCrore'] / prev['Value_LakhCrore'] - 1) * 100
+        if hindi:
+            return (f"{row['Month']} में यूपीआई वॉल्यूम में सालाना {volume_growth:+.1f}% और मूल्य में "
+                    f"{value_growth:+.1f}% की वृद्धि हुई ({prev['Month']} की तुलना में)।")
+        return (f"UPI volume grew {volume_growth:+.1f}% YoY and value {value_growth:+.1f}% in {row['Month']} "
+                f"(vs {prev['Month']}).")
+
+    if _direction(text) is not None and month is None:
+        column = 'Value_LakhCrore' if _has_any(text, ('value', 'मूल्य')) else 'Volume_Billion'
+        peak = df.loc[df[column].idxmax() if _direction(text) == 'high' else df[column].idxmin()]
+        unit = ' lakh crore' if column == 'Value_LakhCrore' else ' billion'
+        if hindi:
+            return f"यूपीआई का {'उच्चतम' if _direction(text) == 'high' else 'न्यूनतम'} महीना **{peak['Month']}** रहा: {peak[column]:,.2f}{unit}।"
+        return f"The {'highest' if _direction(text) == 'high' else 'lowest'} UPI month was **{peak['Month']}** at {peak[column]:,.2f}{unit}."
+
+    if hindi:
+        return (f"{row['Month']} में यूपीआई: **{row['Volume_Billion']:,.2f} बिलियन** लेनदेन, "
+                f"मूल्य **₹{row['Value_LakhCrore']:,.2f} लाख करोड़**, औसत लेनदेन ₹{row['Avg_Transaction_Size']:,.2f}।")
+    return (f"UPI in {row['Month']}: **{row['Volume_Billion']:,.2f} billion** transactions worth "
+            f"**₹{row['Value_LakhCrore']:,.2f} lakh crore** (average transaction ₹{row['Avg_Transaction_Size']:,.2f}).")
+
+
+def _answer_mutual_funds(text, data, hindi):
+    df = data.get('mutual_funds')
+    if df is None or df.empty or not _has_any(text, ('mutual fund', 'aum', 'म्यूचुअल फंड', 'एयूएम')):
+        return None
+    month = _mentioned_month(text) or df['Month'].max()
+    latest = df[df['Month'] == month]
+    if latest.empty:
+        return None
+
+    direction = _direction(text)
+    if direction is not None:
+        row = latest.loc[latest['AUM_LakhCrore'].idxmax() if direction == 'high' else latest['AUM_LakhCrore'].idxmin()]
+        if hindi:
+            return f"{month} में {'सबसे बड़ी' if direction == 'high' else 'सबसे छोटी'} श्रेणी **{row['Category']}** है: ₹{row['AUM_LakhCrore']:,.2f} लाख करोड़ AUM।"
+        return f"The {'largest' if direction == 'high' else 'smallest'} category in {month} is **{row['Category']}** with ₹{row['AUM_LakhCrore']:,.2f} lakh crore AUM."
+
+    total = latest['AUM_LakhCrore'].sum()
+    if hindi:
+        return f"{month} में म्यूचुअल फंड उद्योग का कुल AUM **₹{total:,.2f} लाख करोड़** है ({len(latest)} श्रेणियां)।"
+    return f"Total mutual fund industry AUM in {month} is **₹{total:,.2f} lakh crore** across {len(latest)} categories."
+
+
+# Tried in order; the first template that can answer wins
+ROUTES = [
+    ('policy', _answer_policy),
+    ('nse', _answer_nse),
+    ('mutual_funds', _answer_mutual_funds),
+    ('upi', _answer_upi),
+    ('rbi_credit', _answer_states),
+]
+
+# Words each route understands, beyond FILLER_WORDS and recognised entities
+ROUTE_VOCABULARY = {
+    'policy': _words(ROUTE_WORDS['policy'], *(markers for _, markers, _, _ in POLICY_RATES)),
+    'nse': _words(ROUTE_WORDS['nse'], STOCK_MARKERS, HIGHEST_MARKERS, LOWEST_MARKERS,
+                  ('gainer', 'gain', 'बढ़त', 'तेजी', 'loser', 'losing', 'fall', 'drop', 'गिरावट', 'नुकसान')),
+    'mutual_funds': _words(ROUTE_WORDS['mutual_funds'], HIGHEST_MARKERS, LOWEST_MARKERS),
+    'upi': _words(ROUTE_WORDS['upi'], UPI_MARKERS, HIGHEST_MARKERS, LOWEST_MARKERS),
+    'rbi_credit': _words(ROUTE_WORDS['rbi_credit'], HIGHEST_MARKERS, LOWEST_MARKERS,
+                         *(metric[1] for metric in STATE_METRICS)),
+}
+GENERIC_WORDS = _words(FILLER_WORDS)
+# Routes whose templates look up the month a question names; the others only know the latest figures
+DATED_ROUTES = {'upi', 'mutual_funds'}
+
+SOURCE_NOTES = {
+    'policy': 'RBI monetary policy data',
+    'nse': 'NSE quotes',
+    'mutual_funds': 'AMFI mutual fund data',
+    'upi': 'NPCI UPI statistics',
+    'rbi_credit': 'RBI state-wise banking data',
+}
+
+
+def _entities(text, data, dated=False):
+    """Text spans the templates resolve: top-N, state names, stock symbols, and months when dated"""
+    spans = [m.group(0) for m in MONTH_PATTERN.finditer(text)] if dated else []
+    spans += [m.group(0) for m in TOP_N_PATTERN.finditer(text)]
+    credit, nse = data.get('rbi_credit'), data.get('nse')
+    if credit is not None and not credit.empty:
+        states = list(credit['State'])
+        spans += [state.lower() for state in _mentioned_states(text, states)]
+        spans += [hindi for hindi, english in HINDI_STATES.items() if hindi in text and english in states]
+    if nse is not None and not nse.empty:
+        spans += [s.lower() for s in nse['Symbol'] if re.search(rf'\b{re.escape(s.lower())}\b', text)]
+    return spans
+
+
+def _fully_matched(text, name, data):
+    """True when the route's template accounts for every word of the question"""
+    for span in sorted(_entities(text, data, name in DATED_ROUTES), key=len, reverse=True):
+        text = text.replace(span, ' ')
+    vocabulary = ROUTE_VOCABULARY[name]
+    return all(word in GENERIC_WORDS or word in vocabulary for word in WORD_PATTERN.findall(text))
+
+
+def route_question(question, data_dict):
+    """Direct answer for a lookup question, or None to send it to the LLM
+    
+    Only questions a template covers completely are answered here; a
+    question with any word the template would ignore goes to the LLM.
+    """
+    text = re.sub(r'\s+', ' ', str(question).lower()).strip()
+    if not text or _has_any(text, OPEN_ENDED_MARKERS):
+        return None
+    hindi = _is_hindi(question)
+
+    for name, route in ROUTES:
+        try:
+            answer = route(text, data_dict, hindi)
+        except (KeyError, IndexError, ValueError, TypeError):
+            answer = None  # unexpected schema: let the model handle it
+        if answer and _fully_matched(text, name, data_dict):
+            source = SOURCE_NOTES[name]
+            note = f"स्रोत: {source} (सीधे डेटा से)" if hindi else f"Source: {source} (direct lookup)"
+            return f"{answer}\n\n_{note}_"
+    return None
@@ -0,0 +1,216 @@
+"""
+PulseAI - Local Retrieval Index
+In-process BM25 over dataset rows, context sections and local documents
+"""
+
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DOCS_DIR = Path(__file__).parent.parent / "data" / "raw" / "docs"
+DOC_CHUNK_CHARS = 1200
+DEFAULT_TOP_K = 8
+MAX_CACHED_INDEXES = 2
+
+Passage = namedtuple('Passage', ['source', 'section', 'text'])
+
+DATASET_TITLES = {
+    'upi': 'UPI monthly transactions (NPCI)',
+    'rbi_credit': 'RBI state-wise banking credit and deposits',
+    'nse': 'NSE stock quote',
+    'mutual_funds': 'Mutual fund AUM by category (AMFI)',
+    'rbi_policy': 'RBI monetary policy rates',
+}
+
+# Context section headers -> dataset they summarise
+SECTION_DATASETS = {
+    'UPI': 'upi',
+    'STATE-WISE': 'rbi_credit',
+    'NSE': 'nse',
+    'MUTUAL FUND': 'mutual_funds',
+    'MONETARY POLICY': 'rbi_policy',
+}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'of', 'in', 'on', 'for', 'to',
+    'and', 'or', 'what', 'which', 'who', 'how', 'me', 'about', 'tell', 'with', 'by',
+    'it', 'its', 'this', 'that', 'as', 'at', 'from', 'do', 'does', 'i', 'you', 'why',
+    'का', 'की', 'के', 'है', 'क्या', 'में', 'और', 'को', 'से'
+}
+
+# Hindi questions should still hit the English dataset passages
+HINDI_SYNONYMS = {
+    'वॉल्यूम': 'volume', 'मात्रा': 'volume', 'मूल्य': 'value', 'ऋण': 'credit', 'क्रेडिट': 'credit',
+    'जमा': 'deposit', 'रेपो': 'repo', 'दर': 'rate', 'नीति': 'policy', 'मौद्रिक': 'monetary',
+    'राज्य': 'state', 'शेयर': 'stock', 'बाजार': 'market', 'म्यूचुअल': 'mutual', 'फंड': 'fund',
+    'महीने': 'month', 'महीना': 'month', 'वृद्धि': 'growth', 'डिजिटल': 'digital',
+}
+
+TOKEN_PATTERN = re.compile(r'[\wऀ-ॿ]+')
+
+
+def tokenize(text):
+    """Lowercase word tokens with Hindi terms mapped to their English equivalents"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(str(text).lower().replace('_', ' ')):
+        token = HINDI_SYNONYMS.get(token, token)
+        if token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def chunk_datasets(data_dict):
+    """One passage per dataset row"""
+    passages = []
+    for name, df in data_dict.items():
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            continue
+        title = DATASET_TITLES.get(name, name.replace('_', ' '))
+        columns = list(df.columns)
+        for row in df.itertuples(index=False):
+            fields = ", ".join(f"{col.replace('_', ' ')}: {_format_value(val)}" for col, val in zip(columns, row))
+            passages.append(Passage(name, title, f"{title} | {fields}"))
+    return passages
+
+
+def chunk_sections(context_text):
+    """Split a rendered context into its '=== SECTION ===' blocks"""
+    passages = []
+    for block in re.split(r'\n(?==== )', context_text or ''):
+        block = block.strip()
+        match = re.match(r'=== (.+?) ===', block)
+        if match and 'REFERENCE EXAMPLES' not in match.group(1):
+            title = match.group(1)
+            dataset = next((d for k, d in SECTION_DATASETS.items() if k in title), title)
+            passages.append(Passage('summary', dataset, block))
+    return passages
+
+
+def chunk_documents(docs_dir=DOCS_DIR, max_chars=DOC_CHUNK_CHARS):
+    """Heading/paragraph chunks from local .md and .txt documents"""
+    passages = []
+    docs_dir = Path(docs_dir)
+    if not docs_dir.exists():
+        return passages
+
+    for doc in sorted(list(docs_dir.glob("*.md")) + list(docs_dir.glob("*.txt"))):
+        heading = doc.stem
+        buffer = ""
+        for paragraph in re.split(r'\n\s*\n', doc.read_text(encoding='utf-8', errors='ignore')):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if paragraph.startswith('#'):
+                if buffer:
+                    passages.append(Passage(doc.name, heading, buffer))
+                    buffer = ""
+                heading = paragraph.lstrip('#').strip().split('\n')[0]
+            if len(buffer) + len(paragraph) > max_chars and buffer:
+                passages.append(Passage(doc.name, heading, buffer))
+                buffer = ""
+            buffer = f"{buffer}\n\n{paragraph}".strip()
+        if buffer:
+            passages.append(Passage(doc.name, heading, buffer))
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 over passages with numpy postings"""
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+
+        tokenized = [tokenize(p.text) for p in passages]
+        self.doc_len = np.array([len(t) for t in tokenized], dtype=float)
+        self.avgdl = self.doc_len.mean() if len(passages) else 1.0
+
+        postings = defaultdict(dict)
+        for i, tokens in enumerate(tokenized):
+            for term, count in Counter(tokens).items():
+                postings[term][i] = count
+
+        n = len(passages)
+        self.postings = {}
+        self.idf = {}
+        for term, docs in postings.items():
+            self.postings[term] = (np.fromiter(docs.keys(), dtype=int), np.fromiter(docs.values(), dtype=float))
+            self.idf[term] = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+
+    def search(self, query, k=DEFAULT_TOP_K):
+        """Top-k (passage, score) pairs with a positive score"""
+        scores = np.zeros(len(self.passages))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tf = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[ids] / self.avgdl)
+            scores[ids] += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+
+        if not scores.any():
+            return []
+        top = np.argsort(-scores)[:k]
+        return [(self.passages[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+def build_index(data_dict, context_text=None, docs_dir=DOCS_DIR):
+    """Index dataset rows, context sections and local documents together"""
+    passages = chunk_sections(context_text) + chunk_datasets(data_dict) + chunk_documents(docs_dir)
+    return BM25Index(passages)
+
+
+def with_summaries(index, results):
+    """Prepend the summary section of every dataset a matched row belongs to"""
+    hit_datasets = {p.source for p, _ in results}
+    have = {p.section for p, _ in results if p.source == 'summary'}
+    summaries = [(p, 0.0) for p in index.passages
+                 if p.source == 'summary' and p.section in hit_datasets and p.section not in have]
+    return summaries + results
+
+
+def format_passages(results):
+    """Render retrieved passages as a compact context block"""
+    lines = []
+    for passage, _ in results:
+        lines.append(passage.text if passage.source == 'summary' else f"- {passage.text}")
+    return "\n\n".join(lines)
+
+
+class IndexCache:
+    """Process-wide indexes keyed by data version"""
+
+    def __init__(self, max_entries=MAX_CACHED_INDEXES):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+            index = builder()
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+            return index
+
+
+_index_cache = IndexCache()
+
+
+def get_index_cache():
+    """Process-wide retrieval index cache"""
+    return _index_cache
@@ -0,0 +1,136 @@
+"""
+PulseAI - State Banking Snapshots
+Dated state-wise snapshots with (state, date) indexed time-travel queries
+"""
+
+import bisect
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .columnar_store import write_partitions, read_dataset, dataset_dir
+
+SNAPSHOT_DATASET = "state_snapshots"
+DATE_COLUMN = 'As_Of_Date'
+METRIC_COLUMNS = [
+    'Credit_Crore', 'Deposit_Crore', 'Credit_Growth_%', 'Deposit_Growth_%',
+    'CD_Ratio', 'Digital_Adoption_%', 'UPI_Volume_Crore'
+]
+
+
+def snapshot_dates():
+    """Dates with a stored snapshot, read from partition names only"""
+    root = dataset_dir(SNAPSHOT_DATASET)
+    if not root.exists():
+        return []
+    return sorted(p.name.split('=', 1)[1] for p in root.glob(f"{DATE_COLUMN}=*"))
+
+
+def _write_snapshots(df):
+    columns = ['State', DATE_COLUMN] + [c for c in METRIC_COLUMNS if c in df.columns]
+    return write_partitions(SNAPSHOT_DATASET, df[columns], [DATE_COLUMN], "snapshot")
+
+
+def append_snapshot(df):
+    """Store a refresh under each As_Of_Date it contains
+
+    Rows overlaid from another period (e.g. official DBIE figures) go into
+    that period's snapshot, so no snapshot mixes periods. A group replaces
+    the states it covers in an existing snapshot and keeps the others.
+    """
+    if df.empty or DATE_COLUMN not in df.columns:
+        return []
+    df = df.assign(**{DATE_COLUMN: df[DATE_COLUMN].astype(str)})
+    existing = set(snapshot_dates())
+    groups = []
+    for date, group in df.groupby(DATE_COLUMN, sort=False):
+        if date in existing:
+            stored = read_dataset(SNAPSHOT_DATASET, filters={DATE_COLUMN: date})
+            group = pd.concat([stored[~stored['State'].isin(group['State'])], group], ignore_index=True)
+        groups.append(group)
+    return _write_snapshots(pd.concat(groups, ignore_index=True))
+
+
+def backfill_snapshots(history):
+    """Add historical periods (e.g. from DBIE workbooks) that have no snapshot yet"""
+    if history.empty:
+        return []
+    existing = set(snapshot_dates())
+    history = history.rename(columns={'Period': DATE_COLUMN})
+    missing = history[~history[DATE_COLUMN].isin(existing)]
+    return _write_snapshots(missing) if not missing.empty else []
+
+
+class StateSnapshotIndex:
+    """Dense date x state x metric array with dict lookups for O(1) access"""
+
+    def __init__(self, history):
+        self.dates = sorted(history[DATE_COLUMN].astype(str).unique()) if not history.empty else []
+        self.states = sorted(history['State'].unique()) if not history.empty else []
+        self.metrics = [c for c in METRIC_COLUMNS if c in history.columns]
+        self.date_pos = {d: i for i, d in enumerate(self.dates)}
+        self.state_pos = {s: i for i, s in enumerate(self.states)}
+
+        self.values = np.full((len(self.dates), len(self.states), len(self.metrics)), np.nan)
+        if not history.empty:
+            d_idx = history[DATE_COLUMN].astype(str).map(self.date_pos).to_numpy()
+            s_idx = history['State'].map(self.state_pos).to_numpy()
+            self.values[d_idx, s_idx] = history[self.metrics].to_numpy(dtype=float)
+
+    @property
+    def empty(self):
+        return not self.dates
+
+    def resolve_date(self, as_of):
+        """Latest snapshot date on or before as_of"""
+        as_of = str(as_of)
+        if as_of in self.date_pos:
+            return as_of
+        pos = bisect.bisect_right(self.dates, as_of)
+        return self.dates[pos - 1] if pos else None
+
+    def get(self, state, as_of):
+        """Metrics for one state at a snapshot date"""
+        date = as_of if as_of in self.date_pos else self.resolve_date(as_of)
+        if date is None or state not in self.state_pos:
+            return None
+        row = self.values[self.date_pos[date], self.state_pos[state]]
+        if np.isnan(row).all():
+            return None
+        return dict(zip(self.metrics, row.tolist()), State=state, As_Of_Date=date)
+
+    def as_of(self, as_of):
+        """All states as they stood at as_of, in the rbi_credit schema"""
+        date = self.resolve_date(as_of)
+        if date is None:
+            return pd.DataFrame(columns=['State'] + self.metrics + [DATE_COLUMN])
+        df = pd.DataFrame(self.values[self.date_pos[date]], columns=self.metrics)
+        df.insert(0, 'State', self.states)
+        df[DATE_COLUMN] = date
+        return df.dropna(subset=self.metrics, how='all').reset_index(drop=True)
+
+    def series(self, state, metric):
+        """One state's metric across every snapshot"""
+        if state not in self.state_pos or metric not in self.metrics:
+            return pd.Series(dtype=float)
+        values = self.values[:, self.state_pos[state], self.metrics.index(metric)]
+        return pd.Series(values, index=self.dates, name=metric).dropna()
+
+
+def _store_version():
+    """Cheap fingerprint of the snapshot partitions on disk"""
+    root = dataset_dir(SNAPSHOT_DATASET)
+    if not root.exists():
+        return ()
+    return tuple(sorted((str(p), p.stat().st_mtime_ns) for p in root.rglob("*.parquet")))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_index(version):
+    return StateSnapshotIndex(read_dataset(SNAPSHOT_DATASET))
+
+
+def get_snapshot_index():
+    """Process-wide index, rebuilt only when a snapshot is added"""
+    return _load_index(_store_version())
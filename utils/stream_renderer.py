@@ -0,0 +1,97 @@
+"""
+PulseAI - Streaming Renderer
+Frame-budgeted chat streaming: finished paragraphs are frozen into their own elements so each
+update only re-sends the paragraph being written; tracks time-to-first-token and tokens/second
+"""
+
+import time
+
+from .tokens import TokenCounter
+
+DEFAULT_FPS = 12
+CURSOR = "▌"
+FENCE = "```"
+
+
+class StreamRenderer:
+    """Renders a chunk stream into a Streamlit container
+
+    Streamlit replaces an element's whole body on every update, so rendering
+    the growing answer into one placeholder re-sends O(n) text per chunk.
+    Here completed paragraphs move into frozen elements and only the tail is
+    redrawn, at most fps times a second.
+    """
+
+    def __init__(self, container, fps=DEFAULT_FPS, counter=None, started_at=None):
+        self.container = container
+        self.frame_interval = 1.0 / fps
+        self.counter = counter or TokenCounter()
+        self.started_at = started_at or time.time()
+
+        self.frozen = []      # finished segments, already rendered
+        self.tail = ""        # paragraph still being written
+        self._active = container.empty()
+        self._last_frame = 0.0
+        self.first_token_at = None
+        self.finished_at = None
+        self.frames = 0
+
+    @property
+    def text(self):
+        return "".join(self.frozen) + self.tail
+
+    def status(self, message):
+        """Transient line (e.g. queue position) shown until the first token arrives"""
+        if self.first_token_at is None:
+            self._active.caption(message)
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
+        self.tail += chunk
+        if time.time() - self._last_frame >= self.frame_interval:
+            self._flush()
+
+    def _freeze_point(self):
+        """End of the last complete paragraph in the tail, never inside an open code fence"""
+        cut = self.tail.rfind("\n\n")
+        while cut > 0 and self.tail[:cut].count(FENCE) % 2:
+            cut = self.tail.rfind("\n\n", 0, cut)
+        return cut
+
+    def _flush(self, final=False):
+        cut = self._freeze_point()
+        if cut > 0:
+            done, self.tail = self.tail[:cut + 2], self.tail[cut + 2:]
+            self._active.markdown(done)
+            self.frozen.append(done)
+            self._active = self.container.empty()
+        self._active.markdown(self.tail if final else self.tail + CURSOR)
+        self._last_frame = time.time()
+        self.frames += 1
+
+    def finish(self):
+        """Final render without the cursor; returns the full text"""
+        self._flush(final=True)
+        self.finished_at = time.time()
+        return self.text
+
+    def replace(self, text):
+        """Show text (e.g. an error) in place of the tail"""
+        self.tail = text
+        self._active.markdown(text)
+
+    def stats(self):
+        """Time to first token, generation speed and frames drawn for this answer"""
+        end = self.finished_at or time.time()
+        tokens = self.counter.estimate(self.text)
+        generating = end - self.first_token_at if self.first_token_at else 0.0
+        return {
+            'ttft': (self.first_token_at - self.started_at) if self.first_token_at else None,
+            'tokens': tokens,
+            'tokens_per_sec': tokens / generating if generating > 0 else None,
+            'total': end - self.started_at,
+            'frames': self.frames,
+        }
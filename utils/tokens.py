@@ -0,0 +1,102 @@
+"""
+PulseAI - Token Accounting
+Token counts (exact via the LLM backend, calibrated estimate otherwise) and budget-aware packing
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
+# Gemini's SentencePiece vocabulary splits digits one per token, packs English
+# at roughly 4 characters per token and Devanagari at roughly 2
+ASCII_CHARS_PER_TOKEN = 4.0
+OTHER_CHARS_PER_TOKEN = 2.0
+CALIBRATION_SMOOTHING = 0.3
+EXACT_CACHE_SIZE = 256
+FAILURE_COOLDOWN = 300  # seconds to rely on estimates after the backend fails to count
+
+DIGIT_PATTERN = re.compile(r'\d')
+
+Section = namedtuple('Section', ['name', 'text', 'priority', 'relevance'])
+Section.__new__.__defaults__ = (1, 0.0)
+
+
+def heuristic_tokens(text):
+    """Uncalibrated token estimate by character class"""
+    if not text:
+        return 0
+    digits = len(DIGIT_PATTERN.findall(text))
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_other = len(text) - digits - non_ascii
+    return digits + ascii_other / ASCII_CHARS_PER_TOKEN + non_ascii / OTHER_CHARS_PER_TOKEN
+
+
+class TokenCounter:
+    """Counts tokens exactly when a backend is available and calibrates the estimate from those counts"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.scale = 1.0  # exact / heuristic, learned from exact counts
+        self._exact = OrderedDict()
+        self._lock = threading.Lock()
+        self._disabled_until = 0
+
+    def exact(self, text):
+        """Exact count from the backend (memoised), or None when unavailable"""
+        if self.backend is None or not text or time.time() < self._disabled_until:
+            return None
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._exact:
+                return self._exact[key]
+        try:
+            count = self.backend.count_tokens(text)
+        except Exception:
+            self._disabled_until = time.time() + FAILURE_COOLDOWN
+            return None
+
+        with self._lock:
+            self._exact[key] = count
+            while len(self._exact) > EXACT_CACHE_SIZE:
+                self._exact.popitem(last=False)
+            estimate = heuristic_tokens(text)
+            if estimate > 0:
+                ratio = count / estimate
+                self.scale += CALIBRATION_SMOOTHING * (ratio - self.scale)
+        return count
+
+    def estimate(self, text):
+        """Calibrated estimate without a network round-trip"""
+        return int(round(heuristic_tokens(text) * self.scale))
+
+    def count(self, text, exact=False):
+        """Token count; exact=True asks the backend and falls back to the estimate"""
+        if exact:
+            count = self.exact(text)
+            if count is not None:
+                return count
+        return self.estimate(text)
+
+
+def pack_sections(sections, budget, counter, separator="\n\n"):
+    """Fill a token budget with whole sections, best priority then relevance first
+
+    Returns (packed_text, included_names, dropped_names). Sections keep their
+    original order in the output so the prompt still reads top to bottom.
+    """
+    separator_tokens = counter.count(separator)
+    ranked = sorted(range(len(sections)), key=lambda i: (sections[i].priority, -sections[i].relevance, i))
+
+    used = 0
+    chosen = set()
+    for i in ranked:
+        cost = counter.count(sections[i].text) + (separator_tokens if chosen else 0)
+        if used + cost <= budget:
+            chosen.add(i)
+            used += cost
+
+    included = [sections[i] for i in range(len(sections)) if i in chosen]
+    dropped = [sections[i].name for i in range(len(sections)) if i not in chosen]
+    return separator.join(s.text for s in included), [s.name for s in included], dropped